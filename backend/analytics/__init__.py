@@ -0,0 +1 @@
+# Analytics module for materialized dashboard rollups
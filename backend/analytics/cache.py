@@ -0,0 +1,245 @@
+"""
+Analytics Response Cache
+In-process TTL cache for analytics_router responses with single-flight and write invalidation
+
+Responses are keyed by endpoint, query parameters and caller scope (role).
+Each endpoint declares the collections it reads; a write to one of them bumps
+that collection's generation, which invalidates every dependent entry at once
+without scanning. Writes are reported:
+
+- in-process, by the code that writes (invalidate("question_papers"))
+- from other processes (upload workers) by a MongoDB change stream, when the
+  server supports one (replica sets, Atlas); on a standalone server those
+  writes show up once the entry's TTL expires
+
+Concurrent misses for the same key share one computation (single-flight).
+TTLs default to ANALYTICS_CACHE_TTL_SECONDS; ANALYTICS_CACHE_TTL_<ENDPOINT>
+overrides one endpoint, e.g. ANALYTICS_CACHE_TTL_PERFORMANCE_TRENDS=300.
+"""
+
+import asyncio
+import functools
+import inspect
+import logging
+import os
+import time
+from collections import OrderedDict, defaultdict
+from threading import Lock
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from pymongo.errors import OperationFailure
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+EVALUATIONS = 'evaluations'
+UPLOAD_QUEUE = 'upload_queue'
+QUESTION_PAPERS = 'question_papers'
+WATCHED_COLLECTIONS = (EVALUATIONS, UPLOAD_QUEUE, QUESTION_PAPERS)
+
+CHANGE_STREAM_RETRY_SECONDS = 5
+CHANGE_STREAMS_UNSUPPORTED = 40573  # Standalone server: "$changeStream is only supported on replica sets"
+
+class ResponseCache:
+    """LRU-bounded TTL cache keyed by request, invalidated by collection generations"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Tuple[float, Tuple[int, ...], Any]]" = OrderedDict()
+        self._in_flight: Dict[Tuple, asyncio.Task] = {}
+        self._generations: Dict[str, int] = defaultdict(int)
+        self._lock = Lock()  # invalidate() is also called from pipeline threads
+        self._endpoint_stats: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"hits": 0, "misses": 0, "coalesced": 0, "stale": 0}
+        )
+        self._invalidations: Dict[str, int] = defaultdict(int)
+        self.change_stream = "not started"
+
+    async def get_or_compute(
+        self,
+        endpoint: str,
+        key: Tuple,
+        ttl: float,
+        depends_on: Tuple[str, ...],
+        compute: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Return the cached response for key, or compute it once for all concurrent callers"""
+        with self._lock:
+            stats = self._endpoint_stats[endpoint]
+            generations = tuple(self._generations[name] for name in depends_on)
+
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, entry_generations, value = entry
+                if expires_at > time.monotonic() and entry_generations == generations:
+                    self._entries.move_to_end(key)
+                    stats["hits"] += 1
+                    return value
+                del self._entries[key]
+                if entry_generations != generations:
+                    stats["stale"] += 1
+
+            # Requests after a write must not join a computation that started before it
+            flight_key = (key, generations)
+            task = self._in_flight.get(flight_key)
+            if task is not None:
+                stats["coalesced"] += 1
+            else:
+                stats["misses"] += 1
+                task = asyncio.ensure_future(self._compute(key, flight_key, ttl, depends_on, compute))
+                task.add_done_callback(lambda t: t.cancelled() or t.exception())  # Consumed even if every caller left
+                self._in_flight[flight_key] = task
+
+        # A disconnecting caller must not cancel the computation the others are waiting on
+        return await asyncio.shield(task)
+
+    async def _compute(self, key: Tuple, flight_key: Tuple, ttl: float, depends_on: Tuple[str, ...], compute) -> Any:
+        try:
+            value = await compute()
+        except BaseException:
+            with self._lock:
+                self._in_flight.pop(flight_key, None)
+            raise
+
+        with self._lock:
+            self._in_flight.pop(flight_key, None)
+            generations = tuple(self._generations[name] for name in depends_on)
+            # Skip the store if a write landed while computing; the next request recomputes
+            if ttl > 0 and generations == flight_key[1]:
+                self._entries[key] = (time.monotonic() + ttl, generations, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, collection: str):
+        """Drop every entry that depends on collection"""
+        with self._lock:
+            self._generations[collection] += 1
+            self._invalidations[collection] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-endpoint hit ratios, entry count and invalidations per collection"""
+        with self._lock:
+            endpoints = {}
+            for endpoint, stats in self._endpoint_stats.items():
+                lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+                endpoints[endpoint] = {
+                    **stats,
+                    "hit_ratio": round(stats["hits"] / lookups, 3) if lookups else 0.0
+                }
+            return {
+                "endpoints": endpoints,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "invalidations": dict(self._invalidations),
+                "change_stream": self.change_stream
+            }
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = Lock()
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Return the shared analytics response cache, or None when caching is disabled"""
+    global _cache
+    if not Config.ANALYTICS_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(Config.ANALYTICS_CACHE_MAX_ENTRIES)
+        return _cache
+
+def invalidate(collection: str):
+    """Report a write to collection; cached responses that read it are dropped"""
+    cache = get_response_cache()
+    if cache is not None:
+        cache.invalidate(collection)
+
+def endpoint_ttl(endpoint: str, default: Optional[float] = None) -> float:
+    """TTL for an endpoint: ANALYTICS_CACHE_TTL_<ENDPOINT>, then the endpoint default, then the global one"""
+    override = os.getenv(f"ANALYTICS_CACHE_TTL_{endpoint.upper().replace('-', '_')}")
+    if override:
+        try:
+            return float(override)
+        except ValueError:
+            logger.warning(f"Ignoring invalid TTL override for {endpoint}: {override}")
+    return default if default is not None else Config.ANALYTICS_CACHE_TTL_SECONDS
+
+def caller_scope(current_user: Optional[dict]) -> str:
+    """Cache partition for a caller; responses may differ by role but not by individual user"""
+    return current_user.get('role', 'user') if current_user else 'anonymous'
+
+def cached_response(endpoint: str, depends_on: Tuple[str, ...], ttl: Optional[float] = None):
+    """
+    Cache an analytics route handler's response.
+
+    The handler's query parameters form the key (current_user only contributes
+    its scope); depends_on lists the collections whose writes invalidate it.
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)  # FastAPI reads the handler's parameters through __wrapped__
+        async def wrapper(*args, **kwargs):
+            cache = get_response_cache()
+            if cache is None:
+                return await fn(*args, **kwargs)
+
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = tuple(sorted(
+                (name, repr(value)) for name, value in bound.arguments.items() if name != 'current_user'
+            ))
+            key = (endpoint, caller_scope(bound.arguments.get('current_user')), params)
+
+            return await cache.get_or_compute(
+                endpoint, key, endpoint_ttl(endpoint, ttl), depends_on, lambda: fn(*args, **kwargs)
+            )
+
+        return wrapper
+    return decorator
+
+async def watch_for_invalidations(db):
+    """
+    Invalidate on writes from any process through a change stream on the watched
+    collections. Returns if the server does not support change streams.
+    """
+    cache = get_response_cache()
+    if cache is None:
+        return
+
+    pipeline = [
+        {'$match': {'ns.coll': {'$in': list(WATCHED_COLLECTIONS)}}},
+        {'$project': {'ns': 1}}
+    ]
+    try:
+        while True:
+            try:
+                async with db.watch(pipeline) as stream:
+                    # Writes may have been missed while the stream was down
+                    for collection in WATCHED_COLLECTIONS:
+                        cache.invalidate(collection)
+                    cache.change_stream = "active"
+                    logger.info("Analytics cache invalidation change stream started")
+
+                    async for change in stream:
+                        cache.invalidate(change['ns']['coll'])
+
+            except OperationFailure as e:
+                if e.code == CHANGE_STREAMS_UNSUPPORTED:
+                    cache.change_stream = "unsupported"
+                    logger.info("MongoDB does not support change streams; analytics entries from "
+                                "other processes' writes expire by TTL")
+                    return
+                cache.change_stream = "retrying"
+                logger.warning(f"Analytics cache change stream failed: {e}; retrying")
+            except Exception as e:
+                cache.change_stream = "retrying"
+                logger.warning(f"Analytics cache change stream failed: {e}; retrying")
+
+            await asyncio.sleep(CHANGE_STREAM_RETRY_SECONDS)
+
+    except asyncio.CancelledError:
+        cache.change_stream = "stopped"
+        raise
@@ -0,0 +1,335 @@
+"""
+Analytics Rollups
+Incrementally maintained aggregates behind the analytics dashboards
+
+Every evaluation insert/delete adds (or subtracts) its contribution to four
+small collections, so the dashboards read a handful of documents instead of
+$unwind-ing the whole evaluations collection:
+
+- analytics_totals            one document: counts, score sums, score histogram, active students
+- analytics_daily             one document per day ("YYYY-MM-DD"), for recent counts and trends
+- analytics_students          one document per student, avg_score indexed for top performers
+- analytics_question_papers   one document per question paper
+
+Updates are plain $inc operations and never fail the write they follow; if
+the rollups drift (a failed update, data written by older code) rebuild them
+from the evaluations collection:
+
+    python -m analytics.rollups --rebuild
+"""
+
+import argparse
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import ReturnDocument, UpdateOne
+
+from analytics.cache import invalidate, EVALUATIONS
+
+logger = logging.getLogger(__name__)
+
+TOTALS_COLLECTION = 'analytics_totals'
+DAILY_COLLECTION = 'analytics_daily'
+STUDENTS_COLLECTION = 'analytics_students'
+QUESTION_PAPERS_COLLECTION = 'analytics_question_papers'
+ROLLUP_COLLECTIONS = [TOTALS_COLLECTION, DAILY_COLLECTION, STUDENTS_COLLECTION, QUESTION_PAPERS_COLLECTION]
+
+TOTALS_ID = 'all'
+HISTOGRAM_BUCKETS = ["0-20", "21-40", "41-60", "61-80", "81-100"]
+
+COUNTER_FIELDS = ('documents', 'questions', 'scored', 'score_sum')  # Every rollup
+MARK_FIELDS = ('marks_obtained', 'max_marks')                       # Student and question paper rollups
+
+# Fields read from the evaluations collection (rebuild projection)
+EVALUATION_FIELDS = {
+    'student_id': 1, 'question_paper_id': 1, 'created_at': 1,
+    'evaluations.percentage': 1, 'evaluations.percentage_score': 1,
+    'evaluations.obtainedMarks': 1, 'evaluations.marks_obtained': 1,
+    'evaluations.maxMarks': 1, 'evaluations.max_marks': 1
+}
+
+def score_bucket(percentage: float) -> str:
+    """Histogram bucket of a question percentage, same edges as the dashboard chart"""
+    for upper, bucket in zip((21, 41, 61, 81), HISTOGRAM_BUCKETS):
+        if percentage < upper:
+            return bucket
+    return HISTOGRAM_BUCKETS[-1]
+
+def _number(entry: Dict[str, Any], *keys: str) -> Optional[float]:
+    """First numeric value among keys (evaluator fields first, then legacy names)"""
+    for key in keys:
+        value = entry.get(key)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return value
+    return None
+
+def evaluation_contribution(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Counters one evaluation document adds to every rollup it belongs to"""
+    contribution = {
+        'documents': 1,
+        'questions': 0,
+        'scored': 0,
+        'score_sum': 0.0,
+        'marks_obtained': 0.0,
+        'max_marks': 0.0
+    }
+    histogram = defaultdict(int)
+
+    for entry in doc.get('evaluations') or []:
+        if not isinstance(entry, dict):
+            continue
+        contribution['questions'] += 1
+        percentage = _number(entry, 'percentage', 'percentage_score')
+        if percentage is not None:
+            contribution['scored'] += 1
+            contribution['score_sum'] += percentage
+            histogram[score_bucket(percentage)] += 1
+        contribution['marks_obtained'] += _number(entry, 'obtainedMarks', 'marks_obtained') or 0
+        contribution['max_marks'] += _number(entry, 'maxMarks', 'max_marks') or 0
+
+    contribution['histogram'] = dict(histogram)
+    return contribution
+
+def _day_key(doc: Dict[str, Any]) -> Optional[str]:
+    created_at = doc.get('created_at')
+    return created_at.strftime("%Y-%m-%d") if hasattr(created_at, 'strftime') else None
+
+def _inc(contribution: Dict[str, Any], sign: int, fields: Tuple[str, ...]) -> Dict[str, Any]:
+    return {field: contribution[field] * sign for field in fields}
+
+def rollup_updates(doc: Dict[str, Any], sign: int) -> List[Tuple[str, Dict[str, Any], Dict[str, Any]]]:
+    """
+    (collection, filter, update) upserts applying one evaluation to the rollups.
+
+    sign is +1 for an inserted evaluation and -1 for a deleted one. The student
+    rollup is not included; it needs a follow-up (see _student_followups).
+    """
+    contribution = evaluation_contribution(doc)
+
+    totals_inc = _inc(contribution, sign, COUNTER_FIELDS)
+    for bucket, count in contribution['histogram'].items():
+        totals_inc[f'histogram.{bucket}'] = count * sign
+    updates = [(TOTALS_COLLECTION, {'_id': TOTALS_ID}, {'$inc': totals_inc})]
+
+    day = _day_key(doc)
+    if day:
+        updates.append((DAILY_COLLECTION, {'_id': day}, {'$inc': _inc(contribution, sign, COUNTER_FIELDS)}))
+
+    question_paper_id = doc.get('question_paper_id')
+    if question_paper_id is not None:
+        updates.append((
+            QUESTION_PAPERS_COLLECTION,
+            {'_id': str(question_paper_id)},
+            {'$inc': _inc(contribution, sign, COUNTER_FIELDS + MARK_FIELDS)}
+        ))
+
+    return updates
+
+def _student_update(doc: Dict[str, Any], sign: int) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    contribution = evaluation_contribution(doc)
+    inc = _inc(contribution, sign, COUNTER_FIELDS + MARK_FIELDS)
+    inc['version'] = 1
+    return {'_id': doc.get('student_id')}, {'$inc': inc}
+
+def _average(rollup: Dict[str, Any]) -> Optional[float]:
+    return rollup['score_sum'] / rollup['scored'] if rollup.get('scored') else None
+
+def _student_followups(student: Dict[str, Any], sign: int, count: int = 1) -> List[Tuple[str, Dict[str, Any], Dict[str, Any]]]:
+    """
+    Updates that depend on the student rollup after its $inc of count evaluations:
+    the active student count (first/last evaluation of a student) and the indexed avg_score.
+    """
+    followups = []
+    if sign > 0 and student.get('documents') == count:
+        followups.append((TOTALS_COLLECTION, {'_id': TOTALS_ID}, {'$inc': {'students': 1}}))
+    elif sign < 0 and student.get('documents') == 0:
+        followups.append((TOTALS_COLLECTION, {'_id': TOTALS_ID}, {'$inc': {'students': -1}}))
+
+    # Only the writer that produced this version sets the average; a newer $inc wins otherwise
+    followups.append((
+        STUDENTS_COLLECTION,
+        {'_id': student['_id'], 'version': student['version']},
+        {'$set': {'avg_score': _average(student)}}
+    ))
+    return followups
+
+def _merge_updates(updates: Iterable[Tuple[str, Dict[str, Any], Dict[str, Any]]]) -> List[Tuple[str, Dict[str, Any], Dict[str, Any]]]:
+    """Sum $inc updates that target the same rollup document"""
+    merged = {}
+    for collection, query, update in updates:
+        key = (collection, query['_id'])
+        if key not in merged:
+            merged[key] = (collection, query, {'$inc': {}})
+        inc = merged[key][2]['$inc']
+        for field, value in update['$inc'].items():
+            inc[field] = inc.get(field, 0) + value
+    return list(merged.values())
+
+def update_rollups(db, doc: Dict[str, Any], sign: int = 1):
+    """Apply an inserted (sign=1) or deleted (sign=-1) evaluation to the rollups (pymongo)"""
+    try:
+        for collection, query, update in rollup_updates(doc, sign):
+            db[collection].update_one(query, update, upsert=True)
+
+        query, update = _student_update(doc, sign)
+        student = db[STUDENTS_COLLECTION].find_one_and_update(
+            query, update, upsert=True, return_document=ReturnDocument.AFTER
+        )
+        for collection, query, update in _student_followups(student, sign):
+            db[collection].update_one(query, update)
+
+    except Exception as e:
+        logger.warning(f"Could not update analytics rollups (run the rebuild to repair): {e}")
+    finally:
+        invalidate(EVALUATIONS)
+
+async def update_rollups_async(db, doc: Dict[str, Any], sign: int = 1):
+    """update_rollups for route handlers (Motor database)"""
+    try:
+        for collection, query, update in rollup_updates(doc, sign):
+            await db[collection].update_one(query, update, upsert=True)
+
+        query, update = _student_update(doc, sign)
+        student = await db[STUDENTS_COLLECTION].find_one_and_update(
+            query, update, upsert=True, return_document=ReturnDocument.AFTER
+        )
+        for collection, query, update in _student_followups(student, sign):
+            await db[collection].update_one(query, update)
+
+    except Exception as e:
+        logger.warning(f"Could not update analytics rollups (run the rebuild to repair): {e}")
+    finally:
+        invalidate(EVALUATIONS)
+
+async def update_rollups_many_async(db, docs: List[Dict[str, Any]], sign: int = 1):
+    """
+    update_rollups_async for a batch: contributions to the same rollup document
+    are summed first, so the round trips grow with the distinct days, papers and
+    students in the batch rather than with its size.
+    """
+    if not docs:
+        return
+    try:
+        operations = defaultdict(list)
+        for collection, query, update in _merge_updates(update for doc in docs for update in rollup_updates(doc, sign)):
+            operations[collection].append(UpdateOne(query, update, upsert=True))
+        await asyncio.gather(*(
+            db[collection].bulk_write(ops, ordered=False) for collection, ops in operations.items()
+        ))
+
+        counts = defaultdict(int)
+        for doc in docs:
+            counts[doc.get('student_id')] += 1
+        student_updates = _merge_updates(
+            (STUDENTS_COLLECTION, *_student_update(doc, sign)) for doc in docs
+        )
+        students = await asyncio.gather(*(
+            db[STUDENTS_COLLECTION].find_one_and_update(
+                query, update, upsert=True, return_document=ReturnDocument.AFTER
+            )
+            for _, query, update in student_updates
+        ))
+        for student in students:
+            for collection, query, update in _student_followups(student, sign, counts[student['_id']]):
+                await db[collection].update_one(query, update)
+
+    except Exception as e:
+        logger.warning(f"Could not update analytics rollups (run the rebuild to repair): {e}")
+    finally:
+        invalidate(EVALUATIONS)
+
+def rebuild_rollups(db, batch_size: int = 1000) -> Dict[str, int]:
+    """
+    Recompute every rollup from the evaluations collection.
+
+    Results are written to *_rebuild collections and renamed over the live
+    ones, so dashboards never see a half-built rollup. Evaluations written
+    while the rebuild runs may be missed; re-run it after bulk imports.
+    """
+    totals = defaultdict(float)
+    histogram = defaultdict(int)
+    daily = defaultdict(lambda: defaultdict(float))
+    students = defaultdict(lambda: defaultdict(float))
+    question_papers = defaultdict(lambda: defaultdict(float))
+
+    for doc in db.evaluations.find({}, EVALUATION_FIELDS, batch_size=batch_size):
+        contribution = evaluation_contribution(doc)
+        for field in COUNTER_FIELDS:
+            totals[field] += contribution[field]
+        for bucket, count in contribution['histogram'].items():
+            histogram[bucket] += count
+
+        day = _day_key(doc)
+        if day:
+            for field in COUNTER_FIELDS:
+                daily[day][field] += contribution[field]
+
+        rollups = [students[doc.get('student_id')]]
+        if doc.get('question_paper_id') is not None:
+            rollups.append(question_papers[str(doc['question_paper_id'])])
+        for rollup in rollups:
+            for field in COUNTER_FIELDS + MARK_FIELDS:
+                rollup[field] += contribution[field]
+
+    def document(key, counters, **extra):
+        doc = {'_id': key, **{field: counters.get(field, 0) for field in counters}, **extra}
+        for field in ('documents', 'questions', 'scored'):
+            doc[field] = int(doc.get(field, 0))
+        return doc
+
+    rebuilt = {
+        TOTALS_COLLECTION: [document(
+            TOTALS_ID, totals,
+            histogram={bucket: histogram.get(bucket, 0) for bucket in HISTOGRAM_BUCKETS},
+            students=len(students)
+        )],
+        DAILY_COLLECTION: [document(day, counters) for day, counters in daily.items()],
+        STUDENTS_COLLECTION: [
+            document(student_id, counters, avg_score=_average(counters), version=0)
+            for student_id, counters in students.items()
+        ],
+        QUESTION_PAPERS_COLLECTION: [document(paper_id, counters) for paper_id, counters in question_papers.items()]
+    }
+
+    for name, docs in rebuilt.items():
+        staging = db[f'{name}_rebuild']
+        staging.drop()
+        if not docs:
+            db[name].delete_many({})
+            continue
+        for start in range(0, len(docs), batch_size):
+            staging.insert_many(docs[start:start + batch_size])
+        staging.rename(name, dropTarget=True)
+
+    # rename replaces the collection and its indexes
+    create_rollup_indexes(db)
+
+    counts = {name: len(docs) for name, docs in rebuilt.items()}
+    logger.info(f"Rebuilt analytics rollups from {int(totals['documents'])} evaluations: {counts}")
+    return counts
+
+def create_rollup_indexes(db):
+    """Indexes the dashboards read the rollups through"""
+    db[STUDENTS_COLLECTION].create_index([("avg_score", -1)])
+    db[QUESTION_PAPERS_COLLECTION].create_index([("documents", -1)])
+
+def main():
+    parser = argparse.ArgumentParser(description="Analytics rollup maintenance")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute all rollups from the evaluations collection")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if not args.rebuild:
+        parser.print_help()
+        return
+
+    from mongoDB.db_config import get_db
+    counts = rebuild_rollups(get_db(), args.batch_size)
+    for name, count in counts.items():
+        print(f"{name}: {count} documents")
+
+if __name__ == "__main__":
+    main()
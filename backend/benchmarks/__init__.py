@@ -0,0 +1 @@
+# Benchmark scripts for measuring pipeline throughput and latency
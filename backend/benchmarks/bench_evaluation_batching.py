@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Evaluation Batching Benchmark
+Compares per-question evaluation (one Gemini request per Q&A pair) against
+batched evaluation (K pairs per request) on request count and wall time.
+
+Gemini is replaced by the local fake model (llm/fake_model.py) whose latency
+is a fixed round-trip cost plus a per-output-token cost, so the benchmark needs
+no API key. --invalid-rate makes the fake corrupt some batched items to
+exercise the per-question fallback. Run from the backend directory:
+
+    python -m benchmarks.bench_evaluation_batching --questions 25 --batch-sizes 1,5,10
+"""
+
+import argparse
+import json
+import random
+import time
+
+from config import Config
+
+def make_qa_pairs(count: int) -> list:
+    return [
+        {
+            "questionNumber": f"Q{i}",
+            "questionText": f"Explain concept number {i} and give an example.",
+            "answer": f"Concept {i} is defined as ... For example, ... " * 8,
+            "maxMarks": 10 if i % 3 else 5
+        }
+        for i in range(1, count + 1)
+    ]
+
+def corrupting_responder(invalid_rate: float):
+    """Default fake responses, with some batched items pushed over their criterion maximum"""
+    from llm.fake_model import default_responder
+
+    rng = random.Random(7)
+
+    def respond(prompt: str) -> str:
+        text = default_responder(prompt)
+        if '"evaluations"' not in text or not invalid_rate:
+            return text
+        payload = json.loads(text)
+        for entry in payload["evaluations"]:
+            if rng.random() < invalid_rate:
+                entry["evaluation"]["rubric_scores"]["accuracy"]["score"] += 5
+        return json.dumps(payload)
+
+    return respond
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluation batching benchmark")
+    parser.add_argument("--questions", type=int, default=25, help="Q&A pairs per answer sheet")
+    parser.add_argument("--batch-sizes", default="1,5,10", help="Comma separated K values; 1 is the per-question mode")
+    parser.add_argument("--round-trip", type=float, default=0.8, help="Simulated seconds per request")
+    parser.add_argument("--per-token", type=float, default=0.002, help="Simulated seconds per output token")
+    parser.add_argument("--invalid-rate", type=float, default=0.0, help="Fraction of batched items returned invalid")
+    args = parser.parse_args()
+
+    # The fake model is not subject to the real Gemini quota
+    Config.LLM_FAKE_MODEL = True
+    Config.GEMINI_REQUESTS_PER_MINUTE = 100000
+    Config.GEMINI_TOKENS_PER_MINUTE = 100000000
+
+    import evaluation.evaluator as evaluator
+    from llm.fake_model import FakeGeminiModel, set_fake_model
+
+    qa_pairs = make_qa_pairs(args.questions)
+    print(f"Questions: {args.questions}, round trip: {args.round_trip}s, per token: {args.per_token}s, "
+          f"invalid rate: {args.invalid_rate}")
+    print(f"{'K':>4}{'requests':>10}{'fallbacks':>11}{'elapsed s':>11}{'score':>8}")
+
+    for k in (int(x) for x in args.batch_sizes.split(",")):
+        fake = FakeGeminiModel(
+            latency=args.round_trip,
+            jitter=0.0,
+            per_token_latency=args.per_token,
+            responder=corrupting_responder(args.invalid_rate)
+        )
+        set_fake_model(fake)
+        fallbacks_before = evaluator.overall_run_batch_fallbacks
+
+        start = time.perf_counter()
+        report = evaluator.evaluate_and_generate_report(qa_pairs, batch_size=k)
+        elapsed = time.perf_counter() - start
+
+        print(f"{k:>4}{fake.requests:>10}{evaluator.overall_run_batch_fallbacks - fallbacks_before:>11}"
+              f"{elapsed:>11.2f}{report['summary']['totalObtained']:>8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Page Image Profile Benchmark
+Compares image preparation settings on a local fixture set: encoded bytes,
+image tokens billed by Gemini, and OCR quality against a reference transcript.
+
+Fixtures are PDFs or images in one directory. A sibling <name>.txt holds the
+reference transcript; without one, the OCR output of the 300 DPI PNG baseline
+is used as the reference. Run from the backend directory:
+
+    # Bytes and estimated tokens only (no API key needed)
+    python -m benchmarks.bench_image_profiles --fixtures fixtures/answer_sheets
+
+    # Real OCR, token counts from usage metadata and quality vs reference
+    python -m benchmarks.bench_image_profiles --fixtures fixtures/answer_sheets --ocr
+
+    # Extra candidate settings, merged over the document type's profile
+    python -m benchmarks.bench_image_profiles --fixtures fixtures/papers --doc-type question_paper \\
+        --settings '{"dpi150-jpeg": {"format": "JPEG", "binarize": false}}'
+"""
+
+import argparse
+import difflib
+import io
+import json
+import math
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from PIL import Image
+
+from imaging.pdf_pages import iter_pdf_pages
+from imaging.preparation import ANSWER_SHEET, BASELINE_PROFILE, DEFAULT_PROFILES, PRESETS, get_profile, prepare_and_encode
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp", ".webp"}
+
+# Gemini bills small images as one 258-token tile; larger ones per 768px tile
+TILE_TOKENS = 258
+TILE_SIZE = 768
+
+# Unprocessed reference setting: what the pipeline sent before profiles existed
+def estimate_image_tokens(width: int, height: int) -> int:
+    """Approximate Gemini image token cost for a width x height image"""
+    if width <= 384 and height <= 384:
+        return TILE_TOKENS
+    return math.ceil(width / TILE_SIZE) * math.ceil(height / TILE_SIZE) * TILE_TOKENS
+
+def iter_fixture_pages(path: Path, dpi: int) -> Iterator[Image.Image]:
+    """Yield rendered pages for a PDF, or the image itself"""
+    if path.suffix.lower() == ".pdf":
+        for _, img in iter_pdf_pages(str(path), dpi=dpi):
+            yield img
+    else:
+        with Image.open(path) as img:
+            img.load()
+            yield img.copy()
+
+def encode_fixture(path: Path, profile: Dict) -> Tuple[List[Tuple[bytes, str]], int, float]:
+    """Prepare every page of a fixture; returns (encoded pages, estimated tokens, seconds)"""
+    pages = []
+    tokens = 0
+    start = time.perf_counter()
+    for img in iter_fixture_pages(path, profile["dpi"]):
+        img_bytes, mime_type = prepare_and_encode(img, profile)
+        img.close()
+        with Image.open(io.BytesIO(img_bytes)) as encoded:
+            tokens += estimate_image_tokens(*encoded.size)
+        pages.append((img_bytes, mime_type))
+    return pages, tokens, time.perf_counter() - start
+
+def ocr_fixture(pages: List[Tuple[bytes, str]], label: str) -> Tuple[str, int]:
+    """OCR encoded pages, bypassing the result cache; returns (text, input tokens)"""
+    from ocr.ocr_processor import ocr_single_image
+
+    texts = []
+    input_tokens = 0
+    for i, (img_bytes, mime_type) in enumerate(pages, 1):
+        text, usage = ocr_single_image(img_bytes, f"{label} page {i}", mime_type)
+        texts.append(text)
+        input_tokens += usage.get("input_tokens", 0)
+    return "\n".join(texts), input_tokens
+
+def similarity(a: str, b: str) -> float:
+    """Word-level diff ratio; 1.0 means identical transcripts"""
+    return difflib.SequenceMatcher(None, a.split(), b.split(), autojunk=False).ratio()
+
+def main():
+    parser = argparse.ArgumentParser(description="Page image profile benchmark")
+    parser.add_argument("--fixtures", required=True, help="Directory of PDFs/images with optional <name>.txt references")
+    parser.add_argument("--doc-type", default=ANSWER_SHEET, choices=sorted(DEFAULT_PROFILES), help="Profile to start from")
+    parser.add_argument("--settings", help="JSON object of name -> profile overrides to compare")
+    parser.add_argument("--ocr", action="store_true", help="Run Gemini OCR to measure real tokens and quality")
+    args = parser.parse_args()
+
+    fixtures = sorted(
+        p for p in Path(args.fixtures).iterdir()
+        if p.suffix.lower() == ".pdf" or p.suffix.lower() in IMAGE_SUFFIXES
+    )
+    if not fixtures:
+        parser.error(f"No PDF or image fixtures in {args.fixtures}")
+
+    profile = get_profile(args.doc_type)
+    candidates = {"baseline": BASELINE_PROFILE}
+    candidates.update({name: presets[args.doc_type] for name, presets in PRESETS.items()})
+    if profile != BASELINE_PROFILE:
+        candidates["configured"] = profile
+    if args.settings:
+        for name, overrides in json.loads(args.settings).items():
+            candidates[name] = {**profile, **overrides}
+
+    print(f"Fixtures: {len(fixtures)} from {args.fixtures}, doc type: {args.doc_type}")
+    for name, settings in candidates.items():
+        print(f"  {name}: {json.dumps(settings, sort_keys=True)}")
+
+    references: Dict[str, str] = {}
+    for path in fixtures:
+        ref = path.with_suffix(".txt")
+        if ref.exists():
+            references[path.name] = ref.read_text(encoding="utf-8")
+
+    header = f"{'setting':<20}{'KB':>10}{'est tokens':>12}{'prep s':>9}"
+    if args.ocr:
+        header += f"{'input tokens':>14}{'quality':>9}"
+    print(header)
+
+    for name, settings in candidates.items():
+        total_bytes = 0
+        total_est = 0
+        total_prep = 0.0
+        total_input = 0
+        scores = []
+
+        for path in fixtures:
+            pages, est_tokens, prep_s = encode_fixture(path, settings)
+            total_bytes += sum(len(b) for b, _ in pages)
+            total_est += est_tokens
+            total_prep += prep_s
+
+            if args.ocr:
+                text, input_tokens = ocr_fixture(pages, f"{path.name} [{name}]")
+                total_input += input_tokens
+                if name == "baseline" and path.name not in references:
+                    references[path.name] = text
+                if path.name in references:
+                    scores.append(similarity(references[path.name], text))
+
+        row = f"{name:<20}{total_bytes / 1024:>10.1f}{total_est:>12}{total_prep:>9.2f}"
+        if args.ocr:
+            quality = sum(scores) / len(scores) if scores else float("nan")
+            row += f"{total_input:>14}{quality:>9.3f}"
+        print(row)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+MongoDB Access Benchmark
+Request latency (p50/p99) under a mixed concurrent load, comparing the old
+route style (blocking pymongo calls inside async handlers) with the async
+Motor layer in mongoDB/async_db.py.
+
+Requests arrive at a fixed rate (open loop) and each one runs a query shaped
+like a real route: get evaluation by id, list a page of evaluations, the
+analytics overview counts, upload stats and an evaluation insert. Latency is
+measured from the scheduled arrival time, so time spent waiting for a blocked
+event loop is included. Run from the backend directory against a MongoDB
+server; a scratch database is seeded and dropped afterwards:
+
+    python -m benchmarks.bench_mongo_access --requests 2000 --rate 400
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from pymongo import MongoClient
+
+from config import Config
+
+# (name, weight) of the simulated routes
+WORKLOAD = [
+    ("get_evaluation", 40),
+    ("list_evaluations", 25),
+    ("overview", 15),
+    ("upload_stats", 10),
+    ("insert_evaluation", 10),
+]
+
+def make_evaluation(student_id: str, created_at: datetime) -> dict:
+    return {
+        "student_id": student_id,
+        "question_paper_id": "bench",
+        "evaluations": [{"percentage_score": random.randint(0, 100), "marks_obtained": 5, "max_marks": 10}
+                        for _ in range(5)],
+        "summary": {"total_marks": 25, "percentage": 50},
+        "ocr_text": "x" * 2000,
+        "created_at": created_at
+    }
+
+def seed(db, docs: int) -> list:
+    """Fill the scratch database; returns the evaluation ids"""
+    now = datetime.now()
+    students = [f"student{i}" for i in range(50)]
+    evaluations = [make_evaluation(random.choice(students), now - timedelta(minutes=i)) for i in range(docs)]
+    ids = db.evaluations.insert_many(evaluations).inserted_ids
+    db.question_papers.insert_many([{"title": f"Paper {i}", "created_at": now} for i in range(50)])
+    db.upload_queue.insert_many([
+        {"user_id": random.choice(students), "status": random.choice(["queued", "completed", "failed"]),
+         "file_size": 1000, "created_at": now}
+        for _ in range(docs // 2)
+    ])
+    db.evaluations.create_index([("created_at", -1)])
+    db.evaluations.create_index([("student_id", 1)])
+    db.upload_queue.create_index([("user_id", 1)])
+    return ids
+
+class SyncRoutes:
+    """Queries as the routes issued them before: pymongo calls inside async handlers"""
+
+    def __init__(self, db, ids):
+        self.db = db
+        self.ids = ids
+
+    async def get_evaluation(self):
+        self.db.evaluations.find_one({"_id": random.choice(self.ids)})
+
+    async def list_evaluations(self):
+        query = {"student_id": f"student{random.randrange(50)}"}
+        list(self.db.evaluations.find(query).sort("created_at", -1).limit(20))
+        self.db.evaluations.count_documents(query)
+
+    async def overview(self):
+        self.db.evaluations.count_documents({})
+        self.db.evaluations.count_documents({"created_at": {"$gte": datetime.now() - timedelta(days=30)}})
+        self.db.evaluations.distinct("student_id")
+        self.db.question_papers.count_documents({})
+        self.db.upload_queue.count_documents({"status": "queued"})
+
+    async def upload_stats(self):
+        list(self.db.upload_queue.aggregate([
+            {"$match": {"user_id": f"student{random.randrange(50)}"}},
+            {"$group": {"_id": "$status", "count": {"$sum": 1}, "total_size": {"$sum": "$file_size"}}}
+        ]))
+
+    async def insert_evaluation(self):
+        self.db.evaluations.insert_one(make_evaluation("bench-writer", datetime.now()))
+
+class AsyncRoutes(SyncRoutes):
+    """The same queries on the Motor client, independent ones gathered like the routes do"""
+
+    async def get_evaluation(self):
+        await self.db.evaluations.find_one({"_id": random.choice(self.ids)})
+
+    async def list_evaluations(self):
+        query = {"student_id": f"student{random.randrange(50)}"}
+        await asyncio.gather(
+            self.db.evaluations.find(query).sort("created_at", -1).limit(20).to_list(length=20),
+            self.db.evaluations.count_documents(query)
+        )
+
+    async def overview(self):
+        await asyncio.gather(
+            self.db.evaluations.count_documents({}),
+            self.db.evaluations.count_documents({"created_at": {"$gte": datetime.now() - timedelta(days=30)}}),
+            self.db.evaluations.distinct("student_id"),
+            self.db.question_papers.count_documents({}),
+            self.db.upload_queue.count_documents({"status": "queued"})
+        )
+
+    async def upload_stats(self):
+        await self.db.upload_queue.aggregate([
+            {"$match": {"user_id": f"student{random.randrange(50)}"}},
+            {"$group": {"_id": "$status", "count": {"$sum": 1}, "total_size": {"$sum": "$file_size"}}}
+        ]).to_list(length=None)
+
+    async def insert_evaluation(self):
+        await self.db.evaluations.insert_one(make_evaluation("bench-writer", datetime.now()))
+
+async def run_load(routes, requests: int, rate: float) -> dict:
+    """Fire requests at a fixed arrival rate; returns latency percentiles in ms"""
+    names = [name for name, _ in WORKLOAD]
+    weights = [weight for _, weight in WORKLOAD]
+    latencies = []
+    errors = 0
+
+    async def handle(name: str, arrival: float):
+        nonlocal errors
+        try:
+            await getattr(routes, name)()
+        except Exception:
+            errors += 1
+        latencies.append((time.perf_counter() - arrival) * 1000)
+
+    start = time.perf_counter()
+    tasks = []
+    for i in range(requests):
+        arrival = start + i / rate
+        delay = arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(handle(random.choices(names, weights)[0], arrival)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "p50": statistics.median(latencies),
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "max": latencies[-1],
+        "throughput": requests / elapsed,
+        "errors": errors
+    }
+
+async def run_modes(modes, requests: int, rate: float):
+    # One loop for both modes: the Motor client binds to the loop of its first operation
+    for mode, routes in modes:
+        result = await run_load(routes, requests, rate)
+        print(f"{mode:<8}{result['p50']:>10.1f}{result['p99']:>10.1f}{result['max']:>10.1f}"
+              f"{result['throughput']:>10.1f}{result['errors']:>8}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync vs async MongoDB access under concurrent load")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per mode")
+    parser.add_argument("--rate", type=float, default=400, help="Arrivals per second")
+    parser.add_argument("--docs", type=int, default=5000, help="Evaluations to seed")
+    parser.add_argument("--database", default=f"{Config.DATABASE_NAME}_bench", help="Scratch database (dropped)")
+    args = parser.parse_args()
+
+    from mongoDB.async_db import async_mongo_db
+
+    sync_client = MongoClient(Config.MONGODB_URI, maxPoolSize=10)  # As configured in db_config.py
+    sync_db = sync_client[args.database]
+    async_db = async_mongo_db.client[args.database]
+
+    try:
+        random.seed(7)
+        ids = seed(sync_db, args.docs)
+        print(f"Seeded {args.docs} evaluations into {args.database}; {args.requests} requests at {args.rate}/s, "
+              f"async pool {Config.MONGODB_MIN_POOL_SIZE}-{Config.MONGODB_MAX_POOL_SIZE}")
+        print(f"{'mode':<8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}{'req/s':>10}{'errors':>8}")
+
+        asyncio.run(run_modes(
+            (("sync", SyncRoutes(sync_db, ids)), ("async", AsyncRoutes(async_db, ids))),
+            args.requests,
+            args.rate
+        ))
+    finally:
+        sync_client.drop_database(args.database)
+        sync_client.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+PDF Page Memory Benchmark
+Checks that OCR of a PDF (ocr_processor.iter_pdf_ocr_pages) and question paper
+parsing (question_paper.parser.parse_question_paper_async) hold a bounded
+number of rendered pages however long the document is.
+
+Rendering is replaced by a generator of synthetic encoded pages and the Gemini
+call by a sleep behind a small semaphore (the model's concurrency/rate limit),
+so the benchmark needs no poppler, API key or database. OCR/parse throughput
+is deliberately lower than rendering throughput, which is when an unbounded
+pipeline piles up pages. For each page count it reports the peak number of
+pages rendered but not yet OCR'd/parsed and the tracemalloc peak; both must
+stay flat, and the run fails if live pages exceed the configured bound. Run from the backend directory:
+
+    python -m benchmarks.bench_pdf_page_memory --pages 10,40,160 --page-kb 1024
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tracemalloc
+
+from config import Config
+
+class PageTracker:
+    """Counts synthetic pages between rendering and the end of their OCR/parse"""
+
+    def __init__(self, page_bytes: int, model_concurrency: int):
+        self.page_bytes = page_bytes
+        self.model_slots = asyncio.Semaphore(model_concurrency)
+        self.live = 0
+        self.peak = 0
+
+    def iter_page_images(self, pages: int):
+        for page_number in range(1, pages + 1):
+            self.live += 1
+            self.peak = max(self.peak, self.live)
+            yield page_number, os.urandom(self.page_bytes), "image/png"
+
+    async def process(self, seconds: float):
+        async with self.model_slots:
+            await asyncio.sleep(seconds)
+        self.live -= 1
+
+def measure(stage: str, pages: int, page_bytes: int, seconds: float, model_concurrency: int) -> dict:
+    import ocr.ocr_processor as ocr_processor
+    import question_paper.parser as parser
+
+    tracker = PageTracker(page_bytes, model_concurrency)
+
+    async def fake_ocr(img_bytes, label, mime_type="image/png"):
+        await tracker.process(seconds)
+        return "text", {}, False
+
+    async def fake_parse(img_bytes, page_num, mime_type="image/png"):
+        await tracker.process(seconds)
+        return []
+
+    async def run_ocr():
+        async for _ in ocr_processor.iter_pdf_ocr_pages("bench.pdf"):
+            pass
+
+    originals = (ocr_processor.iter_page_images, ocr_processor.ocr_page_async,
+                 parser.iter_page_images, parser.parse_page_questions_async)
+    ocr_processor.iter_page_images = parser.iter_page_images = lambda path: tracker.iter_page_images(pages)
+    ocr_processor.ocr_page_async = fake_ocr
+    parser.parse_page_questions_async = fake_parse
+    try:
+        tracemalloc.start()
+        asyncio.run(run_ocr() if stage == "ocr" else parser.parse_question_paper_async("bench.pdf"))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        (ocr_processor.iter_page_images, ocr_processor.ocr_page_async,
+         parser.iter_page_images, parser.parse_page_questions_async) = originals
+
+    return {"stage": stage, "pages": pages, "peak_live_pages": tracker.peak, "peak_mb": peak / (1024 * 1024)}
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF page memory benchmark")
+    parser.add_argument("--pages", default="10,40,160", help="Comma-separated page counts")
+    parser.add_argument("--page-kb", type=int, default=1024, help="Encoded size of each synthetic page")
+    parser.add_argument("--seconds", type=float, default=0.02, help="Simulated OCR/parse seconds per page")
+    parser.add_argument("--model-concurrency", type=int, default=2, help="Simulated concurrent model calls")
+    parser.add_argument("--in-flight", type=int, default=Config.OCR_PAGES_IN_FLIGHT, help="OCR_PAGES_IN_FLIGHT")
+    parser.add_argument("--parse-concurrency", type=int, default=Config.QUESTION_PAPER_PARSE_CONCURRENCY,
+                        help="QUESTION_PAPER_PARSE_CONCURRENCY")
+    args = parser.parse_args()
+
+    Config.OCR_PAGES_IN_FLIGHT = args.in_flight
+    Config.QUESTION_PAPER_PARSE_CONCURRENCY = args.parse_concurrency
+    bounds = {"ocr": args.in_flight, "parse": args.parse_concurrency}
+
+    print(f"Page size: {args.page_kb} KB, OCR pages in flight: {args.in_flight}, "
+          f"parse concurrency: {args.parse_concurrency}")
+    print(f"{'stage':<8}{'pages':>8}{'peak live pages':>18}{'peak MB':>10}")
+    failed = False
+    for stage in ("ocr", "parse"):
+        for pages in (int(p) for p in args.pages.split(",")):
+            r = measure(stage, pages, args.page_kb * 1024, args.seconds, args.model_concurrency)
+            print(f"{r['stage']:<8}{r['pages']:>8}{r['peak_live_pages']:>18}{r['peak_mb']:>10.1f}")
+            failed |= r["peak_live_pages"] > bounds[stage]
+
+    if failed:
+        print("FAIL: more pages held than the configured bound")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Pipeline Concurrency Benchmark
+Compares running the blocking pipeline inline on the event loop against
+running it on the bounded pipeline executor.
+
+Stage latencies are simulated with time.sleep so the benchmark needs no
+Gemini key or database. Run from the backend directory:
+
+    python -m benchmarks.bench_pipeline_concurrency --sheets 16 --workers 4
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from config import Config
+
+def fake_pipeline(ocr_s: float, mapping_s: float, evaluation_s: float) -> dict:
+    """Stand-in for pipeline.runner.run_pipeline with the same blocking profile"""
+    time.sleep(ocr_s)
+    time.sleep(mapping_s)
+    time.sleep(evaluation_s)
+    return {"text": "", "qa_pairs": [], "evaluation": {}}
+
+async def health_probe(stop: asyncio.Event, latencies: list, interval: float = 0.05):
+    """Measure how late a trivial coroutine (like /api/health) gets scheduled"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        latencies.append(max(time.perf_counter() - start - interval, 0.0))
+
+async def run_mode(mode: str, sheets: int, stage_times: tuple) -> dict:
+    from pipeline.executor import run_blocking
+
+    async def handle_sheet():
+        if mode == "inline":
+            return fake_pipeline(*stage_times)
+        return await run_blocking(fake_pipeline, *stage_times)
+
+    stop = asyncio.Event()
+    probe_latencies = []
+    probe = asyncio.create_task(health_probe(stop, probe_latencies))
+    await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(handle_sheet() for _ in range(sheets)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await probe
+
+    return {
+        "mode": mode,
+        "elapsed_s": elapsed,
+        "sheets_per_s": sheets / elapsed,
+        "health_p50_ms": statistics.median(probe_latencies) * 1000 if probe_latencies else 0.0,
+        "health_max_ms": max(probe_latencies) * 1000 if probe_latencies else 0.0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline concurrency benchmark")
+    parser.add_argument("--sheets", type=int, default=16, help="Concurrent answer sheets")
+    parser.add_argument("--workers", type=int, default=Config.PIPELINE_MAX_WORKERS, help="Pipeline executor size")
+    parser.add_argument("--ocr", type=float, default=0.5, help="Simulated OCR seconds per sheet")
+    parser.add_argument("--mapping", type=float, default=0.2, help="Simulated mapping seconds per sheet")
+    parser.add_argument("--evaluation", type=float, default=0.3, help="Simulated evaluation seconds per sheet")
+    args = parser.parse_args()
+
+    Config.PIPELINE_MAX_WORKERS = args.workers
+    stage_times = (args.ocr, args.mapping, args.evaluation)
+
+    print(f"Sheets: {args.sheets}, executor workers: {args.workers}, stage seconds: {stage_times}")
+    print(f"{'mode':<10}{'elapsed s':>12}{'sheets/s':>12}{'health p50 ms':>16}{'health max ms':>16}")
+    for mode in ("inline", "executor"):
+        r = asyncio.run(run_mode(mode, args.sheets, stage_times))
+        print(f"{r['mode']:<10}{r['elapsed_s']:>12.2f}{r['sheets_per_s']:>12.2f}"
+              f"{r['health_p50_ms']:>16.2f}{r['health_max_ms']:>16.2f}")
+
+    from pipeline.executor import shutdown_executor
+    shutdown_executor()
+
+if __name__ == "__main__":
+    main()
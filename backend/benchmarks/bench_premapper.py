@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Pre-Mapper Benchmark
+Measures Gemini mapping calls avoided by the rule-based pre-mapper
+(qna_mapping/premapper.py) and how often its answers agree with a reference
+mapping.
+
+Fixtures are JSON files in one directory, one answer sheet each:
+
+    {"questions": [{"id": "Q1a", "parent_id": "Q1", "part": "a", "text": "...", "marks": 5}, ...],
+     "text": "<OCR text>",
+     "expected": {"Q1a": "<reference answer>", ...}}
+
+Without --fixtures a synthetic corpus is generated in the labelling styles
+seen on real sheets (Q1 a), 1(a), Ans 3., labels without punctuation, numbered
+lists inside answers labelled either way, revisited and mislabelled answers,
+unlabelled sheets). The synthetic sheets use the label styles the pre-mapper
+parses, so their agreement only checks the segmentation logic; the numbers
+that justify enabling PREMAPPER_ENABLED come from a --fixtures run on real,
+hand-mapped sheets. Gemini is replaced by the local fake model, so no API key
+is needed. Run from the backend directory:
+
+    python -m benchmarks.bench_premapper --sheets 200
+    python -m benchmarks.bench_premapper --fixtures fixtures/mapping
+"""
+
+import argparse
+import difflib
+import json
+import random
+import re
+from pathlib import Path
+from typing import Any, Dict, List
+
+from config import Config
+
+STYLES = ("prefixed", "answer", "unpunctuated", "bare", "lists", "bare_lists", "revisit", "mislabelled", "unlabelled")
+
+WORDS = ("quality testing defects process model design review metric risk cost schedule "
+         "requirement module system user data cluster pattern rule support confidence").split()
+
+def make_paper(rng: random.Random) -> List[Dict[str, Any]]:
+    """Simple-format questions (question_paper.parser.convert_to_simple_format) with some multi-part questions"""
+    questions = []
+    for number in range(1, rng.randint(4, 8) + 1):
+        parts = "ab" if rng.random() < 0.5 else ""
+        for part in parts or [""]:
+            questions.append({
+                "id": f"Q{number}{part}", "text": f"Question {number}{part}", "marks": 5 if part else 10,
+                "parent_id": f"Q{number}" if part else None, "part": part or None
+            })
+    return questions
+
+def make_answer(rng: random.Random, with_list: bool) -> str:
+    sentences = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 14))).capitalize() + "."
+                 for _ in range(rng.randint(1, 4))]
+    if with_list:
+        sentences += [f"{i}. {rng.choice(WORDS)} {rng.choice(WORDS)}" for i in range(1, rng.randint(2, 4) + 1)]
+    return "\n".join(sentences)
+
+def make_sheet(rng: random.Random, style: str) -> Dict[str, Any]:
+    """One synthetic sheet in the given labelling style, with its reference answers"""
+    questions = make_paper(rng)
+    answered = [q for q in questions if rng.random() < 0.85] or questions[:1]
+    expected = {q["id"]: make_answer(rng, style in ("lists", "bare_lists")) for q in answered}
+
+    def label(q):
+        number, part = re.match(r"Q(\d+)(\w?)", q["id"]).groups()
+        if style == "unlabelled":
+            return ""
+        if style in ("bare", "bare_lists"):
+            return f"{number}({part}) " if part else f"{number}. "
+        if style == "answer":
+            return f"Ans {number} {part + ') ' if part else '. '}"
+        if style == "unpunctuated":
+            return f"Q{number} {part + ' ' if part else ''}"
+        return f"Q{number} {part + ') ' if part else '. '}"
+
+    blocks = [f"{label(q)}{expected[q['id']]}" for q in answered]
+    if style == "revisit" and len(answered) > 1:
+        q = answered[0]
+        addition = make_answer(rng, False)
+        blocks.append(f"{label(q)}{addition}")
+        expected[q["id"]] += f"\n\n{addition}"
+    if style == "mislabelled":
+        blocks.append(f"Q{len(questions) + 3}. {make_answer(rng, False)}")  # Number the paper does not have
+
+    pages, page = [], []
+    for block in blocks:
+        page.append(block)
+        if rng.random() < 0.4:
+            pages.append(page)
+            page = []
+    pages.append(page)
+    text = "Name: Student\nRoll No: 42\n\n" + "".join(
+        f"## Page {i}\n\n" + "\n".join(page) + "\n\n---\n\n" for i, page in enumerate(pages, 1) if page
+    )
+    return {"style": style, "questions": questions, "text": text, "expected": expected}
+
+def load_fixtures(directory: str) -> List[Dict[str, Any]]:
+    sheets = []
+    for path in sorted(Path(directory).glob("*.json")):
+        with open(path, "r", encoding="utf-8") as f:
+            sheet = json.load(f)
+        sheet.setdefault("style", path.stem)
+        sheets.append(sheet)
+    return sheets
+
+def agrees(answer: str, reference: str, threshold: float) -> bool:
+    normalize = lambda s: " ".join(s.lower().split())
+    return difflib.SequenceMatcher(None, normalize(answer), normalize(reference)).ratio() >= threshold
+
+def main():
+    parser = argparse.ArgumentParser(description="Rule-based pre-mapper benchmark")
+    parser.add_argument("--fixtures", help="Directory of JSON answer sheets (default: synthetic corpus)")
+    parser.add_argument("--sheets", type=int, default=160, help="Synthetic sheets to generate")
+    parser.add_argument("--min-confidence", type=float, default=Config.PREMAPPER_MIN_CONFIDENCE)
+    parser.add_argument("--agreement", type=float, default=0.9, help="Text similarity counted as the same answer")
+    args = parser.parse_args()
+
+    # The fake model is not subject to the real Gemini quota
+    Config.LLM_FAKE_MODEL = True
+    Config.GEMINI_REQUESTS_PER_MINUTE = 100000
+    Config.GEMINI_TOKENS_PER_MINUTE = 100000000
+    Config.PREMAPPER_MIN_CONFIDENCE = args.min_confidence
+
+    from llm.fake_model import FakeGeminiModel, set_fake_model
+    from qna_mapping.mapper import map_questions_to_answers
+    from qna_mapping.premapper import premap
+
+    rng = random.Random(11)
+    sheets = load_fixtures(args.fixtures) if args.fixtures else [
+        make_sheet(rng, STYLES[i % len(STYLES)]) for i in range(args.sheets)
+    ]
+
+    rows: Dict[str, Dict[str, int]] = {}
+    for sheet in sheets:
+        row = rows.setdefault(sheet["style"], {
+            "sheets": 0, "fallbacks": 0, "baseline_calls": 0, "calls": 0,
+            "expected": 0, "premapped": 0, "agree": 0
+        })
+        row["sheets"] += 1
+        row["expected"] += len(sheet["expected"])
+
+        for enabled, counter in ((False, "baseline_calls"), (True, "calls")):
+            Config.PREMAPPER_ENABLED = enabled
+            fake = FakeGeminiModel(latency=0.0, jitter=0.0)
+            set_fake_model(fake)
+            map_questions_to_answers(sheet["text"], sheet["questions"])
+            row[counter] += fake.requests
+
+        premapping = premap(sheet["text"], sheet["questions"])
+        if premapping.confidence < args.min_confidence:
+            row["fallbacks"] += 1
+            continue
+        for answer in premapping.trusted(args.min_confidence):
+            row["premapped"] += 1
+            row["agree"] += agrees(answer.answer, sheet["expected"].get(answer.question_id, ""), args.agreement)
+
+    print(f"Sheets: {len(sheets)}, min confidence: {args.min_confidence}, agreement at similarity >= {args.agreement}")
+    print(f"{'style':<14}{'sheets':>8}{'fallback':>10}{'calls off':>11}{'calls on':>10}{'avoided':>9}"
+          f"{'premapped':>11}{'of answers':>12}{'agreement':>11}")
+    totals = {key: sum(row[key] for row in rows.values()) for key in next(iter(rows.values()))}
+    for style, row in list(rows.items()) + [("total", totals)]:
+        avoided = 1 - row["calls"] / row["baseline_calls"] if row["baseline_calls"] else 0.0
+        coverage = row["premapped"] / row["expected"] if row["expected"] else 0.0
+        agreement = row["agree"] / row["premapped"] if row["premapped"] else 0.0
+        print(f"{style:<14}{row['sheets']:>8}{row['fallbacks']:>10}{row['baseline_calls']:>11}{row['calls']:>10}"
+              f"{avoided:>9.0%}{row['premapped']:>11}{coverage:>12.0%}{agreement:>11.1%}")
+
+if __name__ == "__main__":
+    main()
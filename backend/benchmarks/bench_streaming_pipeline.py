@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Streaming Pipeline Benchmark
+Runs one multi-page answer sheet through the batch stages (OCR the whole
+sheet, map it, evaluate) and through the streaming pipeline
+(pipeline/streaming.py), reports the wall time of each and checks that both
+produce the same Q&A pairs.
+
+OCR is replaced by synthetic pages whose answers run across page breaks, and
+Gemini by the local fake model. Its mapping responder extracts the answers
+labelled in the text, and attaches the text's first answer to every question
+it is shown but cannot find: the mis-mapping that sending a segment the whole
+question paper invites. Each segment must therefore be mapped against only
+the questions it answers for the pairs to match. The run fails on any
+difference. pipeline.runner connects to MONGODB_URI on import (nothing is
+written). Run from the backend directory:
+
+    python -m benchmarks.bench_streaming_pipeline --pages 8 --questions 12
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+from config import Config
+
+SHEET_MARKER = "Here is the student's answer sheet text:\n```\n"
+
+def make_pages(page_count: int, question_count: int) -> list:
+    """Answer every question in order, then cut the sheet into pages mid-answer"""
+    rng = random.Random(11)
+    lines = []
+    for number in range(1, question_count + 1):
+        lines.append(f"Q{number}) Answer to question {number}.")
+        lines.extend(f"Point {i} about topic {number}." for i in range(rng.randint(3, 12)))
+    per_page = -(-len(lines) // page_count)
+    return ["\n".join(lines[i:i + per_page]) for i in range(0, len(lines), per_page)]
+
+def mapping_responder(prompt: str) -> str:
+    """Answers by label for the questions in the prompt; unfound questions get the first answer"""
+    import json
+    from llm.fake_model import QUESTION_ID_RE, default_responder
+    from qna_mapping.chunking import PAGE_HEADER_RE, QUESTION_MARKER_RE
+
+    if "mapped_answers" not in prompt or SHEET_MARKER not in prompt:
+        return default_responder(prompt)
+    paper, rest = prompt.split(SHEET_MARKER, 1)
+    sheet = PAGE_HEADER_RE.sub("", rest.split("\n```", 1)[0])
+
+    answers = {}
+    markers = list(QUESTION_MARKER_RE.finditer(sheet))
+    for marker, following in zip(markers, markers[1:] + [None]):
+        text = " ".join(sheet[marker.start():following.start() if following else len(sheet)].split())
+        question_id = f"Q{marker.group('number')}"
+        answers[question_id] = f"{answers[question_id]} {text}" if question_id in answers else text
+
+    first = next(iter(answers.values()), "")
+    return json.dumps({"selected_choices": {}, "mapped_answers": [
+        {"question_id": qid, "question_text": f"Question {qid}", "student_answer_extracted": answers.get(qid, first)}
+        for qid in dict.fromkeys(QUESTION_ID_RE.findall(paper))
+    ]})
+
+def run(pages: list, questions: list, ocr_seconds: float) -> dict:
+    import pipeline.streaming as streaming
+    from evaluation.evaluator import evaluate_and_generate_report_async
+    from llm.client import get_llm_client
+    from ocr.ocr_processor import format_page_text
+    from qna_mapping.mapper import map_questions_to_answers_async
+
+    async def ocr_pages(path):
+        for page_number, text in enumerate(pages, 1):
+            await asyncio.sleep(ocr_seconds)
+            yield page_number, text, {"input_tokens": 0, "output_tokens": 0}, False
+
+    async def batch():
+        text = ""
+        async for page_number, page_text, _, _ in ocr_pages(None):
+            text += format_page_text(page_number, page_text)
+        qa_pairs = await map_questions_to_answers_async(text.strip(), questions)
+        await evaluate_and_generate_report_async(qa_pairs, "rubric")
+        return qa_pairs
+
+    streaming.iter_pdf_ocr_pages = ocr_pages
+    client = get_llm_client()
+
+    start = time.perf_counter()
+    batch_pairs = client.run(batch())
+    batch_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    streamed = client.run(streaming.run_pipeline_streaming("sheet.pdf", questions, "rubric"))
+    streaming_s = time.perf_counter() - start
+
+    pairs = lambda qa_pairs: [(p["questionNumber"], p["answer"]) for p in qa_pairs]
+    return {
+        "batch_s": batch_s,
+        "streaming_s": streaming_s,
+        "batch_pairs": pairs(batch_pairs),
+        "streaming_pairs": pairs(streamed["qa_pairs"])
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming pipeline benchmark")
+    parser.add_argument("--pages", type=int, default=8, help="Pages in the answer sheet")
+    parser.add_argument("--questions", type=int, default=12, help="Questions, all answered")
+    parser.add_argument("--ocr", type=float, default=0.3, help="Simulated OCR seconds per page")
+    parser.add_argument("--latency", type=float, default=0.3, help="Fake Gemini round trip seconds")
+    args = parser.parse_args()
+
+    from llm.fake_model import FakeGeminiModel, set_fake_model
+
+    Config.LLM_FAKE_MODEL = True
+    Config.EVALUATION_CACHE_ENABLED = False
+    Config.PREMAPPER_ENABLED = False
+    set_fake_model(FakeGeminiModel(latency=args.latency, jitter=0, responder=mapping_responder))
+
+    pages = make_pages(args.pages, args.questions)
+    questions = [{"id": f"Q{i}", "text": f"Explain topic {i}.", "marks": 10} for i in range(1, args.questions + 1)]
+    r = run(pages, questions, args.ocr)
+
+    print(f"Pages: {len(pages)}, questions: {args.questions}")
+    print(f"batch      {r['batch_s']:.2f}s")
+    print(f"streaming  {r['streaming_s']:.2f}s")
+    mismatched = [
+        question_id for question_id in dict.fromkeys(q for q, _ in r["batch_pairs"] + r["streaming_pairs"])
+        if dict(r["batch_pairs"]).get(question_id) != dict(r["streaming_pairs"]).get(question_id)
+    ]
+    if mismatched or len(r["batch_pairs"]) != len(r["streaming_pairs"]):
+        print(f"FAIL: streaming and batch pairs differ for {', '.join(mismatched) or 'pair count'}")
+        sys.exit(1)
+    print(f"Pairs match ({len(r['batch_pairs'])} questions)")
+
+if __name__ == "__main__":
+    main()
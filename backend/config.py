@@ -18,6 +18,7 @@ class Config:
     DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
     HOST = os.getenv('HOST', '0.0.0.0')
     PORT = int(os.getenv('PORT', 5000))
+    ENVIRONMENT = os.getenv('ENVIRONMENT', os.getenv('FLASK_ENV', 'development')).lower()
     
     # File Upload Configuration
     UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', 'uploads')
@@ -27,6 +28,13 @@ class Config:
     # Database Configuration
     MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/ai_evaluation_app')
     DATABASE_NAME = os.getenv('DATABASE_NAME', 'LMS_DATA')
+    # Async (Motor) connection pool used by the API routes, see mongoDB/async_db.py
+    MONGODB_MAX_POOL_SIZE = int(os.getenv('MONGODB_MAX_POOL_SIZE', 100))
+    MONGODB_MIN_POOL_SIZE = int(os.getenv('MONGODB_MIN_POOL_SIZE', 10))
+    MONGODB_MAX_IDLE_TIME_MS = int(os.getenv('MONGODB_MAX_IDLE_TIME_MS', 60000))
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv('MONGODB_WAIT_QUEUE_TIMEOUT_MS', 10000))  # Fail fast when the pool is exhausted
+    # OCR text and per-question details live in evaluation_details, see mongoDB/evaluation_store.py
+    EVALUATION_DETAIL_COMPRESSION = os.getenv('EVALUATION_DETAIL_COMPRESSION', 'zstd')  # zstd, zlib or none
     
     # API Keys
     GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
@@ -43,7 +51,76 @@ class Config:
     # Logging Configuration
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    
+
+    # Gemini Rate Limiting (shared by OCR, parser, mapper and evaluator)
+    GEMINI_REQUESTS_PER_MINUTE = int(os.getenv('GEMINI_REQUESTS_PER_MINUTE', 240))
+    GEMINI_TOKENS_PER_MINUTE = int(os.getenv('GEMINI_TOKENS_PER_MINUTE', 1000000))
+    RATE_LIMIT_BURST_SECONDS = float(os.getenv('RATE_LIMIT_BURST_SECONDS', 2))  # Bucket capacity in seconds of quota
+    # Lower number wins when stages compete; finishing in-flight sheets beats starting new ones
+    LLM_STAGE_PRIORITIES = {'evaluation': 0, 'mapping': 1, 'ocr': 2, 'parser': 3}
+
+    # Async LLM Client (one event loop for all Gemini calls, see llm/client.py)
+    LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 64))       # Calls in flight per process
+    LLM_TIMEOUT_SECONDS = float(os.getenv('LLM_TIMEOUT_SECONDS', 120))    # Per attempt
+    LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', 3))                # Total attempts per call
+    LLM_FAKE_MODEL = os.getenv('LLM_FAKE_MODEL', 'False').lower() == 'true'  # Local stand-in for Gemini; refused in production
+    # Prices (USD per million tokens) for the cost estimates of GET /api/analytics/usage
+    LLM_INPUT_COST_PER_MILLION = float(os.getenv('LLM_INPUT_COST_PER_MILLION', 0.15))
+    LLM_OUTPUT_COST_PER_MILLION = float(os.getenv('LLM_OUTPUT_COST_PER_MILLION', 0.60))
+
+    OCR_PAGES_IN_FLIGHT = int(os.getenv('OCR_PAGES_IN_FLIGHT', 8))  # Pages of one PDF rendered and awaiting OCR at once; bounds memory
+
+    # OCR Result Cache (content-addressed by page image bytes + prompt + model)
+    OCR_CACHE_ENABLED = os.getenv('OCR_CACHE_ENABLED', 'True').lower() == 'true'
+    OCR_CACHE_DIR = os.getenv('OCR_CACHE_DIR', os.path.join('cache', 'ocr'))
+    OCR_CACHE_MAX_BYTES = int(os.getenv('OCR_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))  # 256MB
+
+    # Question Paper Parsing; parses are cached in MongoDB by file bytes + prompt + model (see question_paper/parse_cache.py)
+    QUESTION_PAPER_PARSE_CONCURRENCY = int(os.getenv('QUESTION_PAPER_PARSE_CONCURRENCY', 16))  # Pages of one paper rendered and parsed at once
+    QUESTION_PAPER_PARSE_CACHE_ENABLED = os.getenv('QUESTION_PAPER_PARSE_CACHE_ENABLED', 'True').lower() == 'true'
+    QUESTION_PAPER_PARSE_CACHE_TTL_DAYS = int(os.getenv('QUESTION_PAPER_PARSE_CACHE_TTL_DAYS', 90))  # Since last use
+
+    # Analytics Response Cache (see analytics/cache.py)
+    ANALYTICS_CACHE_ENABLED = os.getenv('ANALYTICS_CACHE_ENABLED', 'True').lower() == 'true'
+    ANALYTICS_CACHE_TTL_SECONDS = float(os.getenv('ANALYTICS_CACHE_TTL_SECONDS', 30))  # Endpoint default; ANALYTICS_CACHE_TTL_<ENDPOINT> overrides
+    ANALYTICS_CACHE_MAX_ENTRIES = int(os.getenv('ANALYTICS_CACHE_MAX_ENTRIES', 1000))
+
+    # Prometheus metrics (GET /metrics, see monitoring/metrics.py)
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+    METRICS_QUEUE_DEPTH_TTL_SECONDS = float(os.getenv('METRICS_QUEUE_DEPTH_TTL_SECONDS', 10))  # Reuse the upload_queue count across scrapes
+
+    # Pipeline Configuration
+    PIPELINE_MAX_WORKERS = int(os.getenv('PIPELINE_MAX_WORKERS', 4))  # Concurrent answer sheets per process
+    PIPELINE_STREAMING = os.getenv('PIPELINE_STREAMING', 'False').lower() == 'true'  # Overlap OCR, mapping and evaluation
+    # Background pipeline jobs (POST /api/process-complete/jobs, see pipeline/jobs.py)
+    PIPELINE_JOB_TTL_SECONDS = float(os.getenv('PIPELINE_JOB_TTL_SECONDS', 3600))      # Finished jobs stay readable this long
+    PIPELINE_JOB_MAX_JOBS = int(os.getenv('PIPELINE_JOB_MAX_JOBS', 1000))              # Jobs kept per process, finished or not
+    PIPELINE_JOB_HEARTBEAT_SECONDS = float(os.getenv('PIPELINE_JOB_HEARTBEAT_SECONDS', 15))  # Idle keep-alive on event streams
+
+    # Q&A Mapping (see qna_mapping/chunking.py and qna_mapping/premapper.py)
+    MAPPING_CHUNK_MAX_CHARS = int(os.getenv('MAPPING_CHUNK_MAX_CHARS', 8000))  # Longer text is mapped in parallel chunks, 0 disables
+    PREMAPPER_ENABLED = os.getenv('PREMAPPER_ENABLED', 'False').lower() == 'true'  # Map clearly labelled answers without Gemini; enable after a fixture benchmark
+    PREMAPPER_MIN_CONFIDENCE = float(os.getenv('PREMAPPER_MIN_CONFIDENCE', 0.75))  # Per answer and per sheet
+
+    # Evaluation Configuration
+    EVALUATION_BATCH_SIZE = int(os.getenv('EVALUATION_BATCH_SIZE', 5))  # Questions per Gemini request, 1 disables batching
+    # Repeated answers are graded once (see evaluation/result_cache.py)
+    EVALUATION_CACHE_ENABLED = os.getenv('EVALUATION_CACHE_ENABLED', 'True').lower() == 'true'
+    EVALUATION_CACHE_TTL_SECONDS = float(os.getenv('EVALUATION_CACHE_TTL_SECONDS', 86400))
+    EVALUATION_CACHE_MAX_ENTRIES = int(os.getenv('EVALUATION_CACHE_MAX_ENTRIES', 20000))
+    # Bulk evaluation endpoint (POST /api/evaluate/bulk)
+    EVALUATION_BULK_MAX_ITEMS = int(os.getenv('EVALUATION_BULK_MAX_ITEMS', 500))      # Answer sheets per request
+    EVALUATION_BULK_CONCURRENCY = int(os.getenv('EVALUATION_BULK_CONCURRENCY', 16))   # Sheets graded at once; calls share the LLM limiter
+    EVALUATION_BULK_WRITE_BATCH = int(os.getenv('EVALUATION_BULK_WRITE_BATCH', 50))   # Graded sheets per insert_many
+
+    # Upload Queue Worker Configuration
+    WORKER_CONCURRENCY = int(os.getenv('WORKER_CONCURRENCY', 2))             # Jobs per worker process
+    WORKER_LEASE_SECONDS = int(os.getenv('WORKER_LEASE_SECONDS', 300))       # Lease before a job is re-claimable
+    WORKER_HEARTBEAT_SECONDS = int(os.getenv('WORKER_HEARTBEAT_SECONDS', 30))
+    WORKER_POLL_SECONDS = float(os.getenv('WORKER_POLL_SECONDS', 2))
+    WORKER_MAX_ATTEMPTS = int(os.getenv('WORKER_MAX_ATTEMPTS', 3))
+    WORKER_METRICS_PORT = int(os.getenv('WORKER_METRICS_PORT', 0))  # First worker process's /metrics port, 0 disables
+
     @classmethod
     def get_api_key(cls):
         """Get the appropriate API key for Gemini"""
@@ -59,6 +136,9 @@ class Config:
         
         if not cls.MONGODB_URI:
             issues.append("Missing MONGODB_URI")
+
+        if cls.LLM_FAKE_MODEL:
+            issues.append("LLM_FAKE_MODEL is on - Gemini is replaced by canned local responses")
         
         # Don't require these for development
         if cls.DEBUG:
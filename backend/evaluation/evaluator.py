@@ -1,14 +1,20 @@
 
 import os
+import asyncio
 import logging
 import json
 import time
 import re
+import copy
+import hashlib
 import markdown
 import google.generativeai as genai
 from dotenv import load_dotenv
-from tenacity import retry, stop_after_attempt, wait_fixed, RetryError
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from llm.client import ResponseRejected, get_llm_client
+from llm.rate_limiter import estimate_tokens
+from llm.usage import current_usage, track_usage, usage_summary
+from evaluation.result_cache import get_evaluation_cache
+from config import Config
 # EVALUATION_PROMPT import removed - using only rubric-based evaluation
 
 # Configure logging
@@ -19,23 +25,33 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 
 # Configure Gemini API
+MODEL_NAME = 'gemini-2.5-flash-preview-04-17'
 try:
     api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
     if not api_key:
         raise ValueError("No Gemini API key found. Set GOOGLE_API_KEY or GEMINI_API_KEY environment variable.")
     genai.configure(api_key=api_key)
-    MODEL_NAME = 'gemini-2.5-flash-preview-04-17'
     model = genai.GenerativeModel(model_name=MODEL_NAME)
     logger.info(f"Successfully initialized Gemini model for evaluation: {MODEL_NAME}")
 except Exception as e:
     logger.error(f"Error configuring Gemini API for evaluation: {e}")
     model = None
 
-# Global metrics
+# Output budget per evaluated question (a batch of K gets K times this)
+EVAL_MAX_OUTPUT_TOKENS = 1024
+RUBRIC_CRITERIA = ("accuracy", "completeness", "clarity", "depth")
+
+# Bump when the rubric or its scoring changes in a way the prompt text does not show;
+# cached evaluations are keyed by it (evaluation/result_cache.py)
+RUBRIC_PROMPT_VERSION = "1"
+
+# Process-wide metrics for get_evaluation_stats(); per-run usage is tracked by llm/usage.py
 overall_run_input_tokens = 0
 overall_run_output_tokens = 0
 overall_run_api_requests = 0
 overall_run_sheets_evaluated = 0
+overall_run_batch_requests = 0
+overall_run_batch_fallbacks = 0
 
 def get_gemini_model():
     """Initialize and return the Gemini model."""
@@ -71,54 +87,64 @@ def get_gemini_model():
 
 # generate_evaluation_prompt function removed - using only rubric-based evaluation
 
-@retry(
-    stop=stop_after_attempt(3),
-    wait=wait_fixed(1),
-    reraise=True
-)
-def make_gemini_call_with_retry(prompt_text, q_id="Unknown"):
+def _parse_evaluation_response(response):
     """
-    Makes a Gemini API call with retry logic and tracks token usage.
+    Extract the evaluation JSON from a Gemini response and track token usage.
+    Raises ResponseRejected (retried by the LLM client) when the response is unusable.
     """
-    global overall_run_api_requests, overall_run_input_tokens, overall_run_output_tokens
+    global overall_run_input_tokens, overall_run_output_tokens
+
+    # Track token usage
+    if hasattr(response, 'usage_metadata') and response.usage_metadata:
+        if hasattr(response.usage_metadata, 'prompt_token_count'):
+            overall_run_input_tokens += response.usage_metadata.prompt_token_count
+        if hasattr(response.usage_metadata, 'candidates_token_count'):
+            overall_run_output_tokens += response.usage_metadata.candidates_token_count
+
+    # Validate response
+    if not response.candidates:
+        raise ResponseRejected("Gemini API returned no candidates")
+    if not response.candidates[0].content.parts:
+        raise ResponseRejected("Gemini API returned no content parts")
+
+    full_response_text = ""
+    for part in response.candidates[0].content.parts:
+        if hasattr(part, 'text'):
+            full_response_text += part.text
+        else:
+            raise ResponseRejected(f"Non-text content part: {type(part)}")
+
+    # Extract JSON from response
+    json_start_index = full_response_text.find('{')
+    json_end_index = full_response_text.rfind('}')
+
+    if json_start_index == -1 or json_end_index == -1:
+        raise ResponseRejected("No complete JSON object found in response")
+
+    json_string = full_response_text[json_start_index : json_end_index + 1]
+    try:
+        return json.loads(json_string)
+    except json.JSONDecodeError as e:
+        raise ResponseRejected(f"Invalid JSON in response: {e}") from e
 
-    if not model:
-        raise Exception("Gemini model not initialized")
+async def make_gemini_call_with_retry(prompt_text, q_id="Unknown", max_output_tokens=EVAL_MAX_OUTPUT_TOKENS):
+    """
+    Makes a Gemini API call through the shared async LLM client
+    (rate limiting, timeout and jittered retries) and tracks token usage.
+    """
+    global overall_run_api_requests
 
     overall_run_api_requests += 1
 
     try:
-        response = model.generate_content(prompt_text)
-
-        # Track token usage
-        if hasattr(response, 'usage_metadata') and response.usage_metadata:
-            if hasattr(response.usage_metadata, 'prompt_token_count'):
-                overall_run_input_tokens += response.usage_metadata.prompt_token_count
-            if hasattr(response.usage_metadata, 'candidates_token_count'):
-                overall_run_output_tokens += response.usage_metadata.candidates_token_count
-
-        # Validate response
-        if not response.candidates:
-            raise ValueError("Gemini API returned no candidates")
-        if not response.candidates[0].content.parts:
-            raise ValueError("Gemini API returned no content parts")
-
-        full_response_text = ""
-        for part in response.candidates[0].content.parts:
-            if hasattr(part, 'text'):
-                full_response_text += part.text
-            else:
-                raise ValueError(f"Non-text content part: {type(part)}")
-
-        # Extract JSON from response
-        json_start_index = full_response_text.find('{')
-        json_end_index = full_response_text.rfind('}')
-
-        if json_start_index == -1 or json_end_index == -1:
-            raise ValueError("No complete JSON object found in response")
-
-        json_string = full_response_text[json_start_index : json_end_index + 1]
-        evaluation_data = json.loads(json_string)
+        evaluation_data = await get_llm_client().generate(
+            "evaluation",
+            model,
+            prompt_text,
+            estimated_tokens=estimate_tokens(prompt_text, max_output_tokens=max_output_tokens),
+            parse=_parse_evaluation_response,
+            label=f"evaluation {q_id}"
+        )
 
         logger.info(f"Successfully evaluated question {q_id}")
         return evaluation_data
@@ -127,7 +153,7 @@ def make_gemini_call_with_retry(prompt_text, q_id="Unknown"):
         logger.error(f"Error evaluating question {q_id}: {e}")
         raise
 
-def evaluate_single_question(question_data, evaluation_type="rubric"):
+async def evaluate_single_question(question_data, evaluation_type="rubric"):
     """
     Evaluates a single question-answer pair using rubric-based evaluation.
     
@@ -152,24 +178,31 @@ def evaluate_single_question(question_data, evaluation_type="rubric"):
         prompt = generate_rubric_evaluation_prompt(question_text, student_answer, max_marks)
 
         # Make API call
-        evaluation_result = make_gemini_call_with_retry(prompt, question_id)
+        evaluation_result = await make_gemini_call_with_retry(prompt, question_id)
         
         # Process and return result
         return process_evaluation_result(evaluation_result, question_data)
 
+    except asyncio.CancelledError:
+        raise
     except Exception as e:
         logger.error(f"Error evaluating question {question_data.get('questionNumber', 'Unknown')}: {e}")
         return create_error_evaluation(question_data, str(e))
 
 # BIGGEN evaluation removed - using only rubric-based evaluation as requested
 
-def generate_rubric_evaluation_prompt(question_text, student_answer_text, max_marks):
-    """Generate rubric-based evaluation prompt"""
-    # Calculate maximum scores for each criterion
+def rubric_max_scores(max_marks):
+    """Split a question's marks across the rubric criteria (40/30/20/rest)"""
     accuracy_max = round(max_marks * 0.4)
-    completeness_max = round(max_marks * 0.3) 
+    completeness_max = round(max_marks * 0.3)
     clarity_max = round(max_marks * 0.2)
     depth_max = max_marks - accuracy_max - completeness_max - clarity_max  # Ensure total equals max_marks
+    return accuracy_max, completeness_max, clarity_max, depth_max
+
+def generate_rubric_evaluation_prompt(question_text, student_answer_text, max_marks):
+    """Generate rubric-based evaluation prompt"""
+    # Calculate maximum scores for each criterion
+    accuracy_max, completeness_max, clarity_max, depth_max = rubric_max_scores(max_marks)
     
     return f"""You are evaluating using a structured rubric-based approach.
 Use clear criteria and scoring levels for consistent evaluation.
@@ -212,6 +245,178 @@ Provide your evaluation in the following JSON format. Do NOT include any text ou
     }}
 }}"""
 
+def generate_rubric_batch_prompt(items):
+    """
+    Generate one rubric prompt covering several questions.
+
+    Args:
+        items: List of (item_id, question_data) tuples
+
+    The rubric instructions are stated once; the model returns one evaluation
+    per item_id in the same shape as the single-question prompt.
+    """
+    blocks = []
+    for item_id, question_data in items:
+        question_text = question_data.get('questionText', question_data.get('question', ''))
+        max_marks = question_data.get('maxMarks', 10)
+        accuracy_max, completeness_max, clarity_max, depth_max = rubric_max_scores(max_marks)
+        blocks.append(f"""### Item {item_id}
+**Question ({max_marks} marks):**
+{question_text}
+
+**Student Answer:**
+{question_data.get('answer', '')}
+
+**Criterion maximums:** accuracy {accuracy_max}, completeness {completeness_max}, clarity {clarity_max}, depth {depth_max}""")
+
+    items_text = "\n\n".join(blocks)
+
+    return f"""You are evaluating {len(items)} student answers using a structured rubric-based approach.
+Use clear criteria and scoring levels for consistent evaluation. Evaluate every item
+independently; do not let one answer influence the score of another.
+
+**Rubric Levels:**
+- Excellent (90-100%): Exceeds expectations
+- Good (75-89%): Meets expectations with minor gaps
+- Satisfactory (60-74%): Meets basic expectations
+- Needs Improvement (40-59%): Below expectations
+- Unsatisfactory (0-39%): Far below expectations
+
+**Evaluation Criteria** (each item lists its own criterion maximums):
+1. **Accuracy**: Correctness of information
+2. **Completeness**: Coverage of all aspects
+3. **Clarity**: Clear communication
+4. **Depth**: Level of detail and insight
+
+{items_text}
+
+Provide your evaluation in the following JSON format, with exactly one entry per item id.
+Do NOT include any text outside the JSON block:
+
+{{
+    "evaluations": [
+        {{
+            "id": "<item id>",
+            "evaluation": {{
+                "max_marks": 0,
+                "rubric_scores": {{
+                    "accuracy": {{"score": 0, "max_score": 0, "level": "Excellent/Good/Satisfactory/Needs Improvement/Unsatisfactory", "justification": "Detailed explanation of scoring"}},
+                    "completeness": {{"score": 0, "max_score": 0, "level": "...", "justification": "..."}},
+                    "clarity": {{"score": 0, "max_score": 0, "level": "...", "justification": "..."}},
+                    "depth": {{"score": 0, "max_score": 0, "level": "...", "justification": "..."}}
+                }},
+                "total_score": 0,
+                "percentage": 0,
+                "overall_level": "Overall performance level",
+                "evaluation_type": "Rubric-Based",
+                "feedback": "Comprehensive feedback highlighting strengths and areas for improvement"
+            }}
+        }}
+    ]
+}}"""
+
+def validate_batch_evaluation(eval_data, max_marks):
+    """
+    Check one item of a batched response before trusting it.
+
+    Returns an error message, or None when the item is usable.
+    """
+    if not isinstance(eval_data, dict):
+        return "evaluation is not an object"
+
+    rubric_scores = eval_data.get('rubric_scores')
+    if not isinstance(rubric_scores, dict):
+        return "missing rubric_scores"
+
+    total = 0
+    for criterion, criterion_max in zip(RUBRIC_CRITERIA, rubric_max_scores(max_marks)):
+        data = rubric_scores.get(criterion)
+        if not isinstance(data, dict):
+            return f"missing criterion {criterion}"
+        score = data.get('score')
+        if not isinstance(score, (int, float)) or isinstance(score, bool):
+            return f"non-numeric score for {criterion}"
+        if score < 0 or score > criterion_max:
+            return f"{criterion} score {score} outside 0-{criterion_max}"
+        total += score
+
+    total_score = eval_data.get('total_score', total)
+    if not isinstance(total_score, (int, float)) or isinstance(total_score, bool):
+        return "non-numeric total_score"
+    if total_score < 0 or total_score > max_marks:
+        return f"total_score {total_score} outside 0-{max_marks}"
+
+    return None
+
+async def evaluate_batch(batch, evaluation_type="rubric"):
+    """
+    Evaluate several Q&A pairs with a single Gemini request.
+
+    Items missing from the response or failing validation are re-evaluated
+    one at a time with evaluate_single_question. Results are returned in the
+    order of the input batch.
+    """
+    global overall_run_batch_requests, overall_run_batch_fallbacks
+
+    results = [None] * len(batch)
+    items = []
+    for index, question_data in enumerate(batch):
+        question_text = question_data.get('questionText', question_data.get('question', ''))
+        if not question_text or not question_data.get('answer', ''):
+            logger.warning(f"Missing data for question {question_data.get('questionNumber', 'Unknown')}")
+            results[index] = create_default_evaluation(question_data)
+        else:
+            items.append((str(index + 1), question_data))
+
+    if len(items) == 1:
+        index = int(items[0][0]) - 1
+        results[index] = await evaluate_single_question(batch[index], evaluation_type)
+        return results
+
+    fallback = {item_id for item_id, _ in items}
+    if items:
+        batch_label = ",".join(str(q.get('questionNumber', '?')) for _, q in items)
+        try:
+            overall_run_batch_requests += 1
+            response = await make_gemini_call_with_retry(
+                generate_rubric_batch_prompt(items),
+                f"batch[{batch_label}]",
+                max_output_tokens=EVAL_MAX_OUTPUT_TOKENS * len(items)
+            )
+
+            by_id = {}
+            for entry in response.get('evaluations', []):
+                if isinstance(entry, dict) and 'id' in entry:
+                    by_id[str(entry['id'])] = entry.get('evaluation', entry)
+
+            for item_id, question_data in items:
+                eval_data = by_id.get(item_id)
+                if eval_data is None:
+                    logger.warning(f"Batch response missing question {question_data.get('questionNumber', 'Unknown')}")
+                    continue
+                error = validate_batch_evaluation(eval_data, question_data.get('maxMarks', 10))
+                if error:
+                    logger.warning(f"Batch result for question {question_data.get('questionNumber', 'Unknown')} rejected: {error}")
+                    continue
+                eval_data['max_marks'] = question_data.get('maxMarks', 10)  # Trust the paper, not the model
+                results[int(item_id) - 1] = process_evaluation_result({"evaluation": eval_data}, question_data)
+                fallback.discard(item_id)
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Batch evaluation failed for questions {batch_label}, falling back per question: {e}")
+
+    overall_run_batch_fallbacks += len(fallback)
+    fallback_ids = sorted(fallback, key=int)
+    fallback_results = await asyncio.gather(
+        *(evaluate_single_question(batch[int(item_id) - 1], evaluation_type) for item_id in fallback_ids)
+    )
+    for item_id, result in zip(fallback_ids, fallback_results):
+        results[int(item_id) - 1] = result
+
+    return results
+
 def process_evaluation_result(evaluation_result, question_data):
     """Process and standardize evaluation result"""
     try:
@@ -295,69 +500,194 @@ def create_error_evaluation(question_data, error_msg):
         "evaluationDetails": {"error": error_msg}
     }
 
-def evaluate_and_generate_report(qa_pairs, evaluation_type="rubric"):
+async def _grade_pairs(qa_pairs, evaluation_type, batch_size):
+    """Grade pairs with Gemini, K per request; failures become error evaluations"""
+    if batch_size == 1:
+        groups = [[qa_data] for qa_data in qa_pairs]
+        outcomes = await asyncio.gather(
+            *(evaluate_single_question(qa_data, evaluation_type) for qa_data in qa_pairs),
+            return_exceptions=True
+        )
+    else:
+        groups = [qa_pairs[i:i + batch_size] for i in range(0, len(qa_pairs), batch_size)]
+        outcomes = await asyncio.gather(
+            *(evaluate_batch(batch, evaluation_type) for batch in groups),
+            return_exceptions=True
+        )
+    
+    results = []
+    for group, outcome in zip(groups, outcomes):
+        if isinstance(outcome, asyncio.CancelledError):
+            raise outcome
+        if isinstance(outcome, Exception):
+            for question_data in group:
+                logger.error(f"Failed to evaluate question {question_data.get('questionNumber', 'Unknown')}: {outcome}")
+                results.append(create_error_evaluation(question_data, str(outcome)))
+        else:
+            results.extend(outcome if isinstance(outcome, list) else [outcome])
+    
+    return results
+
+_rubric_prompt_version = None
+
+def rubric_prompt_version():
+    """Rubric version plus a fingerprint of the prompt templates, so editing a prompt invalidates cached grades"""
+    global _rubric_prompt_version
+    if _rubric_prompt_version is None:
+        sample = {'questionText': '{question}', 'answer': '{answer}', 'maxMarks': 10}
+        templates = generate_rubric_evaluation_prompt('{question}', '{answer}', 10) + generate_rubric_batch_prompt([('1', sample)])
+        _rubric_prompt_version = f"{RUBRIC_PROMPT_VERSION}:{hashlib.sha256(templates.encode()).hexdigest()[:16]}"
+    return _rubric_prompt_version
+
+def evaluation_cache_key(cache, question_data, evaluation_type):
+    """Cache key of a pair, or None when it has no question or answer to grade"""
+    question_text = question_data.get('questionText', question_data.get('question', ''))
+    student_answer = question_data.get('answer', '')
+    if not question_text or not student_answer:
+        return None
+    return cache.make_key(
+        question_text, student_answer, question_data.get('maxMarks', 10), evaluation_type,
+        "fake" if Config.LLM_FAKE_MODEL else MODEL_NAME, rubric_prompt_version()
+    )
+
+def _cacheable(result, question_data):
+    """The evaluation data of a result worth reusing, or None (errors, defaults, out-of-range grades)"""
+    if result.get('evaluationType') in ('Error', 'Default'):
+        return None
+    eval_data = result.get('evaluationDetails')
+    if validate_batch_evaluation(eval_data, question_data.get('maxMarks', 10)):
+        return None
+    return eval_data
+
+def _from_cache(eval_data, question_data):
+    """Result for one student's pair rebuilt from a cached (or shared) evaluation"""
+    usage = current_usage()
+    if usage is not None:
+        usage.record_cache_hit("evaluation")
+    return process_evaluation_result({"evaluation": copy.deepcopy(eval_data)}, question_data)
+
+async def evaluate_pairs_async(qa_pairs, evaluation_type="rubric", batch_size=None):
+    """
+    Evaluate Q&A pairs concurrently on the LLM client loop, batching K pairs per request.
+    
+    Pairs whose normalized question, answer and marks were graded before are
+    served from the evaluation cache, repeats within the call are graded once,
+    and pairs another sheet is grading right now wait for that grade.
+    
+    Returns one result per pair (in no particular order); failures become error evaluations.
+    """
+    batch_size = max(1, batch_size or Config.EVALUATION_BATCH_SIZE)
+    cache = get_evaluation_cache()
+    if cache is None:
+        return await _grade_pairs(qa_pairs, evaluation_type, batch_size)
+    
+    results = []
+    uncached = []          # Pairs without a key (graded as before, default evaluation)
+    by_key = {}            # Key -> pairs sharing it, first one graded
+    for qa_data in qa_pairs:
+        key = evaluation_cache_key(cache, qa_data, evaluation_type)
+        if key is None:
+            uncached.append(qa_data)
+        else:
+            by_key.setdefault(key, []).append(qa_data)
+    
+    owned, waiting = [], []
+    for key, pairs in by_key.items():
+        cached = cache.get(key)
+        if cached is not None:
+            results.extend(_from_cache(cached, qa_data) for qa_data in pairs)
+            cache.record_duplicates(len(pairs) - 1)
+            continue
+        future = cache.claim(key)
+        (owned if future is None else waiting).append((key, future))
+    
+    # Grade what this call owns before waiting on anyone else, so no two calls wait on each other
+    grades = {}
+    try:
+        graded = await _grade_pairs(uncached + [by_key[key][0] for key, _ in owned], evaluation_type, batch_size)
+        results.extend(graded[:len(uncached)])
+        for (key, _), result in zip(owned, graded[len(uncached):]):
+            grades[key] = _cacheable(result, by_key[key][0])
+            results.append(result)
+            pairs = by_key[key][1:]
+            if grades[key] is not None:
+                cache.record_duplicates(len(pairs))
+                results.extend(_from_cache(grades[key], qa_data) for qa_data in pairs)
+            elif pairs:
+                # No usable grade to share; grade the repeats on their own
+                results.extend(await _grade_pairs(pairs, evaluation_type, batch_size))
+    finally:
+        for key, _ in owned:
+            cache.release(key, grades.get(key))
+    
+    retry = []
+    for key, future in waiting:
+        shared = await asyncio.shield(future)
+        if shared is None:
+            retry.extend(by_key[key])  # The other grader failed
+        else:
+            cache.record_duplicates(len(by_key[key]) - 1)
+            results.extend(_from_cache(shared, qa_data) for qa_data in by_key[key])
+    if retry:
+        results.extend(await _grade_pairs(retry, evaluation_type, batch_size))
+    
+    return results
+
+def build_evaluation_report(results, evaluation_type="rubric"):
+    """Assemble per-question results into the report returned by evaluate_and_generate_report"""
+    global overall_run_sheets_evaluated
+    
+    overall_run_sheets_evaluated += 1
+    
+    # Sort results by question number
+    results = sorted(results, key=lambda x: str(x.get('questionNumber', '')))
+    
+    # Generate summary statistics
+    summary = generate_evaluation_summary(results, evaluation_type)
+    
+    logger.info(f"Evaluation completed. Total score: {summary['totalObtained']}/{summary['totalMaxMarks']} ({summary['overallPercentage']:.1f}%)")
+    
+    return {
+        "evaluations": results,
+        "summary": summary,
+        "evaluationType": evaluation_type,
+        "totalQuestions": len(results),
+        "processingStats": usage_summary()
+    }
+
+async def evaluate_and_generate_report_async(qa_pairs, evaluation_type="rubric", batch_size=None):
     """
     Main function to evaluate all Q&A pairs and generate a comprehensive report.
     
     Args:
         qa_pairs: List of question-answer pairs
         evaluation_type: Type of evaluation to perform
+        batch_size: Questions per Gemini request (defaults to Config.EVALUATION_BATCH_SIZE,
+                    1 evaluates each question with its own request)
     
     Returns:
         Dictionary containing evaluation results and summary
     """
-    global overall_run_sheets_evaluated
-    
     try:
         logger.info(f"Starting evaluation of {len(qa_pairs)} questions using {evaluation_type} evaluation")
         
         if not qa_pairs:
             logger.warning("No Q&A pairs provided for evaluation")
             return create_empty_report()
-
-        overall_run_sheets_evaluated += 1
-        
-        # Evaluate questions in parallel for better performance
-        results = []
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            future_to_question = {
-                executor.submit(evaluate_single_question, qa_data, evaluation_type): qa_data
-                for qa_data in qa_pairs
-            }
-            
-            for future in as_completed(future_to_question.keys()):
-                try:
-                    result = future.result()
-                    results.append(result)
-                except Exception as e:
-                    question_data = future_to_question[future]
-                    logger.error(f"Failed to evaluate question {question_data.get('questionNumber', 'Unknown')}: {e}")
-                    results.append(create_error_evaluation(question_data, str(e)))
-        
-        # Sort results by question number
-        results.sort(key=lambda x: str(x.get('questionNumber', '')))
-        
-        # Generate summary statistics
-        summary = generate_evaluation_summary(results, evaluation_type)
-        
-        logger.info(f"Evaluation completed. Total score: {summary['totalObtained']}/{summary['totalMaxMarks']} ({summary['overallPercentage']:.1f}%)")
         
-        return {
-            "evaluations": results,
-            "summary": summary,
-            "evaluationType": evaluation_type,
-            "totalQuestions": len(results),
-            "processingStats": {
-                "input_tokens": overall_run_input_tokens,
-                "output_tokens": overall_run_output_tokens,
-                "api_requests": overall_run_api_requests
-            }
-        }
+        # processingStats covers this run only (the caller's whole run if it tracks one)
+        with track_usage():
+            results = await evaluate_pairs_async(qa_pairs, evaluation_type, batch_size)
+            return build_evaluation_report(results, evaluation_type)
 
     except Exception as e:
         logger.error(f"Error in evaluation process: {e}")
         raise
 
+def evaluate_and_generate_report(qa_pairs, evaluation_type="rubric", batch_size=None):
+    """Blocking wrapper around evaluate_and_generate_report_async (runs on the shared LLM client loop)"""
+    return get_llm_client().run(evaluate_and_generate_report_async(qa_pairs, evaluation_type, batch_size))
+
 def generate_evaluation_summary(results, evaluation_type):
     """Generate summary statistics from evaluation results"""
     try:
@@ -426,18 +756,19 @@ def create_empty_report():
         },
         "evaluationType": "None",
         "totalQuestions": 0,
-        "processingStats": {
-            "input_tokens": 0,
-            "output_tokens": 0,
-            "api_requests": 0
-        }
+        "processingStats": usage_summary()
     }
 
 def get_evaluation_stats():
     """Get global evaluation statistics"""
+    cache = get_evaluation_cache()
     return {
         "total_input_tokens": overall_run_input_tokens,
         "total_output_tokens": overall_run_output_tokens,
         "total_api_requests": overall_run_api_requests,
-        "sheets_evaluated": overall_run_sheets_evaluated
+        "sheets_evaluated": overall_run_sheets_evaluated,
+        "batch_requests": overall_run_batch_requests,
+        "batch_fallback_questions": overall_run_batch_fallbacks,
+        "batch_size": Config.EVALUATION_BATCH_SIZE,
+        "result_cache": cache.get_stats() if cache else {"enabled": False}
     } 
\ No newline at end of file
@@ -0,0 +1,134 @@
+"""
+Evaluation Result Cache
+In-process TTL/LRU cache of rubric evaluations for repeated answers
+
+Across a cohort many students write the same answer to objective and short
+questions. Evaluations are keyed by a hash of the question text, the answer
+(both case-folded with whitespace collapsed), the question's marks, the
+evaluation type, the model name and a fingerprint of the rubric prompt, so an
+identical answer is graded once and any prompt or model change naturally
+misses. Only evaluations that pass validation are stored; the result for each
+student is rebuilt from the stored grade with their own question number and
+answer text.
+
+Concurrent misses for the same key share one evaluation (single-flight): the
+first caller grades it, later callers wait for that grade once they have
+finished their own work, so no caller waits while holding a claim. Entries
+expire after EVALUATION_CACHE_TTL_SECONDS and the least recently used are
+evicted beyond EVALUATION_CACHE_MAX_ENTRIES.
+"""
+
+import asyncio
+import copy
+import hashlib
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+
+from config import Config
+
+# Bump to invalidate every entry after a change to how results are stored
+CACHE_FORMAT_VERSION = "1"
+
+def normalize_text(text: Any) -> str:
+    """Case-folded text with runs of whitespace collapsed"""
+    return " ".join(str(text or "").casefold().split())
+
+class EvaluationCache:
+    """LRU-bounded TTL cache of evaluation data, with in-flight claims per key"""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._in_flight: Dict[Tuple[int, str], asyncio.Future] = {}  # By (event loop, key)
+        self._lock = Lock()  # get_stats() is read from request threads
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "writes": 0, "evictions": 0, "expired": 0}
+
+    @staticmethod
+    def make_key(question_text: str, answer: str, max_marks: Any, evaluation_type: str, model_name: str, prompt_version: str) -> str:
+        """Hash identifying one graded (question, answer, marks) under one prompt and model"""
+        digest = hashlib.sha256()
+        for part in (CACHE_FORMAT_VERSION, model_name, prompt_version, evaluation_type,
+                     str(max_marks), normalize_text(question_text), normalize_text(answer)):
+            part = part.encode()
+            digest.update(len(part).to_bytes(8, "big"))
+            digest.update(part)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """A copy of the stored evaluation, or None (expired entries are dropped)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return copy.deepcopy(value)
+                del self._entries[key]
+                self._stats["expired"] += 1
+            return None
+
+    def claim(self, key: str) -> Optional[asyncio.Future]:
+        """
+        Claim a missed key for grading. Returns None if the caller now owns it
+        (and must release() it on the same event loop), or the future of the
+        caller already grading it on this loop.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            future = self._in_flight.get((id(loop), key))
+            if future is not None and not future.done():
+                self._stats["coalesced"] += 1
+                return future
+            self._in_flight[(id(loop), key)] = loop.create_future()
+            self._stats["misses"] += 1
+            return None
+
+    def release(self, key: str, value: Optional[Dict[str, Any]]):
+        """Store the grade of an owned key (None if it failed) and wake the callers waiting for it"""
+        if value is not None and self.ttl > 0:
+            with self._lock:
+                self._entries[key] = (time.monotonic() + self.ttl, copy.deepcopy(value))
+                self._entries.move_to_end(key)
+                self._stats["writes"] += 1
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._stats["evictions"] += 1
+        with self._lock:
+            future = self._in_flight.pop((id(asyncio.get_running_loop()), key), None)
+        if future is not None and not future.done():
+            future.set_result(copy.deepcopy(value) if value is not None else None)
+
+    def record_duplicates(self, count: int):
+        """Pairs served from a grade made or fetched once for several repeats of the same answer"""
+        with self._lock:
+            self._stats["hits"] += count
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"] + self._stats["coalesced"]
+            served = self._stats["hits"] + self._stats["coalesced"]
+            return {
+                **self._stats,
+                "hit_ratio": round(served / lookups, 3) if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl
+            }
+
+_cache: Optional[EvaluationCache] = None
+_cache_lock = Lock()
+
+def get_evaluation_cache() -> Optional[EvaluationCache]:
+    """Return the shared evaluation cache, or None when caching is disabled"""
+    global _cache
+    if not Config.EVALUATION_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = EvaluationCache(Config.EVALUATION_CACHE_MAX_ENTRIES, Config.EVALUATION_CACHE_TTL_SECONDS)
+        return _cache
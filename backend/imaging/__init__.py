@@ -0,0 +1 @@
+# Imaging module for rendering and preparing page images
@@ -0,0 +1,60 @@
+"""
+Page Image Encoding
+Encodes rendered PIL pages straight to bytes in memory for Gemini inline_data
+"""
+
+import io
+from typing import Optional, Tuple
+from PIL import Image
+
+MIME_TYPES = {
+    "PNG": "image/png",
+    "JPEG": "image/jpeg",
+    "WEBP": "image/webp"
+}
+
+def downscale(img: Image.Image, max_long_edge: Optional[int]) -> Image.Image:
+    """Return the image resized so its longest side is at most max_long_edge"""
+    if not max_long_edge or max(img.size) <= max_long_edge:
+        return img
+    scale = max_long_edge / max(img.size)
+    new_size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    return img.resize(new_size, Image.LANCZOS)
+
+def encode_image(
+    img: Image.Image,
+    fmt: str = "PNG",
+    quality: int = 85,
+    max_long_edge: Optional[int] = None
+) -> Tuple[bytes, str]:
+    """
+    Encode a page image in memory.
+
+    Args:
+        img: Rendered page
+        fmt: PNG, JPEG or WEBP
+        quality: Lossy quality for JPEG/WEBP (ignored for PNG)
+        max_long_edge: Downscale target in pixels for the longest side (None keeps size)
+
+    Returns:
+        (encoded bytes, MIME type)
+    """
+    fmt = fmt.upper()
+    if fmt == "JPG":
+        fmt = "JPEG"
+    if fmt not in MIME_TYPES:
+        raise ValueError(f"Unsupported image format: {fmt}")
+
+    img = downscale(img, max_long_edge)
+
+    # JPEG has no alpha or palette support
+    if fmt == "JPEG" and img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+
+    buffer = io.BytesIO()
+    if fmt == "PNG":
+        img.save(buffer, format="PNG")
+    else:
+        img.save(buffer, format=fmt, quality=quality)
+
+    return buffer.getvalue(), MIME_TYPES[fmt]
@@ -0,0 +1,60 @@
+"""
+PDF Page Rendering
+Renders PDF pages one at a time so callers can start work on page 1 while
+later pages are still rasterizing, and never hold the whole document in memory
+"""
+
+import os
+import logging
+from typing import Iterator, Optional, Tuple
+from PIL import Image
+from pdf2image import convert_from_path, pdfinfo_from_path
+
+logger = logging.getLogger(__name__)
+
+# Common poppler install locations (Windows builds first, then Unix)
+POPPLER_SEARCH_PATHS = [
+    r"C:\poppler-24.08.0\Library\bin",
+    r"C:\Program Files\poppler\bin",
+    "/usr/bin",
+    "/usr/local/bin"
+]
+
+_poppler_path = None
+_poppler_resolved = False
+
+def find_poppler_path() -> Optional[str]:
+    """Return the first existing poppler directory, or None to use PATH"""
+    global _poppler_path, _poppler_resolved
+    if not _poppler_resolved:
+        _poppler_path = next((p for p in POPPLER_SEARCH_PATHS if os.path.exists(p)), None)
+        _poppler_resolved = True
+    return _poppler_path
+
+def get_page_count(pdf_path: str) -> int:
+    """Number of pages in a PDF"""
+    info = pdfinfo_from_path(pdf_path, poppler_path=find_poppler_path())
+    return int(info["Pages"])
+
+def iter_pdf_pages(pdf_path: str, dpi: int = 300) -> Iterator[Tuple[int, Image.Image]]:
+    """
+    Yield (page_number, image) for each page, rendering a single page per step.
+
+    Page numbers start at 1. Only the page being yielded is held in memory.
+    """
+    poppler_path = find_poppler_path()
+    page_count = get_page_count(pdf_path)
+    logger.info(f"Rendering {page_count} pages from {pdf_path} at {dpi} DPI")
+
+    for page_number in range(1, page_count + 1):
+        images = convert_from_path(
+            pdf_path,
+            dpi=dpi,
+            first_page=page_number,
+            last_page=page_number,
+            poppler_path=poppler_path
+        )
+        if not images:
+            logger.warning(f"Page {page_number} of {pdf_path} rendered no image")
+            continue
+        yield page_number, images[0]
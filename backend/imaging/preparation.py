@@ -0,0 +1,152 @@
+"""
+Page Image Preparation
+Per-document-type profiles that pick render DPI, colour reduction, margin
+cropping and encoding before a page is sent to Gemini
+
+Both document types default to the original 300 DPI colour PNG pages. The
+"compact" preset is opt-in until it has been measured on real fixtures:
+handwritten answer sheets keep grey levels (faint pencil strokes disappear under
+binarization) and compress well as JPEG, printed question papers binarize
+cleanly and shrink to very small PNGs at lower DPI. Compare them with
+benchmarks/bench_image_profiles.py before enabling, e.g.
+
+    IMAGE_PROFILE_ANSWER_SHEET=compact
+    IMAGE_PROFILE_QUESTION_PAPER='{"preset": "compact", "dpi": 200}'
+"""
+
+import json
+import logging
+import os
+from typing import Any, Dict, Tuple
+from PIL import Image, ImageOps
+
+from imaging.encoding import encode_image, downscale
+
+logger = logging.getLogger(__name__)
+
+ANSWER_SHEET = "answer_sheet"
+QUESTION_PAPER = "question_paper"
+
+# The pages Gemini has always been sent
+BASELINE_PROFILE: Dict[str, Any] = {
+    "dpi": 300,
+    "grayscale": False,
+    "binarize": False,
+    "threshold": 170,
+    "crop_margins": False,
+    "format": "PNG",
+    "quality": 85,
+    "max_long_edge": 0           # 0 keeps the rendered size
+}
+
+DEFAULT_PROFILES: Dict[str, Dict[str, Any]] = {
+    ANSWER_SHEET: BASELINE_PROFILE,
+    QUESTION_PAPER: BASELINE_PROFILE
+}
+
+# Smaller pages, opt-in per document type (IMAGE_PROFILE_<TYPE>=compact)
+PRESETS: Dict[str, Dict[str, Dict[str, Any]]] = {"compact": {
+    ANSWER_SHEET: {
+        "dpi": 200,
+        "grayscale": True,
+        "binarize": False,
+        "threshold": 170,        # Binarization cut-off (0-255), used when binarize is on
+        "crop_margins": True,
+        "format": "JPEG",
+        "quality": 85,
+        "max_long_edge": 2400
+    },
+    QUESTION_PAPER: {
+        "dpi": 150,
+        "grayscale": True,
+        "binarize": True,
+        "threshold": 170,
+        "crop_margins": True,
+        "format": "PNG",
+        "quality": 85,
+        "max_long_edge": 2000
+    }
+}}
+
+# Pixels lighter than this count as blank paper when cropping margins
+MARGIN_WHITE_LEVEL = 235
+MARGIN_PADDING = 24
+
+def get_profile(doc_type: str) -> Dict[str, Any]:
+    """
+    Return the preparation profile for a document type.
+
+    Defaults can be replaced per type with a preset name or a JSON object of
+    overrides in the environment, optionally starting from a preset, e.g.
+    IMAGE_PROFILE_ANSWER_SHEET=compact or
+    IMAGE_PROFILE_ANSWER_SHEET='{"preset": "compact", "dpi": 250}'.
+    """
+    if doc_type not in DEFAULT_PROFILES:
+        raise ValueError(f"Unknown image profile: {doc_type}")
+
+    profile = dict(DEFAULT_PROFILES[doc_type])
+    name = f"IMAGE_PROFILE_{doc_type.upper()}"
+    override = (os.getenv(name) or "").strip()
+    if not override:
+        return profile
+    try:
+        overrides = {"preset": override} if override in PRESETS else json.loads(override)
+        preset = overrides.pop("preset", None)
+        if preset is not None:
+            profile = dict(PRESETS[preset][doc_type])
+        profile.update(overrides)
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        logger.warning(f"Ignoring invalid {name}: {e}")
+        profile = dict(DEFAULT_PROFILES[doc_type])
+    return profile
+
+def crop_whitespace(img: Image.Image, white_level: int = MARGIN_WHITE_LEVEL, padding: int = MARGIN_PADDING) -> Image.Image:
+    """Trim blank paper margins, keeping a small padding around the content"""
+    gray = img.convert("L") if img.mode != "L" else img
+    # Content becomes white on black so getbbox() finds it
+    mask = gray.point(lambda p: 255 if p < white_level else 0)
+    bbox = mask.getbbox()
+    if not bbox:
+        return img  # Blank page
+
+    left, top, right, bottom = bbox
+    return img.crop((
+        max(0, left - padding),
+        max(0, top - padding),
+        min(img.width, right + padding),
+        min(img.height, bottom + padding)
+    ))
+
+def prepare_page(img: Image.Image, profile: Dict[str, Any]) -> Image.Image:
+    """Apply cropping, downscaling and colour reduction from a profile"""
+    if profile.get("crop_margins"):
+        img = crop_whitespace(img)
+
+    if profile.get("grayscale") or profile.get("binarize"):
+        img = ImageOps.grayscale(img) if img.mode != "L" else img
+
+    # Downscale before thresholding so strokes are anti-aliased, not dropped
+    img = downscale(img, profile.get("max_long_edge") or None)
+
+    if profile.get("binarize"):
+        threshold = profile.get("threshold", 170)
+        img = img.point(lambda p: 255 if p >= threshold else 0)
+        if profile.get("format", "PNG").upper() == "PNG":
+            img = img.convert("1")  # 1-bit PNGs are a fraction of the size
+
+    return img
+
+def prepare_and_encode(img: Image.Image, profile: Dict[str, Any]) -> Tuple[bytes, str]:
+    """Prepare a rendered page and encode it; returns (bytes, MIME type)"""
+    prepared = prepare_page(img, profile)
+    return encode_image(
+        prepared,
+        fmt=profile.get("format", "PNG"),
+        quality=profile.get("quality", 85)
+    )
+
+def prepare_image_file(file_path: str, profile: Dict[str, Any]) -> Tuple[bytes, str]:
+    """Load an uploaded image file and prepare it like a rendered page"""
+    with Image.open(file_path) as img:
+        img.load()
+        return prepare_and_encode(img, profile)
@@ -0,0 +1 @@
+# LLM module for shared Gemini access (rate limiting, clients)
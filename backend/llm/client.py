@@ -0,0 +1,287 @@
+"""
+Async Gemini Client
+One event loop, one concurrency bound and one retry policy for every LLM stage
+
+OCR, question paper parsing, mapping and evaluation all send their Gemini calls
+to a single background event loop instead of each spinning up thread pools.
+Hundreds of calls can be in flight at once while only the loop thread (plus the
+shared rate limiter) is involved. Each call:
+
+- waits for quota on the shared rate limiter (llm/rate_limiter.py)
+- holds a slot of a bounded semaphore (LLM_MAX_CONCURRENCY) while in flight
+- is cancelled after LLM_TIMEOUT_SECONDS
+- is retried with jittered exponential backoff on timeouts, 429s, server
+  errors and responses the caller's parse() rejects with ResponseRejected
+
+Sync code calls run(coro); async code running on another loop (FastAPI) awaits
+run_async(coro), which propagates cancellation into the client loop. Calls
+are recorded on the caller's usage tracker (llm/usage.py), if any.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from concurrent.futures import Future
+from threading import Event, Lock, Thread
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from config import Config
+from llm.rate_limiter import get_rate_limiter, is_rate_limit_error, response_tokens
+from llm.usage import bind_usage, current_usage, response_usage
+from monitoring.metrics import (
+    LLM_CALL_DURATION, LLM_LIMITER_WAIT, LLM_RATE_LIMITED, LLM_RETRIES, LLM_TIMEOUTS
+)
+
+logger = logging.getLogger(__name__)
+
+BASE_BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 30.0
+
+# gRPC/HTTP failures worth another attempt; anything else (bad request, auth) fails fast
+RETRYABLE_ERROR_NAMES = {
+    'DeadlineExceeded', 'ServiceUnavailable', 'InternalServerError', 'Unknown',
+    'Aborted', 'GatewayTimeout', 'ServerError', 'ConnectionError', 'ConnectionResetError'
+}
+
+class LLMCallError(Exception):
+    """Raised when a Gemini call fails after all retries"""
+
+class ResponseRejected(ValueError):
+    """Raised by parse() callbacks for an unusable response (empty, blocked, invalid JSON); retried"""
+
+def is_retryable_error(exc: BaseException) -> bool:
+    """Return True for transient failures: timeouts, 429s, 5xx, dropped connections and rejected responses"""
+    if isinstance(exc, (asyncio.TimeoutError, ConnectionError, ResponseRejected)):
+        return True
+    if is_rate_limit_error(exc):
+        return True
+    code = getattr(exc, 'code', None)
+    if isinstance(code, int) and code >= 500:
+        return True
+    return type(exc).__name__ in RETRYABLE_ERROR_NAMES
+
+def _running_in(loop: asyncio.AbstractEventLoop) -> bool:
+    """Return True if the current thread is running the given loop"""
+    try:
+        return asyncio.get_running_loop() is loop
+    except RuntimeError:
+        return False
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with jitter for the given 1-based attempt"""
+    delay = min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * (2 ** (attempt - 1)))
+    return delay * random.uniform(0.5, 1.0)
+
+class LLMClient:
+    """Runs Gemini calls on a dedicated event loop with bounded concurrency"""
+
+    def __init__(self, max_concurrency: int, timeout: float, max_retries: int):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[Thread] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._start_lock = Lock()
+        self._in_flight = 0
+
+        self._stats = {
+            "calls": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "retries": 0,
+            "timeouts": 0,
+            "cancelled": 0,
+            "peak_in_flight": 0
+        }
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                ready = Event()
+
+                def run_loop():
+                    loop = asyncio.new_event_loop()
+                    asyncio.set_event_loop(loop)
+                    self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                    self._loop = loop
+                    ready.set()
+                    loop.run_forever()
+                    loop.close()
+
+                self._thread = Thread(target=run_loop, name="llm-client", daemon=True)
+                self._thread.start()
+                ready.wait()
+                logger.info(f"LLM client loop started (max {self.max_concurrency} concurrent calls)")
+            return self._loop
+
+    def submit(self, coro: Awaitable) -> Future:
+        """Schedule a coroutine on the client loop; returns a concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(bind_usage(coro), self._ensure_loop())
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the client loop and block until it finishes (sync callers)"""
+        if self._loop is not None and _running_in(self._loop):
+            raise RuntimeError("LLMClient.run() called from the client loop; await the coroutine instead")
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    async def run_async(self, coro: Awaitable) -> Any:
+        """Await a coroutine on the client loop from another event loop; cancelling the caller cancels it"""
+        return await asyncio.wrap_future(self.submit(coro))
+
+    async def generate(
+        self,
+        stage: str,
+        model: Any,
+        *args,
+        estimated_tokens: int = 0,
+        parse: Optional[Callable[[Any], Any]] = None,
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        label: str = "",
+        **kwargs
+    ) -> Any:
+        """
+        Call model.generate_content on the client loop with limits, timeout and retries.
+
+        Args:
+            stage: Rate limiter stage ("ocr", "parser", "mapping", "evaluation")
+            model: Gemini GenerativeModel (replaced by the fake model when LLM_FAKE_MODEL is on)
+            estimated_tokens: Pre-call token estimate for the shared limiter
+            parse: Optional response -> result function; raising ResponseRejected triggers a retry
+            timeout: Per-attempt timeout in seconds (defaults to LLM_TIMEOUT_SECONDS)
+            max_retries: Total attempts (defaults to LLM_MAX_RETRIES)
+            label: Human readable call id for logs
+
+        Returns:
+            parse(response) if parse is given, else the raw response
+        """
+        if Config.LLM_FAKE_MODEL:
+            from llm.fake_model import get_fake_model
+            model = get_fake_model()
+        if model is None:
+            raise LLMCallError("Gemini model not initialized")
+
+        timeout = timeout or self.timeout
+        attempts = max(1, max_retries or self.max_retries)
+        limiter = get_rate_limiter()
+        label = label or stage
+        self._stats["calls"] += 1
+        usage = current_usage()
+        started = time.monotonic()
+        call_usage = {"attempts": 0, "rate_limited": 0, "timeouts": 0, "input_tokens": 0, "output_tokens": 0}
+
+        for attempt in range(1, attempts + 1):
+            call_usage["attempts"] = attempt
+            LLM_LIMITER_WAIT.labels(stage).observe(await limiter.acquire_async(stage, estimated_tokens))
+            tokens_settled = False
+            try:
+                async with self._semaphore:
+                    self._in_flight += 1
+                    self._stats["peak_in_flight"] = max(self._stats["peak_in_flight"], self._in_flight)
+                    try:
+                        response = await asyncio.wait_for(self._call(model, *args, **kwargs), timeout)
+                    finally:
+                        self._in_flight -= 1
+
+                limiter.record_usage(estimated_tokens, response_tokens(response) or estimated_tokens)
+                tokens_settled = True
+                # Billed even if parse() rejects the response and the call is retried
+                input_tokens, output_tokens = response_usage(response)
+                call_usage["input_tokens"] += input_tokens
+                call_usage["output_tokens"] += output_tokens
+                limiter.report_success()
+                result = parse(response) if parse else response
+                self._stats["succeeded"] += 1
+                LLM_CALL_DURATION.labels(stage, "success").observe(time.monotonic() - started)
+                if usage is not None:
+                    usage.record_call(stage, started, **call_usage)
+                return result
+
+            except asyncio.CancelledError:
+                self._stats["cancelled"] += 1
+                if not tokens_settled:
+                    limiter.record_usage(estimated_tokens, 0)
+                raise
+
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    self._stats["timeouts"] += 1
+                    call_usage["timeouts"] += 1
+                    LLM_TIMEOUTS.labels(stage).inc()
+                if is_rate_limit_error(e):
+                    limiter.report_rate_limited()
+                    call_usage["rate_limited"] += 1
+                    LLM_RATE_LIMITED.labels(stage).inc()
+                elif not tokens_settled:
+                    # The call consumed no tokens; give the estimate back
+                    limiter.record_usage(estimated_tokens, 0)
+
+                if attempt >= attempts or not is_retryable_error(e):
+                    self._stats["failed"] += 1
+                    LLM_CALL_DURATION.labels(stage, "failure").observe(time.monotonic() - started)
+                    if usage is not None:
+                        usage.record_call(stage, started, failed=True, **call_usage)
+                    logger.error(f"Gemini call {label} failed after {attempt} attempt(s): {type(e).__name__}: {e}")
+                    raise
+
+                self._stats["retries"] += 1
+                LLM_RETRIES.labels(stage).inc()
+                delay = backoff_delay(attempt)
+                logger.warning(f"Gemini call {label} attempt {attempt} failed ({type(e).__name__}: {e}); "
+                               f"retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    @staticmethod
+    async def _call(model: Any, *args, **kwargs) -> Any:
+        """Use the SDK's native async call when available, otherwise a worker thread"""
+        generate_async = getattr(model, 'generate_content_async', None)
+        if generate_async is not None:
+            return await generate_async(*args, **kwargs)
+        return await asyncio.to_thread(model.generate_content, *args, **kwargs)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Call counters and current concurrency for monitoring"""
+        return {
+            **self._stats,
+            "in_flight": self._in_flight,
+            "max_concurrency": self.max_concurrency
+        }
+
+    def shutdown(self):
+        """Stop the client loop (called on application shutdown)"""
+        with self._start_lock:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join(timeout=5)
+                self._loop = None
+                self._thread = None
+                logger.info("LLM client loop stopped")
+
+_client: Optional[LLMClient] = None
+_client_lock = Lock()
+
+def get_llm_client() -> LLMClient:
+    """Return the process-wide LLM client"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LLMClient(
+                max_concurrency=Config.LLM_MAX_CONCURRENCY,
+                timeout=Config.LLM_TIMEOUT_SECONDS,
+                max_retries=Config.LLM_MAX_RETRIES
+            )
+        return _client
+
+def shutdown_llm_client():
+    """Stop the shared client loop if it was started"""
+    with _client_lock:
+        if _client is not None:
+            _client.shutdown()
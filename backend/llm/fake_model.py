@@ -0,0 +1,212 @@
+"""
+Fake Gemini Model
+Local stand-in for GenerativeModel so the full pipeline runs without an API key
+
+Set LLM_FAKE_MODEL=true and every call made through llm/client.py goes here
+instead of Gemini. Responses are shaped after the prompt that was sent (OCR
+text, question paper JSON, mapping JSON, single or batched rubric evaluations)
+and arrive after a simulated latency. Failure and 429 rates can be raised to
+exercise the retry and backoff paths:
+
+    LLM_FAKE_MODEL=true FAKE_LLM_LATENCY=0.5 FAKE_LLM_FAILURE_RATE=0.1 python run.py
+
+The API server and workers log a warning at startup while it is on, health
+checks report fake_model: true, and it is refused when ENVIRONMENT=production.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import time
+from collections import deque
+from threading import Lock
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+ITEM_RE = re.compile(r"### Item (\S+)\n\*\*Question \((\d+) marks\)")
+SINGLE_QUESTION_RE = re.compile(r"\*\*Question \((\d+) marks\)")
+QUESTION_ID_RE = re.compile(r'"id": "([^"]+)"')
+
+class FakeRateLimitError(Exception):
+    """Mimics the SDK's ResourceExhausted (HTTP 429)"""
+    code = 429
+
+class FakeServerError(Exception):
+    """Mimics a transient 503 from the API"""
+    code = 503
+
+def _prompt_text(contents: Any) -> str:
+    """Flatten generate_content arguments into the text parts they contain"""
+    if isinstance(contents, str):
+        return contents
+    if isinstance(contents, dict):
+        return "\n".join(_prompt_text(v) for k, v in contents.items() if k in ("text", "parts", "contents"))
+    if isinstance(contents, (list, tuple)):
+        return "\n".join(_prompt_text(c) for c in contents)
+    return ""
+
+def _rubric_evaluation(max_marks: int) -> Dict[str, Any]:
+    """A valid rubric evaluation scoring 70% on every criterion"""
+    from evaluation.evaluator import RUBRIC_CRITERIA, rubric_max_scores
+
+    scores = {
+        criterion: {
+            "score": round(criterion_max * 0.7, 1),
+            "max_score": criterion_max,
+            "level": "Satisfactory",
+            "justification": "Covers the main points with some gaps."
+        }
+        for criterion, criterion_max in zip(RUBRIC_CRITERIA, rubric_max_scores(max_marks))
+    }
+    total = round(sum(s["score"] for s in scores.values()), 1)
+    return {
+        "max_marks": max_marks,
+        "rubric_scores": scores,
+        "total_score": total,
+        "percentage": round(total / max_marks * 100, 2) if max_marks else 0,
+        "overall_level": "Satisfactory",
+        "evaluation_type": "Rubric-Based",
+        "feedback": "Fake evaluation: reasonable answer, add more detail."
+    }
+
+def default_responder(prompt: str) -> str:
+    """Build a plausible response for whichever stage produced the prompt"""
+    if "academic OCR model" in prompt:
+        return "Q1 a) Quality means fitness for purpose.\n\nQ1 b) Testing finds defects early."
+
+    if "exam-paper parser" in prompt:
+        return json.dumps([{
+            "choice": "Q1",
+            "options": [{"id": "Q1", "parts": [
+                {"part_id": "a", "question_text": "Define software quality.", "marks": 5},
+                {"part_id": "b", "question_text": "Why is early testing important?", "marks": 5}
+            ]}]
+        }])
+
+    if "mapped_answers" in prompt:
+        question_ids = list(dict.fromkeys(QUESTION_ID_RE.findall(prompt)))
+        return json.dumps({"selected_choices": {}, "mapped_answers": [
+            {"question_id": qid, "question_text": f"Question {qid}", "student_answer_extracted": f"Answer to {qid}."}
+            for qid in question_ids
+        ]})
+
+    items = ITEM_RE.findall(prompt)
+    if items:
+        return json.dumps({"evaluations": [
+            {"id": item_id, "evaluation": _rubric_evaluation(int(marks))} for item_id, marks in items
+        ]})
+
+    single = SINGLE_QUESTION_RE.search(prompt)
+    if single:
+        return json.dumps({"evaluation": _rubric_evaluation(int(single.group(1)))})
+
+    return "OK"
+
+class FakeGeminiModel:
+    """Drop-in for GenerativeModel.generate_content / generate_content_async"""
+
+    def __init__(
+        self,
+        latency: float = 0.2,
+        jitter: float = 0.1,
+        per_token_latency: float = 0.0,
+        failure_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        responder: Optional[Callable[[str], str]] = None,
+        seed: Optional[int] = None
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.per_token_latency = per_token_latency
+        self.failure_rate = failure_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.responder = responder or default_responder
+        self.requests = 0
+        self.prompts = deque(maxlen=100)  # Most recent prompts, for inspection
+        self._random = random.Random(seed)
+        self._lock = Lock()
+
+    def _prepare(self, args, kwargs):
+        prompt = _prompt_text(list(args) + [kwargs.get("contents", "")])
+        with self._lock:
+            self.requests += 1
+            self.prompts.append(prompt)
+            roll = self._random.random()
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+        return prompt, roll, delay
+
+    def _respond(self, prompt: str, roll: float):
+        """Return (response, extra generation delay) or raise the simulated error"""
+        if roll < self.rate_limit_rate:
+            raise FakeRateLimitError("429 RESOURCE_EXHAUSTED: fake quota exceeded")
+        if roll < self.rate_limit_rate + self.failure_rate:
+            raise FakeServerError("503 fake service unavailable")
+
+        text = self.responder(prompt)
+        part = SimpleNamespace(text=text)
+        output_tokens = len(text) // 4
+        response = SimpleNamespace(
+            text=text,
+            candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))],
+            prompt_feedback=None,
+            usage_metadata=SimpleNamespace(
+                prompt_token_count=len(prompt) // 4,
+                candidates_token_count=output_tokens
+            )
+        )
+        return response, output_tokens * self.per_token_latency
+
+    def generate_content(self, *args, **kwargs):
+        prompt, roll, delay = self._prepare(args, kwargs)
+        time.sleep(delay)
+        response, generation_delay = self._respond(prompt, roll)
+        time.sleep(generation_delay)
+        return response
+
+    async def generate_content_async(self, *args, **kwargs):
+        prompt, roll, delay = self._prepare(args, kwargs)
+        await asyncio.sleep(delay)
+        response, generation_delay = self._respond(prompt, roll)
+        await asyncio.sleep(generation_delay)
+        return response
+
+_fake_model: Optional[FakeGeminiModel] = None
+_fake_lock = Lock()
+
+def check_fake_model():
+    """Startup check: warn while LLM_FAKE_MODEL is on, refuse it in production"""
+    if not Config.LLM_FAKE_MODEL:
+        return
+    if Config.ENVIRONMENT == 'production':
+        raise RuntimeError("LLM_FAKE_MODEL=true is not allowed when ENVIRONMENT=production")
+    logger.warning("⚠️  LLM_FAKE_MODEL is on: Gemini is replaced by a local fake model and every "
+                   "OCR text, parse, mapping and grade is canned output")
+
+def get_fake_model() -> FakeGeminiModel:
+    """Return the shared fake model, configured from FAKE_LLM_* environment variables"""
+    global _fake_model
+    if Config.ENVIRONMENT == 'production':
+        raise RuntimeError("LLM_FAKE_MODEL=true is not allowed when ENVIRONMENT=production")
+    with _fake_lock:
+        if _fake_model is None:
+            _fake_model = FakeGeminiModel(
+                latency=float(os.getenv("FAKE_LLM_LATENCY", 0.2)),
+                jitter=float(os.getenv("FAKE_LLM_JITTER", 0.1)),
+                per_token_latency=float(os.getenv("FAKE_LLM_PER_TOKEN_LATENCY", 0)),
+                failure_rate=float(os.getenv("FAKE_LLM_FAILURE_RATE", 0)),
+                rate_limit_rate=float(os.getenv("FAKE_LLM_RATE_LIMIT_RATE", 0))
+            )
+        return _fake_model
+
+def set_fake_model(model: Optional[FakeGeminiModel]):
+    """Install a specific fake model (benchmarks, local experiments)"""
+    global _fake_model
+    with _fake_lock:
+        _fake_model = model
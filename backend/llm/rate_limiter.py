@@ -0,0 +1,210 @@
+"""
+Gemini Rate Limiter
+Process-wide token buckets for requests/min and tokens/min shared by every LLM stage
+
+All Gemini calls (OCR, question paper parsing, mapping, evaluation) draw from the
+same two buckets so their combined traffic stays under the account quota. Waiters
+never sleep while holding the lock: sync callers wait on a condition variable and
+async callers await asyncio.sleep, so neither blocks the other. When stages compete,
+the stage with the lower priority number is served first. A 429 halves the refill
+rate and pauses the buckets with exponential backoff; successes restore the rate
+additively.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from collections import defaultdict
+from threading import Condition, Lock
+from typing import Any, Dict, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Adaptive backoff tuning
+MIN_RATE_SCALE = 0.1        # Never throttle below 10% of the configured quota
+RECOVERY_STEP = 0.05        # Rate fraction regained per successful call
+BASE_BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 60.0
+PRIORITY_POLL_SECONDS = 0.05  # Re-check interval while a higher-priority stage is waiting
+
+def is_rate_limit_error(exc: BaseException) -> bool:
+    """Return True if an exception is a Gemini quota (HTTP 429) error"""
+    if getattr(exc, 'code', None) == 429 or type(exc).__name__ == 'ResourceExhausted':
+        return True
+    message = str(exc)
+    return '429' in message or 'RESOURCE_EXHAUSTED' in message
+
+class RateLimiter:
+    """Thread- and asyncio-safe dual token bucket with stage priorities"""
+
+    def __init__(
+        self,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        stage_priorities: Optional[Dict[str, int]] = None,
+        burst_seconds: float = 2.0
+    ):
+        self.request_rate = requests_per_minute / 60.0
+        self.token_rate = tokens_per_minute / 60.0
+        self.request_capacity = max(1.0, self.request_rate * burst_seconds)
+        self.token_capacity = max(1.0, self.token_rate * burst_seconds)
+        self.stage_priorities = stage_priorities or {}
+
+        self._cond = Condition(Lock())
+        self._requests = self.request_capacity
+        self._tokens = self.token_capacity
+        self._last_refill = time.monotonic()
+        self._rate_scale = 1.0
+        self._blocked_until = 0.0
+        self._consecutive_limits = 0
+        self._waiting = defaultdict(int)
+
+        self._stats = {
+            "acquired": 0,
+            "rate_limited": 0,
+            "total_wait_seconds": 0.0
+        }
+
+    def _priority(self, stage: str) -> int:
+        return self.stage_priorities.get(stage, max(self.stage_priorities.values(), default=0) + 1)
+
+    def _refill(self, now: float):
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self._requests = min(self.request_capacity, self._requests + elapsed * self.request_rate * self._rate_scale)
+            self._tokens = min(self.token_capacity, self._tokens + elapsed * self.token_rate * self._rate_scale)
+            self._last_refill = now
+
+    def _try_take(self, priority: int, tokens: float) -> float:
+        """Take capacity if available; otherwise return seconds to wait. Lock must be held."""
+        now = time.monotonic()
+        self._refill(now)
+
+        if now < self._blocked_until:
+            return self._blocked_until - now
+
+        if any(count > 0 for p, count in self._waiting.items() if p < priority):
+            return PRIORITY_POLL_SECONDS
+
+        # A single oversized request may drain the whole bucket but never waits forever
+        cost = min(tokens, self.token_capacity)
+        if self._requests >= 1 and self._tokens >= cost:
+            self._requests -= 1
+            self._tokens -= cost
+            return 0.0
+
+        request_wait = (1 - self._requests) / (self.request_rate * self._rate_scale) if self._requests < 1 else 0.0
+        token_wait = (cost - self._tokens) / (self.token_rate * self._rate_scale) if self._tokens < cost else 0.0
+        return max(request_wait, token_wait, 0.001)
+
+    def acquire(self, stage: str, tokens: float = 0) -> float:
+        """Block until a request slot and `tokens` are available; returns seconds waited"""
+        priority = self._priority(stage)
+        start = time.monotonic()
+        with self._cond:
+            self._waiting[priority] += 1
+            try:
+                while True:
+                    wait = self._try_take(priority, tokens)
+                    if wait == 0:
+                        break
+                    self._cond.wait(timeout=wait)
+            finally:
+                self._waiting[priority] -= 1
+                self._cond.notify_all()
+            waited = time.monotonic() - start
+            self._stats["acquired"] += 1
+            self._stats["total_wait_seconds"] += waited
+        return waited
+
+    async def acquire_async(self, stage: str, tokens: float = 0) -> float:
+        """Async variant of acquire(); sleeps on the event loop instead of a thread"""
+        priority = self._priority(stage)
+        start = time.monotonic()
+        with self._cond:
+            self._waiting[priority] += 1
+        try:
+            while True:
+                with self._cond:
+                    wait = self._try_take(priority, tokens)
+                if wait == 0:
+                    break
+                await asyncio.sleep(wait)
+        finally:
+            with self._cond:
+                self._waiting[priority] -= 1
+                self._cond.notify_all()
+
+        waited = time.monotonic() - start
+        with self._cond:
+            self._stats["acquired"] += 1
+            self._stats["total_wait_seconds"] += waited
+        return waited
+
+    def record_usage(self, estimated_tokens: float, actual_tokens: float):
+        """Settle the difference between the token estimate and real usage"""
+        with self._cond:
+            self._tokens -= (actual_tokens - estimated_tokens)
+            self._cond.notify_all()
+
+    def report_success(self):
+        """Additively restore the refill rate after a successful call"""
+        with self._cond:
+            self._consecutive_limits = 0
+            if self._rate_scale < 1.0:
+                self._rate_scale = min(1.0, self._rate_scale + RECOVERY_STEP)
+
+    def report_rate_limited(self):
+        """Back off after a 429: halve the refill rate and pause all stages"""
+        with self._cond:
+            self._consecutive_limits += 1
+            self._stats["rate_limited"] += 1
+            self._rate_scale = max(MIN_RATE_SCALE, self._rate_scale * 0.5)
+            backoff = min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * (2 ** (self._consecutive_limits - 1)))
+            backoff *= random.uniform(0.5, 1.0)
+            self._blocked_until = max(self._blocked_until, time.monotonic() + backoff)
+            self._requests = min(self._requests, 0.0)
+            logger.warning(
+                f"Gemini rate limit hit; backing off {backoff:.1f}s at {self._rate_scale:.0%} of quota"
+            )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Snapshot of limiter state for monitoring"""
+        with self._cond:
+            return {
+                **self._stats,
+                "rate_scale": round(self._rate_scale, 3),
+                "requests_available": round(self._requests, 2),
+                "tokens_available": round(self._tokens),
+                "waiting": {p: c for p, c in self._waiting.items() if c}
+            }
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = Lock()
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the process-wide Gemini rate limiter"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter(
+                requests_per_minute=Config.GEMINI_REQUESTS_PER_MINUTE,
+                tokens_per_minute=Config.GEMINI_TOKENS_PER_MINUTE,
+                stage_priorities=Config.LLM_STAGE_PRIORITIES,
+                burst_seconds=Config.RATE_LIMIT_BURST_SECONDS
+            )
+        return _limiter
+
+def estimate_tokens(text: str = "", images: int = 0, max_output_tokens: int = 1024) -> int:
+    """Rough pre-call token estimate: ~4 chars per text token, ~1300 per page image"""
+    return len(text) // 4 + images * 1300 + max_output_tokens
+
+def response_tokens(response: Any) -> int:
+    """Total tokens billed for a Gemini response, or 0 if unavailable"""
+    usage = getattr(response, 'usage_metadata', None)
+    if not usage:
+        return 0
+    return (getattr(usage, 'prompt_token_count', 0) or 0) + (getattr(usage, 'candidates_token_count', 0) or 0)
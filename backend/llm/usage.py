@@ -0,0 +1,154 @@
+"""
+LLM Usage Tracking
+Per-run token, request, retry and latency accounting scoped with contextvars
+
+A run (one answer sheet through the pipeline, one evaluation request) opens a
+tracker and every Gemini call made inside it is recorded against that tracker
+only, so concurrent runs never see each other's usage:
+
+    with track_usage() as usage:
+        outcome = run_pipeline(...)
+    usage.summary()
+
+The tracker follows the run into asyncio tasks, worker threads started with
+asyncio.to_thread/run_blocking and the LLM client loop (LLMClient.submit binds
+it). The summary is stored as the evaluation's processing_stats, which the
+usage analytics endpoint aggregates for cost reporting. Calls made outside any
+tracker are only counted by the process-wide get_*_stats() counters.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Any, Awaitable, Dict, Iterator, Optional, Tuple
+
+# Stages reported by the LLM client (see llm/rate_limiter.py)
+STAGES = ("ocr", "parser", "mapping", "evaluation")
+
+STAGE_COUNTERS = (
+    "requests", "failed", "retries", "rate_limited", "timeouts", "cache_hits",
+    "input_tokens", "output_tokens"
+)
+
+_current: ContextVar[Optional["UsageTracker"]] = ContextVar("llm_usage", default=None)
+
+def response_usage(response: Any) -> Tuple[int, int]:
+    """(input_tokens, output_tokens) of a Gemini response, zeros if unavailable"""
+    usage = getattr(response, 'usage_metadata', None)
+    if not usage:
+        return 0, 0
+    return (getattr(usage, 'prompt_token_count', 0) or 0), (getattr(usage, 'candidates_token_count', 0) or 0)
+
+class UsageTracker:
+    """Counters per stage for one run; updated from the LLM client loop and worker threads"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._stages: Dict[str, Dict[str, Any]] = {}
+        self._started = time.monotonic()
+        self._finished: Optional[float] = None
+
+    def _stage(self, stage: str) -> Dict[str, Any]:
+        if stage not in self._stages:
+            self._stages[stage] = {
+                **{counter: 0 for counter in STAGE_COUNTERS},
+                "latency_seconds": 0.0,
+                "_first": None,
+                "_last": None
+            }
+        return self._stages[stage]
+
+    def record_call(
+        self,
+        stage: str,
+        started: float,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        attempts: int = 1,
+        failed: bool = False,
+        rate_limited: int = 0,
+        timeouts: int = 0
+    ):
+        """Record one logical call that began at started (time.monotonic()), retries included"""
+        now = time.monotonic()
+        with self._lock:
+            counters = self._stage(stage)
+            counters["requests"] += 1
+            counters["failed"] += int(failed)
+            counters["retries"] += max(0, attempts - 1)
+            counters["rate_limited"] += rate_limited
+            counters["timeouts"] += timeouts
+            counters["input_tokens"] += input_tokens
+            counters["output_tokens"] += output_tokens
+            counters["latency_seconds"] += now - started
+            if counters["_first"] is None or started < counters["_first"]:
+                counters["_first"] = started
+            counters["_last"] = max(counters["_last"] or now, now)
+
+    def record_cache_hit(self, stage: str):
+        """A result served from a cache instead of a Gemini call"""
+        with self._lock:
+            self._stage(stage)["cache_hits"] += 1
+
+    def finish(self):
+        """Freeze the run's wall time"""
+        with self._lock:
+            if self._finished is None:
+                self._finished = time.monotonic()
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Totals and per-stage counters. wall_seconds of a stage spans its first
+        call to its last; stages overlap in the streaming pipeline.
+        """
+        with self._lock:
+            stages = {}
+            for stage, counters in self._stages.items():
+                stages[stage] = {key: value for key, value in counters.items() if not key.startswith("_")}
+                stages[stage]["latency_seconds"] = round(counters["latency_seconds"], 3)
+                span = (counters["_last"] - counters["_first"]) if counters["_first"] is not None else 0.0
+                stages[stage]["wall_seconds"] = round(span, 3)
+
+            totals = {counter: sum(s[counter] for s in stages.values()) for counter in STAGE_COUNTERS}
+            end = self._finished if self._finished is not None else time.monotonic()
+            return {
+                **totals,
+                "api_requests": totals["requests"],  # Name used by earlier processingStats
+                "wall_seconds": round(end - self._started, 3),
+                "stages": stages
+            }
+
+def current_usage() -> Optional[UsageTracker]:
+    """The tracker of the run in progress, or None"""
+    return _current.get()
+
+@contextmanager
+def track_usage(tracker: Optional[UsageTracker] = None) -> Iterator[UsageTracker]:
+    """
+    Record Gemini usage inside the block on a tracker. Nested blocks without a
+    tracker join the enclosing run instead of starting a new one.
+    """
+    tracker = tracker or _current.get() or UsageTracker()
+    token = _current.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _current.reset(token)
+
+def bind_usage(coro: Awaitable) -> Awaitable:
+    """coro, set up to record on the caller's tracker when run on another loop"""
+    tracker = _current.get()
+    if tracker is None:
+        return coro
+
+    async def bound():
+        _current.set(tracker)  # The task runs in its own copy of the context
+        return await coro
+
+    return bound()
+
+def usage_summary() -> Dict[str, Any]:
+    """Summary of the current run, or an empty one outside any tracker"""
+    tracker = _current.get()
+    return (tracker or UsageTracker()).summary()
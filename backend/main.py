@@ -4,13 +4,14 @@ Production-ready FastAPI application with async support
 """
 
 import os
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import time
 import uvicorn
 
@@ -29,6 +30,13 @@ from routes.analytics_routes import analytics_router
 
 # Import database
 from mongoDB.db_config import get_db
+from mongoDB.async_db import async_mongo_db, get_async_db, close_async_connection
+from analytics.cache import watch_for_invalidations
+from pipeline.executor import shutdown_executor
+from pipeline.jobs import shutdown_jobs
+from monitoring.metrics import observe_http_request, register_app_collectors, render_metrics
+from llm.client import shutdown_llm_client
+from llm.fake_model import check_fake_model
 
 # Configure logging
 def setup_logging():
@@ -65,6 +73,18 @@ async def lifespan(app: FastAPI):
         logger.error(f"❌ Database initialization failed: {e}")
         logger.warning("Application may not function properly without database connection")
     
+    # Warm up the async client used by the routes (opens MONGODB_MIN_POOL_SIZE connections)
+    try:
+        await async_mongo_db.ping()
+    except Exception as e:
+        logger.error(f"❌ Async database client could not reach MongoDB: {e}")
+    
+    # Invalidate cached analytics on writes from any process (replica sets / Atlas)
+    invalidation_watcher = asyncio.create_task(watch_for_invalidations(get_async_db()))
+    
+    # Refuses the fake model in production, warns about it elsewhere
+    check_fake_model()
+    
     # API key validation
     if not config.get_api_key():
         logger.warning("⚠️  Gemini API key not found. AI features will not work.")
@@ -78,6 +98,11 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("🛑 Shutting down AI Evaluation Backend...")
+    invalidation_watcher.cancel()
+    shutdown_jobs()
+    shutdown_executor(wait=False)
+    shutdown_llm_client()
+    close_async_connection()
 
 # Create FastAPI application
 def create_app() -> FastAPI:
@@ -111,13 +136,14 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
     
-    # Request timing middleware
+    # Request timing middleware (X-Process-Time header and the route latency histogram)
     @app.middleware("http")
     async def add_process_time_header(request: Request, call_next):
         start_time = time.time()
         response = await call_next(request)
         process_time = time.time() - start_time
         response.headers["X-Process-Time"] = str(process_time)
+        observe_http_request(request, response.status_code, process_time)
         return response
     
     # Error handling
@@ -154,9 +180,20 @@ def create_app() -> FastAPI:
             "status": "healthy",
             "message": "AI Evaluation Backend is running",
             "version": "2.0.0",
-            "framework": "FastAPI"
+            "framework": "FastAPI",
+            "fake_model": Config.LLM_FAKE_MODEL
         }
     
+    # Prometheus metrics (monitoring/metrics.py)
+    register_app_collectors()
+    
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Prometheus scrape endpoint"""
+        # Off the loop: the queue depth collector queries MongoDB
+        body, content_type = await asyncio.to_thread(render_metrics)
+        return Response(content=body, headers={"Content-Type": content_type})
+    
     # System information endpoint
     @app.get("/api/info", tags=["System"])
     async def system_info():
@@ -166,7 +203,8 @@ def create_app() -> FastAPI:
             "application": "AI Evaluation Backend",
             "version": "2.0.0",
             "framework": "FastAPI",
-            "environment": os.getenv('FLASK_ENV', 'development'),
+            "environment": Config.ENVIRONMENT,
+            "fake_model": Config.LLM_FAKE_MODEL,
             "database": "MongoDB Atlas",
             "configuration_issues": issues if issues else None
         }
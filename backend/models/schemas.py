@@ -132,4 +132,10 @@ class UploadStats(BaseModel):
     processing_files: int
     completed_files: int
     failed_files: int
-    total_size: int 
\ No newline at end of file
+    total_size: int 
+
+# Upload Evaluation Request
+class EvaluateUploadRequest(BaseModel):
+    questionPaperId: Optional[str] = None
+    evaluationType: str = "rubric"
+    studentName: Optional[str] = "Anonymous"
@@ -0,0 +1,102 @@
+"""
+Async MongoDB Access Layer
+Motor client shared by the FastAPI routes so queries never block the event loop
+
+The synchronous pymongo client in db_config.py stays in use for code that runs
+on worker threads (pipeline runner, upload queue worker). Route handlers use the
+collections below and await every operation:
+
+    evaluation = await evaluations_collection.find_one({'_id': ObjectId(evaluation_id)})
+    papers = await question_papers_collection.find(query).to_list(length=limit)
+
+The client connects lazily on the first operation and stays bound to that
+event loop (the FastAPI loop), so only await it from request handlers. Pool
+sizing comes from the MONGODB_*_POOL_SIZE settings.
+"""
+
+import logging
+from motor.motor_asyncio import AsyncIOMotorClient
+from config import Config
+from monitoring.metrics import mongo_event_listeners
+
+logger = logging.getLogger(__name__)
+
+class AsyncMongoDB:
+    _instance = None
+    _client = None
+    _db = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(AsyncMongoDB, cls).__new__(cls)
+        return cls._instance
+
+    def connect(self):
+        """Create the Motor client; no network I/O happens until the first operation"""
+        self._client = AsyncIOMotorClient(
+            Config.MONGODB_URI,
+            serverSelectionTimeoutMS=5000,
+            connectTimeoutMS=10000,
+            socketTimeoutMS=10000,
+            maxPoolSize=Config.MONGODB_MAX_POOL_SIZE,
+            minPoolSize=Config.MONGODB_MIN_POOL_SIZE,
+            maxIdleTimeMS=Config.MONGODB_MAX_IDLE_TIME_MS,
+            waitQueueTimeoutMS=Config.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+            retryWrites=True,
+            event_listeners=mongo_event_listeners()
+        )
+        self._db = self._client[Config.DATABASE_NAME]
+        logger.info(f"Async MongoDB client created (pool {Config.MONGODB_MIN_POOL_SIZE}-"
+                    f"{Config.MONGODB_MAX_POOL_SIZE} connections)")
+
+    @property
+    def db(self):
+        """Get the async database instance"""
+        if self._db is None:
+            self.connect()
+        return self._db
+
+    @property
+    def client(self):
+        """Get the Motor client instance"""
+        if self._client is None:
+            self.connect()
+        return self._client
+
+    def get_collection(self, collection_name):
+        """Get a specific async collection"""
+        return self.db[collection_name]
+
+    async def ping(self) -> bool:
+        """Check that the server is reachable"""
+        await self.client.admin.command('ping')
+        return True
+
+    def close_connection(self):
+        """Close the Motor client"""
+        if self._client:
+            self._client.close()
+            self._client = None
+            self._db = None
+            logger.info("Async MongoDB connection closed")
+
+# Singleton instance
+async_mongo_db = AsyncMongoDB()
+
+def get_async_db():
+    """Get async database instance"""
+    return async_mongo_db.db
+
+def get_async_collection(name):
+    """Get async collection by name"""
+    return async_mongo_db.get_collection(name)
+
+def close_async_connection():
+    """Close the shared Motor client (called on application shutdown)"""
+    async_mongo_db.close_connection()
+
+# Specific collections
+users_collection = async_mongo_db.get_collection('users')
+question_papers_collection = async_mongo_db.get_collection('question_papers')
+evaluations_collection = async_mongo_db.get_collection('evaluations')
+upload_queue_collection = async_mongo_db.get_collection('upload_queue')
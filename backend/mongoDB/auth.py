@@ -4,6 +4,7 @@ Handles user registration, login, and session management
 """
 
 import os
+import asyncio
 import bcrypt
 import jwt
 from datetime import datetime, timedelta
@@ -16,7 +17,7 @@ import logging
 logger = logging.getLogger(__name__)
 
 class AuthManager:
-    """MongoDB-based authentication manager"""
+    """MongoDB-based authentication manager (users_collection is a Motor collection)"""
     
     def __init__(self, users_collection):
         self.users_collection = users_collection
@@ -62,12 +63,12 @@ class AuthManager:
         except jwt.InvalidTokenError:
             return {"error": "Invalid token"}
     
-    def register_user(self, username: str, email: str, password: str, 
+    async def register_user(self, username: str, email: str, password: str, 
                      first_name: str = "", last_name: str = "", role: str = "student") -> dict:
         """Register a new user"""
         try:
             # Check if user already exists
-            existing_user = self.users_collection.find_one({
+            existing_user = await self.users_collection.find_one({
                 "$or": [{"username": username}, {"email": email}]
             })
             
@@ -77,8 +78,8 @@ class AuthManager:
                 else:
                     return {"success": False, "message": "Email already exists"}
             
-            # Hash password
-            hashed_password = self.hash_password(password)
+            # Hash password (bcrypt is deliberately slow; keep it off the event loop)
+            hashed_password = await asyncio.to_thread(self.hash_password, password)
             
             # Create user document
             from .models import UserModel
@@ -92,7 +93,7 @@ class AuthManager:
             )
             
             # Insert user
-            result = self.users_collection.insert_one(user_doc)
+            result = await self.users_collection.insert_one(user_doc)
             
             logger.info(f"New user registered: {username} ({email})")
             
@@ -106,11 +107,11 @@ class AuthManager:
             logger.error(f"Error registering user: {e}")
             return {"success": False, "message": f"Registration failed: {str(e)}"}
     
-    def login_user(self, username_or_email: str, password: str) -> dict:
+    async def login_user(self, username_or_email: str, password: str) -> dict:
         """Authenticate user login"""
         try:
             # Find user by username or email
-            user = self.users_collection.find_one({
+            user = await self.users_collection.find_one({
                 "$or": [
                     {"username": username_or_email},
                     {"email": username_or_email}
@@ -121,7 +122,7 @@ class AuthManager:
                 return {"success": False, "message": "User not found"}
             
             # Verify password
-            if not self.verify_password(password, user['password_hash']):
+            if not await asyncio.to_thread(self.verify_password, password, user['password_hash']):
                 return {"success": False, "message": "Invalid password"}
             
             # Check if user is active
@@ -129,7 +130,7 @@ class AuthManager:
                 return {"success": False, "message": "Account is deactivated"}
             
             # Update last login
-            self.users_collection.update_one(
+            await self.users_collection.update_one(
                 {"_id": user['_id']},
                 {"$set": {"last_login": datetime.utcnow()}}
             )
@@ -161,10 +162,10 @@ class AuthManager:
             logger.error(f"Error during login: {e}")
             return {"success": False, "message": f"Login failed: {str(e)}"}
     
-    def get_user_by_id(self, user_id: str) -> dict:
+    async def get_user_by_id(self, user_id: str) -> dict:
         """Get user information by ID"""
         try:
-            user = self.users_collection.find_one({"_id": ObjectId(user_id)})
+            user = await self.users_collection.find_one({"_id": ObjectId(user_id)})
             if user:
                 user['_id'] = str(user['_id'])
                 user.pop('password_hash', None)  # Remove password hash
@@ -174,7 +175,7 @@ class AuthManager:
             logger.error(f"Error getting user by ID: {e}")
             return None
     
-    def update_user_profile(self, user_id: str, updates: dict) -> dict:
+    async def update_user_profile(self, user_id: str, updates: dict) -> dict:
         """Update user profile information"""
         try:
             # Remove sensitive fields that shouldn't be updated this way
@@ -184,7 +185,7 @@ class AuthManager:
             
             updates['updated_at'] = datetime.utcnow()
             
-            result = self.users_collection.update_one(
+            result = await self.users_collection.update_one(
                 {"_id": ObjectId(user_id)},
                 {"$set": updates}
             )
@@ -198,22 +199,22 @@ class AuthManager:
             logger.error(f"Error updating user profile: {e}")
             return {"success": False, "message": f"Update failed: {str(e)}"}
     
-    def change_password(self, user_id: str, current_password: str, new_password: str) -> dict:
+    async def change_password(self, user_id: str, current_password: str, new_password: str) -> dict:
         """Change user password"""
         try:
-            user = self.users_collection.find_one({"_id": ObjectId(user_id)})
+            user = await self.users_collection.find_one({"_id": ObjectId(user_id)})
             if not user:
                 return {"success": False, "message": "User not found"}
             
             # Verify current password
-            if not self.verify_password(current_password, user['password_hash']):
+            if not await asyncio.to_thread(self.verify_password, current_password, user['password_hash']):
                 return {"success": False, "message": "Current password is incorrect"}
             
             # Hash new password
-            new_hashed = self.hash_password(new_password)
+            new_hashed = await asyncio.to_thread(self.hash_password, new_password)
             
             # Update password
-            self.users_collection.update_one(
+            await self.users_collection.update_one(
                 {"_id": ObjectId(user_id)},
                 {"$set": {
                     "password_hash": new_hashed,
@@ -226,11 +227,18 @@ class AuthManager:
         except Exception as e:
             logger.error(f"Error changing password: {e}")
             return {"success": False, "message": f"Password change failed: {str(e)}"}
+    
+    async def get_all_users(self) -> list:
+        """Get all users (without password hashes) shaped for UserResponse"""
+        users = await self.users_collection.find({}, {"password_hash": 0}).to_list(length=None)
+        for user in users:
+            user['id'] = str(user.pop('_id'))
+        return users
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(HTTPBearer())):
     """FastAPI dependency to get current authenticated user"""
     try:
-        from mongoDB.db_config import users_collection
+        from mongoDB.async_db import users_collection
         auth_manager = AuthManager(users_collection)
         
         payload = auth_manager.verify_token(credentials.credentials)
@@ -256,7 +264,7 @@ async def get_current_user_optional(credentials: HTTPAuthorizationCredentials =
         return None
     
     try:
-        from mongoDB.db_config import users_collection
+        from mongoDB.async_db import users_collection
         auth_manager = AuthManager(users_collection)
         
         payload = auth_manager.verify_token(credentials.credentials)
@@ -10,6 +10,7 @@ from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
 from datetime import datetime
 from bson.objectid import ObjectId
 from config import Config
+from monitoring.metrics import mongo_event_listeners
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -42,7 +43,8 @@ class MongoDB:
                 connectTimeoutMS=10000,         # 10 second connection timeout
                 socketTimeoutMS=10000,          # 10 second socket timeout
                 maxPoolSize=10,                 # Maximum number of connections
-                retryWrites=True               # Enable retryable writes
+                retryWrites=True,              # Enable retryable writes
+                event_listeners=mongo_event_listeners()  # Command latency metrics
             )
             
             # Test the connection
@@ -71,6 +73,7 @@ class MongoDB:
                 'users',
                 'question_papers',
                 'evaluations',
+                'evaluation_details',
                 'courses',
                 'classes',
                 'assignments',
@@ -93,35 +96,14 @@ class MongoDB:
             logger.error(f"Error initializing collections: {e}")
     
     def _create_indexes(self):
-        """Create database indexes for better query performance"""
+        """Migrate indexes to the declared set (see mongoDB/indexes.py)"""
         try:
-            # Question papers indexes
-            self._db.question_papers.create_index([("createdAt", -1)])
-            self._db.question_papers.create_index([("title", "text")])
-            self._db.question_papers.create_index([("type", 1)])
+            from mongoDB.indexes import migrate_indexes
+            migrate_indexes(self._db)
             
-            # Evaluations indexes
-            self._db.evaluations.create_index([("createdAt", -1)])
-            self._db.evaluations.create_index([("studentId", 1)])
-            self._db.evaluations.create_index([("questionPaperId", 1)])
-            
-            # Users indexes
-            self._db.users.create_index([("email", 1)], unique=True)
-            self._db.users.create_index([("username", 1)], unique=True)
-            
-            # Upload queue indexes
-            self._db.upload_queue.create_index([("user_id", 1)])
-            self._db.upload_queue.create_index([("status", 1)])
-            self._db.upload_queue.create_index([("created_at", -1)])
-            self._db.upload_queue.create_index([("user_id", 1), ("status", 1)])
-            
-            # Courses indexes
-            self._db.courses.create_index([("courseCode", 1)], unique=True)
-            self._db.courses.create_index([("createdAt", -1)])
-            
-            # Classes indexes
-            self._db.classes.create_index([("courseId", 1)])
-            self._db.classes.create_index([("semester", 1)])
+            # Analytics rollup indexes
+            from analytics.rollups import create_rollup_indexes
+            create_rollup_indexes(self._db)
             
             logger.info("Database indexes created successfully")
             
@@ -0,0 +1,268 @@
+"""
+Evaluation Store
+Lean evaluation headers with OCR text and per-question details stored apart
+
+An evaluation is written as two documents sharing one _id:
+
+- evaluations          the header: student, paper, summary and per-question scores
+                       (everything lists, analytics and rollups read)
+- evaluation_details   the OCR text and full per-question entries (question,
+                       answer, feedback, rubric breakdown) as one compressed BSON blob
+
+Only the detail views (GET /evaluate/{id}, fields=evaluations/ocr_text) read
+the blob. Documents written before the split keep everything inline and are
+returned unchanged; move them with:
+
+    python -m mongoDB.evaluation_store --migrate
+"""
+
+import argparse
+import logging
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import bson
+from bson.binary import Binary
+from bson.objectid import ObjectId
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from config import Config
+
+try:
+    import zstandard
+except ImportError:  # Optional; zlib is used instead
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+DETAILS_COLLECTION = 'evaluation_details'
+
+# Fields only the detail views need
+DETAIL_FIELDS = ('ocr_text', 'evaluations')
+
+# Per-question fields kept on the header (scores read by analytics and rollups)
+HEADER_QUESTION_FIELDS = (
+    'questionNumber', 'maxMarks', 'obtainedMarks', 'percentage', 'evaluationType',
+    'max_marks', 'marks_obtained', 'percentage_score'
+)
+
+def _codec() -> str:
+    codec = Config.EVALUATION_DETAIL_COMPRESSION.lower()
+    if codec == 'zstd' and zstandard is None:
+        return 'zlib'
+    return codec if codec in ('zstd', 'zlib') else 'none'
+
+def _compress(raw: bytes, codec: str) -> bytes:
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=3).compress(raw)
+    if codec == 'zlib':
+        return zlib.compress(raw, 6)
+    return raw
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("Evaluation details are zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == 'zlib':
+        return zlib.decompress(data)
+    return data
+
+def split_evaluation_document(doc: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    (header, details) for an evaluation document that has an _id.
+
+    The header keeps per-question scores only; the details document holds the
+    OCR text and the full per-question entries, compressed.
+    """
+    payload = {
+        'ocr_text': doc.get('ocr_text'),
+        'evaluations': doc.get('evaluations') or []
+    }
+    raw = bson.encode(payload)
+    codec = _codec()
+
+    header = {key: value for key, value in doc.items() if key not in DETAIL_FIELDS}
+    header['evaluations'] = [
+        {field: entry[field] for field in HEADER_QUESTION_FIELDS if field in entry}
+        for entry in payload['evaluations'] if isinstance(entry, dict)
+    ]
+    header['has_details'] = True
+
+    details = {
+        '_id': doc['_id'],
+        'encoding': codec,
+        'raw_size': len(raw),
+        'data': Binary(_compress(raw, codec)),
+        'created_at': doc.get('created_at') or datetime.now()
+    }
+    return header, details
+
+def decode_details(details: Dict[str, Any]) -> Dict[str, Any]:
+    """{'ocr_text', 'evaluations'} stored in a details document"""
+    return bson.decode(_decompress(bytes(details['data']), details.get('encoding', 'none')))
+
+def merge_details(header: Dict[str, Any], details: Optional[Dict[str, Any]], fields: Iterable[str] = DETAIL_FIELDS) -> Dict[str, Any]:
+    """header with the requested detail fields restored (unchanged if there are no details)"""
+    if not details:
+        return header
+    payload = decode_details(details)
+    for field in fields:
+        header[field] = payload.get(field)
+    return header
+
+def insert_evaluation(db, doc: Dict[str, Any]) -> ObjectId:
+    """Store an evaluation (pymongo); returns its id"""
+    doc.setdefault('_id', ObjectId())
+    header, details = split_evaluation_document(doc)
+    # Details first: a failed header write leaves an unreferenced blob, never a header without details
+    db[DETAILS_COLLECTION].insert_one(details)
+    db.evaluations.insert_one(header)
+    return doc['_id']
+
+def insert_evaluation_once(db, doc: Dict[str, Any], upload_id: str) -> Tuple[ObjectId, bool]:
+    """
+    Store the evaluation of an upload at most once (unique upload_id index).
+
+    Returns (evaluation id, created). When a worker that lost its lease and
+    the worker that reclaimed the job both finish, the second write returns
+    the first evaluation's id with created False.
+    """
+    doc['upload_id'] = upload_id
+    try:
+        return insert_evaluation(db, doc), True
+    except DuplicateKeyError:
+        db[DETAILS_COLLECTION].delete_one({'_id': doc['_id']})  # Blob written before the header was refused
+        existing_id = find_upload_evaluation(db, upload_id)
+        if existing_id is None:
+            raise
+        return existing_id, False
+
+def find_upload_evaluation(db, upload_id: str) -> Optional[ObjectId]:
+    """Id of the evaluation already stored for an upload, or None"""
+    existing = db.evaluations.find_one({'upload_id': upload_id}, {'_id': 1})
+    return existing['_id'] if existing else None
+
+async def insert_evaluation_async(db, doc: Dict[str, Any]) -> ObjectId:
+    """insert_evaluation for route handlers (Motor database)"""
+    doc.setdefault('_id', ObjectId())
+    header, details = split_evaluation_document(doc)
+    await db[DETAILS_COLLECTION].insert_one(details)
+    await db.evaluations.insert_one(header)
+    return doc['_id']
+
+async def insert_evaluations_async(db, docs: List[Dict[str, Any]]) -> List[Optional[str]]:
+    """
+    Store many evaluations with two unordered insert_many calls (details, then
+    headers). Returns None per stored document and the write error otherwise;
+    one bad document does not stop the rest.
+    """
+    errors: List[Optional[str]] = [None] * len(docs)
+    if not docs:
+        return errors
+
+    pairs = []
+    for doc in docs:
+        doc.setdefault('_id', ObjectId())
+        pairs.append(split_evaluation_document(doc))
+
+    async def insert(collection: str, positions: List[int], documents: List[Dict[str, Any]]):
+        try:
+            await db[collection].insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get('writeErrors', []):
+                errors[positions[error['index']]] = error.get('errmsg', 'Write failed')
+
+    positions = list(range(len(docs)))
+    await insert(DETAILS_COLLECTION, positions, [details for _, details in pairs])
+
+    positions = [i for i in positions if errors[i] is None]
+    if positions:
+        await insert('evaluations', positions, [pairs[i][0] for i in positions])
+    return errors
+
+async def load_evaluation_async(db, evaluation_id: ObjectId) -> Optional[Dict[str, Any]]:
+    """Full evaluation (header plus details), or None"""
+    header = await db.evaluations.find_one({'_id': evaluation_id})
+    if not header or not header.get('has_details'):
+        return header
+    details = await db[DETAILS_COLLECTION].find_one({'_id': evaluation_id})
+    return merge_details(header, details)
+
+async def attach_details_async(db, headers: List[Dict[str, Any]], fields: Iterable[str] = DETAIL_FIELDS) -> List[Dict[str, Any]]:
+    """Restore detail fields on a page of headers with one query"""
+    fields = [field for field in fields if field in DETAIL_FIELDS]
+    ids = [header['_id'] for header in headers if header.get('has_details')]
+    if not fields or not ids:
+        return headers
+
+    details = await db[DETAILS_COLLECTION].find({'_id': {'$in': ids}}).to_list(length=len(ids))
+    by_id = {detail['_id']: detail for detail in details}
+    for header in headers:
+        merge_details(header, by_id.get(header['_id']), fields)
+    return headers
+
+async def delete_evaluation_async(db, evaluation_id: ObjectId) -> int:
+    """Delete an evaluation and its details; returns the number of headers deleted"""
+    result = await db.evaluations.delete_one({'_id': evaluation_id})
+    await db[DETAILS_COLLECTION].delete_one({'_id': evaluation_id})
+    return result.deleted_count
+
+def migrate_inline_evaluations(db, batch_size: int = 200, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Move OCR text and per-question details of inline (pre-split) evaluations
+    into evaluation_details. Safe to re-run: migrated headers are skipped and
+    details are written with replace-by-_id.
+    """
+    stats = {'migrated': 0, 'bytes_before': 0, 'bytes_after': 0, 'detail_bytes': 0}
+    query = {'has_details': {'$ne': True}}
+
+    def flush(details_ops, header_ops):
+        if details_ops and not dry_run:
+            db[DETAILS_COLLECTION].bulk_write(details_ops, ordered=False)
+            db.evaluations.bulk_write(header_ops, ordered=False)
+
+    details_ops, header_ops = [], []
+    for doc in db.evaluations.find(query, batch_size=batch_size):
+        header, details = split_evaluation_document(doc)
+        stats['migrated'] += 1
+        stats['bytes_before'] += len(bson.encode(doc))
+        stats['bytes_after'] += len(bson.encode(header))
+        stats['detail_bytes'] += len(details['data'])
+
+        details_ops.append(ReplaceOne({'_id': doc['_id']}, details, upsert=True))
+        # Guarded on has_details so a concurrent migration cannot strip already split headers
+        header_ops.append(UpdateOne(
+            {'_id': doc['_id'], 'has_details': {'$ne': True}},
+            {'$set': {'evaluations': header['evaluations'], 'has_details': True}, '$unset': {'ocr_text': ''}}
+        ))
+        if len(details_ops) >= batch_size:
+            flush(details_ops, header_ops)
+            details_ops, header_ops = [], []
+    flush(details_ops, header_ops)
+
+    logger.info(f"{'Would migrate' if dry_run else 'Migrated'} {stats['migrated']} evaluations: headers "
+                f"{stats['bytes_before']} -> {stats['bytes_after']} bytes, details {stats['detail_bytes']} bytes ({_codec()})")
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluation detail storage maintenance")
+    parser.add_argument("--migrate", action="store_true", help="Split inline evaluations into header + details")
+    parser.add_argument("--dry-run", action="store_true", help="Report sizes without writing")
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if not args.migrate:
+        parser.print_help()
+        return
+
+    from mongoDB.db_config import get_db
+    stats = migrate_inline_evaluations(get_db(), args.batch_size, args.dry_run)
+    for name, value in stats.items():
+        print(f"{name}: {value}")
+
+if __name__ == "__main__":
+    main()
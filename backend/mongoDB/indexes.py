@@ -0,0 +1,305 @@
+"""
+Index Manager
+Declares the indexes each collection needs, migrates them at startup and
+checks that the hot route queries are served by an index
+
+Every index below exists because a query in the codebase filters or sorts on
+its fields; the comment next to it names the query. Migration creates missing
+indexes and drops the ones in OBSOLETE_INDEXES (fields the code never used).
+Other existing indexes are left alone and reported by --audit.
+
+    python -m mongoDB.indexes --audit     # managed / missing / unmanaged per collection
+    python -m mongoDB.indexes --migrate   # apply to the configured database
+    python -m mongoDB.indexes --check     # seed a scratch database and fail on any COLLSCAN
+"""
+
+import argparse
+import logging
+import random
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel, TEXT
+
+from config import Config
+from mongoDB.pagination import PAGE_SORT, after_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_INDEXES: Dict[str, List[IndexModel]] = {
+    'evaluations': [
+        IndexModel([('created_at', DESCENDING), ('_id', DESCENDING)]),            # list_evaluations, recent activity
+        IndexModel([('student_id', ASCENDING), ('created_at', DESCENDING),
+                    ('_id', DESCENDING)]),                                          # list_evaluations for a user
+        IndexModel([('question_paper_id', ASCENDING), ('created_at', DESCENDING),
+                    ('_id', DESCENDING)]),                                          # list_evaluations?question_paper_id=
+        IndexModel([('upload_id', ASCENDING)], unique=True, sparse=True),         # one evaluation per queued upload
+    ],
+    'question_papers': [
+        IndexModel([('created_at', DESCENDING), ('_id', DESCENDING)]),            # list_question_papers, recent activity
+        IndexModel([('title', TEXT)]),
+        IndexModel([('type', ASCENDING)]),
+        IndexModel([('parse_id', ASCENDING)], sparse=True),                        # parse_question_paper_file (cached parse)
+    ],
+    'question_paper_parses': [
+        IndexModel([('last_used_at', ASCENDING)],
+                   expireAfterSeconds=Config.QUESTION_PAPER_PARSE_CACHE_TTL_DAYS * 86400),  # parse cache expiry
+    ],
+    'upload_queue': [
+        IndexModel([('user_id', ASCENDING), ('created_at', DESCENDING),
+                    ('_id', DESCENDING)]),                                          # get_uploads, upload stats
+        IndexModel([('user_id', ASCENDING), ('status', ASCENDING)]),
+        IndexModel([('status', ASCENDING), ('evaluation_requested_at', ASCENDING)]),  # worker claim (queued)
+        IndexModel([('status', ASCENDING), ('lease_expires_at', ASCENDING)]),         # worker claim (expired lease)
+        IndexModel([('created_at', DESCENDING)]),                                  # recent activity
+    ],
+    'users': [
+        IndexModel([('email', ASCENDING)], unique=True),                           # login, registration
+        IndexModel([('username', ASCENDING)], unique=True),
+    ],
+    'courses': [
+        IndexModel([('courseCode', ASCENDING)], unique=True),
+        IndexModel([('createdAt', DESCENDING)]),
+    ],
+    'classes': [
+        IndexModel([('courseId', ASCENDING)]),
+        IndexModel([('semester', ASCENDING)]),
+    ],
+}
+
+# Indexes on field names the documents never had (EvaluationModel writes snake_case)
+OBSOLETE_INDEXES: Dict[str, List[str]] = {
+    'evaluations': ['createdAt_-1', 'studentId_1', 'questionPaperId_1'],
+    'question_papers': ['createdAt_-1'],
+}
+
+def _key(fields) -> Tuple:
+    """Comparable index key; index_information() may report directions as floats"""
+    return tuple((field, int(direction) if isinstance(direction, (int, float)) else direction)
+                 for field, direction in fields)
+
+def _model_key(model: IndexModel) -> Tuple:
+    return _key(model.document['key'].items())
+
+def _is_present(model: IndexModel, existing: Dict[str, Any]) -> bool:
+    """Same key under any name; text indexes are reported as _fts/_ftsx keys, so match those by name"""
+    return model.document['name'] in existing or \
+        any(_key(info['key']) == _model_key(model) for info in existing.values())
+
+def migrate_indexes(db) -> Dict[str, Dict[str, List[str]]]:
+    """Create missing required indexes and drop obsolete ones; returns what changed per collection"""
+    report = {}
+    for collection, models in REQUIRED_INDEXES.items():
+        existing = db[collection].index_information()
+
+        missing = [model for model in models if not _is_present(model, existing)]
+        created = db[collection].create_indexes(missing) if missing else []
+
+        dropped = []
+        for name in OBSOLETE_INDEXES.get(collection, []):
+            if name in existing:
+                db[collection].drop_index(name)
+                dropped.append(name)
+
+        if created or dropped:
+            report[collection] = {'created': created, 'dropped': dropped}
+            logger.info(f"Indexes on {collection}: created {created}, dropped {dropped}")
+    return report
+
+def audit_indexes(db) -> Dict[str, Dict[str, List[str]]]:
+    """Managed, missing and unmanaged (neither required nor obsolete) index names per collection"""
+    audit = {}
+    for collection, models in REQUIRED_INDEXES.items():
+        existing = db[collection].index_information()
+        required_keys = {_model_key(model) for model in models}
+        required_names = {model.document['name'] for model in models}
+        obsolete = OBSOLETE_INDEXES.get(collection, [])
+
+        managed = [
+            name for name, info in existing.items()
+            if name in required_names or _key(info['key']) in required_keys
+        ]
+        audit[collection] = {
+            'managed': managed,
+            'missing': [model.document['name'] for model in models if not _is_present(model, existing)],
+            'obsolete': [name for name in obsolete if name in existing],
+            'unmanaged': [name for name in existing if name != '_id_' and name not in managed and name not in obsolete]
+        }
+    return audit
+
+def hot_queries() -> List[Dict[str, Any]]:
+    """
+    The filter/sort shapes the routes and worker run most, with representative
+    values. find queries have 'filter'/'sort'; count_documents and aggregations
+    have 'pipeline'.
+    """
+    now = datetime.now()
+    cursor = encode_cursor({'created_at': now - timedelta(days=1), '_id': ObjectId()})
+    student = {'student_id': 'student1'}
+    uploader = {'user_id': 'student1'}
+    return [
+        {'name': 'list_evaluations', 'collection': 'evaluations', 'filter': {}, 'sort': PAGE_SORT},
+        {'name': 'list_evaluations (next page)', 'collection': 'evaluations',
+         'filter': after_cursor({}, cursor), 'sort': PAGE_SORT},
+        {'name': 'list_evaluations (user)', 'collection': 'evaluations', 'filter': student, 'sort': PAGE_SORT},
+        {'name': 'list_evaluations (user, next page)', 'collection': 'evaluations',
+         'filter': after_cursor(student, cursor), 'sort': PAGE_SORT},
+        {'name': 'list_evaluations (user total)', 'collection': 'evaluations',
+         'pipeline': [{'$match': student}, {'$group': {'_id': 1, 'n': {'$sum': 1}}}]},
+        {'name': 'list_evaluations (question paper)', 'collection': 'evaluations',
+         'filter': {'question_paper_id': 'manual'}, 'sort': PAGE_SORT},
+        {'name': 'recent activity (evaluations)', 'collection': 'evaluations',
+         'filter': {'created_at': {'$gte': now - timedelta(days=7)}}, 'sort': [('created_at', -1)]},
+        {'name': 'list_question_papers', 'collection': 'question_papers', 'filter': {}, 'sort': PAGE_SORT},
+        {'name': 'list_question_papers (next page)', 'collection': 'question_papers',
+         'filter': after_cursor({}, cursor), 'sort': PAGE_SORT},
+        {'name': 'recent activity (question papers)', 'collection': 'question_papers',
+         'filter': {'created_at': {'$gte': now - timedelta(days=7)}}, 'sort': [('created_at', -1)]},
+        {'name': 'question paper for a cached parse', 'collection': 'question_papers',
+         'filter': {'parse_id': 'parse1'}},
+        {'name': 'get_uploads', 'collection': 'upload_queue', 'filter': uploader, 'sort': PAGE_SORT},
+        {'name': 'get_uploads (status)', 'collection': 'upload_queue',
+         'filter': {**uploader, 'status': 'queued'}, 'sort': PAGE_SORT},
+        {'name': 'upload stats', 'collection': 'upload_queue',
+         'pipeline': [{'$match': uploader}, {'$group': {'_id': '$status', 'count': {'$sum': 1}}}]},
+        {'name': 'worker claim', 'collection': 'upload_queue',
+         'filter': {'$or': [
+             {'status': 'queued', 'evaluation_requested_at': {'$ne': None}},
+             {'status': 'processing', 'lease_expires_at': {'$lt': now}}
+         ]},
+         'sort': [('evaluation_requested_at', 1)]},
+        {'name': 'pending uploads count', 'collection': 'upload_queue',
+         'pipeline': [{'$match': {'status': 'pending'}}, {'$group': {'_id': 1, 'n': {'$sum': 1}}}]},
+        {'name': 'recent activity (uploads)', 'collection': 'upload_queue',
+         'filter': {'created_at': {'$gte': now - timedelta(days=7)}}, 'sort': [('created_at', -1)]},
+        {'name': 'login', 'collection': 'users',
+         'filter': {'$or': [{'username': 'student1'}, {'email': 'student1'}]}},
+    ]
+
+def _winning_stages(explain: Any) -> List[str]:
+    """Every stage name in the winning plan(s) of an explain document (rejected plans skipped)"""
+    stages = []
+
+    def walk(node, in_winning_plan):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key == 'rejectedPlans':
+                    continue
+                if key == 'stage' and in_winning_plan and isinstance(value, str):
+                    stages.append(value)
+                walk(value, in_winning_plan or key == 'winningPlan')
+        elif isinstance(node, list):
+            for item in node:
+                walk(item, in_winning_plan)
+
+    walk(explain, False)
+    return stages
+
+def explain_query(db, query: Dict[str, Any]) -> List[str]:
+    """Winning plan stages of one hot query"""
+    collection = db[query['collection']]
+    if 'pipeline' in query:
+        explain = db.command('aggregate', query['collection'], pipeline=query['pipeline'], explain=True)
+    else:
+        cursor = collection.find(query['filter'])
+        if query.get('sort'):
+            cursor = cursor.sort(query['sort'])
+        explain = cursor.limit(20).explain()
+    return _winning_stages(explain)
+
+def check_query_plans(db) -> List[Tuple[str, List[str]]]:
+    """(query name, winning plan stages) of every hot query that scans a whole collection"""
+    offenders = []
+    for query in hot_queries():
+        stages = explain_query(db, query)
+        logger.info(f"{query['name']:<40} {' <- '.join(stages)}")
+        if 'COLLSCAN' in stages:
+            offenders.append((query['name'], stages))
+    return offenders
+
+def seed_dataset(db, docs: int = 2000):
+    """Documents shaped like production data, enough for the planner to prefer an index"""
+    random.seed(15)
+    now = datetime.now()
+    students = [f"student{i}" for i in range(50)]
+    statuses = ['queued', 'processing', 'completed', 'failed']
+
+    db.users.insert_many([
+        {'username': name, 'email': f"{name}@example.com", 'role': 'student', 'created_at': now}
+        for name in students
+    ])
+    paper_ids = db.question_papers.insert_many([
+        {'title': f"Paper {i}", 'type': 'MANUAL', 'questions': [], 'created_at': now - timedelta(hours=i)}
+        for i in range(max(docs // 20, 10))
+    ]).inserted_ids
+    db.evaluations.insert_many([
+        {
+            'student_id': random.choice(students),
+            'question_paper_id': random.choice(paper_ids + ['manual', 'pipeline']),
+            'evaluations': [],
+            'summary': {},
+            'created_at': now - timedelta(minutes=i)
+        }
+        for i in range(docs)
+    ])
+    db.upload_queue.insert_many([
+        {
+            'user_id': random.choice(students),
+            'status': random.choice(statuses),
+            'evaluation_requested_at': now - timedelta(minutes=i) if i % 3 else None,
+            'lease_expires_at': now + timedelta(minutes=5) if i % 4 == 0 else None,
+            'file_size': 1000,
+            'created_at': now - timedelta(minutes=i)
+        }
+        for i in range(docs)
+    ])
+
+def main():
+    parser = argparse.ArgumentParser(description="MongoDB index maintenance")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--audit", action="store_true", help="Report managed, missing and unmanaged indexes")
+    group.add_argument("--migrate", action="store_true", help="Create missing and drop obsolete indexes")
+    group.add_argument("--check", action="store_true",
+                       help="Seed a scratch database, migrate it and fail if a hot query does a COLLSCAN")
+    parser.add_argument("--docs", type=int, default=2000, help="Documents to seed for --check")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    from pymongo import MongoClient
+    from config import Config
+
+    client = MongoClient(Config.MONGODB_URI, serverSelectionTimeoutMS=5000)
+    try:
+        if args.audit:
+            for collection, indexes in audit_indexes(client[Config.DATABASE_NAME]).items():
+                print(f"{collection}: " + ", ".join(f"{kind}={names}" for kind, names in indexes.items()))
+            return
+
+        if args.migrate:
+            report = migrate_indexes(client[Config.DATABASE_NAME])
+            print(report or "Indexes already up to date")
+            return
+
+        scratch = f"{Config.DATABASE_NAME}_indexcheck"
+        client.drop_database(scratch)
+        try:
+            db = client[scratch]
+            seed_dataset(db, args.docs)
+            migrate_indexes(db)
+            offenders = check_query_plans(db)
+        finally:
+            client.drop_database(scratch)
+
+        if offenders:
+            for name, stages in offenders:
+                print(f"COLLSCAN: {name} ({' <- '.join(stages)})")
+            sys.exit(1)
+        print(f"All {len(hot_queries())} hot queries use an index")
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Keyset Pagination
+Cursor-based paging and summary projections shared by the list endpoints
+
+Pages are ordered newest first on (created_at, _id) and continue from an
+opaque cursor holding the last document's sort key, so page 500 costs the
+same index seek as page one (skip() walks every skipped document):
+
+    docs, next_cursor = await fetch_page(collection, query, limit, cursor, projection)
+
+List endpoints return summary fields only; callers add heavy fields with
+fields=a,b or request whole documents with fields=all.
+"""
+
+import base64
+import json
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+
+PAGE_SORT = [('created_at', -1), ('_id', -1)]
+ALL_FIELDS = 'all'
+
+_FIELD_NAME_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z0-9_]+)*$')
+
+class PaginationError(ValueError):
+    """Invalid cursor or fields parameter (reported to the caller as 400)"""
+    pass
+
+def encode_cursor(doc: Dict[str, Any]) -> str:
+    """Opaque cursor pointing just past doc in PAGE_SORT order"""
+    created_at = doc.get('created_at')
+    key = [created_at.isoformat() if isinstance(created_at, datetime) else None, str(doc['_id'])]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], ObjectId]:
+    """(created_at, _id) of the last document of the previous page"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, doc_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (datetime.fromisoformat(created_at) if created_at else None), ObjectId(doc_id)
+    except (ValueError, TypeError, InvalidId):
+        raise PaginationError("Invalid pagination cursor")
+
+def after_cursor(query: Dict[str, Any], cursor: Optional[str]) -> Dict[str, Any]:
+    """query restricted to documents that sort after cursor"""
+    if not cursor:
+        return query
+
+    created_at, doc_id = decode_cursor(cursor)
+    if created_at is None:
+        # Documents without created_at sort last; only the _id tiebreak is left
+        keyset = {'created_at': None, '_id': {'$lt': doc_id}}
+    else:
+        keyset = {'$or': [
+            {'created_at': {'$lt': created_at}},
+            {'created_at': created_at, '_id': {'$lt': doc_id}},
+            {'created_at': None}
+        ]}
+    return {'$and': [query, keyset]} if query else keyset
+
+def build_projection(
+    summary_fields: Iterable[str],
+    fields: Optional[str],
+    computed: Optional[Dict[str, Any]] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Projection for a list endpoint: summary_fields plus the comma-separated
+    extra fields, or None (whole documents) for fields=all. computed adds
+    aggregation expressions to the summary (e.g. array sizes).
+    """
+    if fields and fields.strip() == ALL_FIELDS:
+        return None
+
+    projection: Dict[str, Any] = {name: 1 for name in summary_fields}
+    projection['created_at'] = 1  # The cursor is built from it
+    for name in (fields or '').split(','):
+        name = name.strip()
+        if not name:
+            continue
+        if not _FIELD_NAME_RE.match(name):
+            raise PaginationError(f"Invalid field name: {name}")
+        projection[name] = 1
+    if computed:
+        projection.update(computed)
+    return projection
+
+async def fetch_page(
+    collection,
+    query: Dict[str, Any],
+    limit: int,
+    cursor: Optional[str] = None,
+    projection: Optional[Dict[str, Any]] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """One page of a Motor collection; returns (documents, next_cursor or None)"""
+    # One extra document tells whether another page exists without counting
+    docs = await collection.find(after_cursor(query, cursor), projection) \
+        .sort(PAGE_SORT).limit(limit + 1).to_list(length=limit + 1)
+
+    if len(docs) <= limit:
+        return docs, None
+    docs = docs[:limit]
+    return docs, encode_cursor(docs[-1])
@@ -0,0 +1,198 @@
+"""
+Prometheus Metrics
+Latency histograms and counters for the API, the LLM stages and MongoDB
+
+GET /metrics (main.py) serves, in the Prometheus text format:
+
+- http_request_duration_seconds{method, route, status}   per route template
+- ocr_page_duration_seconds{source}                      gemini or cache, per page
+- llm_call_duration_seconds{stage, outcome}              per logical call, retries included
+- llm_retries_total / llm_rate_limited_total / llm_timeouts_total{stage}
+- llm_rate_limiter_wait_seconds{stage}                   time spent waiting for quota
+- llm_in_flight                                          Gemini calls in flight
+- mongodb_command_duration_seconds{command, outcome}     every pymongo/Motor command
+- upload_queue_jobs{status}                              queue depth, read at scrape time
+- pipeline_jobs{status}                                  background pipeline jobs
+
+Hooks only observe values the code already measures (an observe() is a lock
+and a bucket search). MongoDB latency comes from the driver's command
+monitoring events, which carry the duration. The queue depth query runs at
+scrape time, never on a request path.
+
+Worker processes serve their own metrics with --metrics-port (worker/worker.py).
+prometheus_client is optional; without it, or with METRICS_ENABLED=false,
+every hook is a no-op.
+"""
+
+import logging
+import time
+from typing import Any, Tuple
+
+from config import Config
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest, start_http_server
+    from prometheus_client.core import GaugeMetricFamily
+except ImportError:  # Optional; metrics are disabled without it
+    REGISTRY = None
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+ENABLED = REGISTRY is not None and Config.METRICS_ENABLED
+
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300)
+WAIT_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60)
+MONGO_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 10)
+
+class _NoopMetric:
+    """Stands in for every metric when metrics are disabled"""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, value: float):
+        pass
+
+    def inc(self, amount: float = 1):
+        pass
+
+    def set_function(self, fn):
+        pass
+
+_NOOP = _NoopMetric()
+
+def _histogram(name: str, documentation: str, labels: Tuple[str, ...] = (), **kwargs):
+    return Histogram(name, documentation, labels, **kwargs) if ENABLED else _NOOP
+
+def _counter(name: str, documentation: str, labels: Tuple[str, ...] = ()):
+    return Counter(name, documentation, labels) if ENABLED else _NOOP
+
+def _gauge(name: str, documentation: str, labels: Tuple[str, ...] = ()):
+    return Gauge(name, documentation, labels) if ENABLED else _NOOP
+
+HTTP_REQUEST_DURATION = _histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route", "status")
+)
+OCR_PAGE_DURATION = _histogram(
+    "ocr_page_duration_seconds", "OCR latency per page image", ("source",), buckets=LLM_BUCKETS
+)
+LLM_CALL_DURATION = _histogram(
+    "llm_call_duration_seconds", "Gemini call latency including limiter waits and retries",
+    ("stage", "outcome"), buckets=LLM_BUCKETS
+)
+LLM_RETRIES = _counter("llm_retries_total", "Gemini call attempts that were retried", ("stage",))
+LLM_RATE_LIMITED = _counter("llm_rate_limited_total", "Gemini 429 responses", ("stage",))
+LLM_TIMEOUTS = _counter("llm_timeouts_total", "Gemini attempts cancelled by the timeout", ("stage",))
+LLM_LIMITER_WAIT = _histogram(
+    "llm_rate_limiter_wait_seconds", "Time spent waiting for rate limiter quota", ("stage",), buckets=WAIT_BUCKETS
+)
+LLM_IN_FLIGHT = _gauge("llm_in_flight", "Gemini calls in flight")
+MONGO_COMMAND_DURATION = _histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency (driver command monitoring)",
+    ("command", "outcome"), buckets=MONGO_BUCKETS
+)
+
+def route_template(request: Any) -> str:
+    """Matched route path (/api/evaluate/{evaluation_id}) so ids do not explode the label set"""
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+def observe_http_request(request: Any, status_code: int, seconds: float):
+    HTTP_REQUEST_DURATION.labels(request.method, route_template(request), str(status_code)).observe(seconds)
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Feeds mongodb_command_duration_seconds from pymongo/Motor command events"""
+
+    def __init__(self):
+        # Runs for every command; keep the labelled children instead of resolving labels each time
+        self._children = {}
+
+    def _observe(self, command: str, outcome: str, duration_micros: int):
+        child = self._children.get((command, outcome))
+        if child is None:
+            child = self._children[(command, outcome)] = MONGO_COMMAND_DURATION.labels(command, outcome)
+        child.observe(duration_micros / 1e6)
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._observe(event.command_name, "success", event.duration_micros)
+
+    def failed(self, event):
+        self._observe(event.command_name, "failure", event.duration_micros)
+
+def mongo_event_listeners() -> list:
+    """event_listeners for MongoClient / AsyncIOMotorClient"""
+    return [MongoCommandMetrics()] if ENABLED else []
+
+class StateCollector:
+    """Gauges read at scrape time: upload queue depth by status and pipeline jobs by status"""
+
+    def __init__(self):
+        self._queue_cache: Tuple[float, dict] = (0.0, {})
+
+    def describe(self):
+        # Without describe() the registry calls collect() (a MongoDB query) on register
+        yield GaugeMetricFamily("upload_queue_jobs", "Upload queue documents by status", labels=["status"])
+        yield GaugeMetricFamily("pipeline_jobs", "Background pipeline jobs by status", labels=["status"])
+
+    def _queue_depth(self) -> dict:
+        # At most one $group per METRICS_QUEUE_DEPTH_TTL_SECONDS, however often Prometheus scrapes
+        cached_at, counts = self._queue_cache
+        if time.monotonic() - cached_at < Config.METRICS_QUEUE_DEPTH_TTL_SECONDS:
+            return counts
+        from mongoDB.db_config import upload_queue_collection
+        counts = {
+            row["_id"]: row["count"]
+            for row in upload_queue_collection.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}])
+        }
+        self._queue_cache = (time.monotonic(), counts)
+        return counts
+
+    def collect(self):
+        queue = GaugeMetricFamily("upload_queue_jobs", "Upload queue documents by status", labels=["status"])
+        try:
+            for status, count in self._queue_depth().items():
+                queue.add_metric([str(status)], count)
+        except Exception as e:
+            logger.warning(f"Could not read upload queue depth: {e}")
+        yield queue
+
+        from pipeline.jobs import get_job_registry
+        jobs = GaugeMetricFamily("pipeline_jobs", "Background pipeline jobs by status", labels=["status"])
+        for status, count in get_job_registry().get_stats()["by_status"].items():
+            jobs.add_metric([status], count)
+        yield jobs
+
+def _track_in_flight():
+    from llm.client import get_llm_client
+    LLM_IN_FLIGHT.set_function(lambda: get_llm_client().get_stats()["in_flight"])
+
+_state_registered = False
+
+def register_app_collectors():
+    """Register the scrape-time gauges of the API process (queue depth, jobs, in-flight calls)"""
+    global _state_registered
+    if not ENABLED or _state_registered:
+        return
+    _track_in_flight()
+    REGISTRY.register(StateCollector())
+    _state_registered = True
+
+def render_metrics() -> Tuple[bytes, str]:
+    """(body, content type) for GET /metrics; blocking, since collectors may query MongoDB"""
+    if not ENABLED:
+        return b"# Metrics disabled (METRICS_ENABLED=false or prometheus_client not installed)\n", "text/plain"
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+def start_metrics_server(port: int) -> bool:
+    """Serve /metrics on its own port (worker processes); False if metrics are disabled"""
+    if not ENABLED or not port:
+        return False
+    _track_in_flight()
+    start_http_server(port)
+    logger.info(f"Metrics served on port {port}")
+    return True
@@ -0,0 +1,145 @@
+"""
+OCR Result Cache
+Persistent, content-addressed cache of page OCR results on local disk
+
+Entries are keyed by a SHA-256 of the page image bytes plus the OCR prompt and
+model name, so re-uploads of the same answer sheet skip the Gemini call while
+any prompt or model change naturally misses. Total size is bounded; the least
+recently used entries (by file mtime, bumped on every hit) are evicted first.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from threading import Lock
+from typing import Optional, Dict, Any, Tuple
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Bump to invalidate every entry after a change to how results are stored
+CACHE_FORMAT_VERSION = "1"
+
+class OCRCache:
+    """Size-bounded LRU file cache for page OCR results"""
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = Lock()
+        self._total_bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._total_bytes = sum(p.stat().st_size for p in self.cache_dir.glob("*/*.json"))
+
+    @staticmethod
+    def make_key(image_bytes: bytes, prompt: str, model_name: str) -> str:
+        """Content hash identifying one page OCR result"""
+        digest = hashlib.sha256()
+        for part in (CACHE_FORMAT_VERSION.encode(), model_name.encode(), prompt.encode(), image_bytes):
+            digest.update(len(part).to_bytes(8, "big"))
+            digest.update(part)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Tuple[str, Dict[str, int]]]:
+        """Return (text, usage) for a cached page, or None on a miss"""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)  # Mark as recently used
+        except (OSError, ValueError):
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+
+        with self._lock:
+            self._stats["hits"] += 1
+        return entry["text"], entry.get("usage", {})
+
+    def put(self, key: str, text: str, usage: Dict[str, int]):
+        """Store a page result, evicting old entries if the cache is over budget"""
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            data = json.dumps({"text": text, "usage": usage}).encode("utf-8")
+
+            # Write atomically so concurrent readers never see a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            previous_size = path.stat().st_size if path.exists() else 0
+            os.replace(tmp_path, path)
+
+            with self._lock:
+                self._stats["writes"] += 1
+                self._total_bytes += len(data) - previous_size
+                over_budget = self._total_bytes > self.max_bytes
+
+            if over_budget:
+                self._evict()
+
+        except OSError as e:
+            logger.warning(f"Could not write OCR cache entry {key[:12]}: {e}")
+
+    def _evict(self):
+        """Delete least recently used entries until the cache is at 90% of budget"""
+        with self._lock:
+            entries = []
+            for p in self.cache_dir.glob("*/*.json"):
+                try:
+                    st = p.stat()
+                    entries.append((st.st_mtime, st.st_size, p))
+                except OSError:
+                    continue
+            entries.sort()
+
+            total = sum(size for _, size, _ in entries)
+            target = int(self.max_bytes * 0.9)
+            for _, size, p in entries:
+                if total <= target:
+                    break
+                try:
+                    p.unlink()
+                    total -= size
+                    self._stats["evictions"] += 1
+                except OSError:
+                    continue
+            self._total_bytes = total
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_ratio": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+                "size_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes
+            }
+
+_cache: Optional[OCRCache] = None
+_cache_lock = Lock()
+
+def get_ocr_cache() -> Optional[OCRCache]:
+    """Return the shared OCR cache, or None when caching is disabled"""
+    global _cache
+    if not Config.OCR_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = OCRCache(Config.OCR_CACHE_DIR, Config.OCR_CACHE_MAX_BYTES)
+            except OSError as e:
+                logger.error(f"OCR cache disabled, could not open {Config.OCR_CACHE_DIR}: {e}")
+                Config.OCR_CACHE_ENABLED = False
+                return None
+        return _cache
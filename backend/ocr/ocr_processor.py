@@ -4,6 +4,7 @@ Handles image processing and text extraction exclusively using Gemini API
 """
 
 import os
+import asyncio
 import logging
 import io
 import time
@@ -13,12 +14,16 @@ from dotenv import load_dotenv
 import json
 import base64
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from threading import Lock
-from typing import List, Tuple, Dict
-from pdf2image import convert_from_path
-from tenacity import retry, stop_after_attempt, wait_fixed, RetryError
+from typing import AsyncIterator, Iterator, Tuple, Dict
+from config import Config
 from prompts import OCR_PROMPT
+from llm.client import ResponseRejected, get_llm_client
+from llm.rate_limiter import estimate_tokens
+from llm.usage import current_usage
+from monitoring.metrics import OCR_PAGE_DURATION
+from ocr.ocr_cache import get_ocr_cache
+from imaging.pdf_pages import iter_pdf_pages
+from imaging.preparation import ANSWER_SHEET, get_profile, prepare_and_encode, prepare_image_file
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -28,179 +33,220 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 
 # Configure Gemini API
+MODEL_NAME = 'gemini-2.5-flash-preview-04-17'
 try:
     api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
     if not api_key:
         raise ValueError("No Gemini API key found. Set GOOGLE_API_KEY or GEMINI_API_KEY environment variable.")
     genai.configure(api_key=api_key)
-    MODEL_NAME = 'gemini-2.5-flash-preview-04-17'
     model = genai.GenerativeModel(model_name=MODEL_NAME)
     logger.info(f"Successfully initialized Gemini model: {MODEL_NAME}")
 except Exception as e:
     logger.error(f"Error configuring Gemini API: {e}")
     model = None
 
-# Rate limiting
-MAX_QPS = 4
+# Retry configuration (retries, timeouts and rate limiting are shared, see llm/client.py)
 MAX_RETRIES = 3
-_last_call = 0.0
-_rl_lock = Lock()
-
-def rate_limited_call(fn, *args, **kwargs):
-    """Rate-limited function calls to respect API limits"""
-    global _last_call
-    with _rl_lock:
-        gap = 1.0 / MAX_QPS
-        wait = (_last_call + gap) - time.time()
-        if wait > 0:
-            time.sleep(wait)
-        _last_call = time.time()
-    return fn(*args, **kwargs)
-
-def pdf_to_images(pdf_path: str) -> List[str]:
-    """Convert PDF to images and return image paths"""
-    try:
-        # Try to find poppler in common locations
-        poppler_path = None
-        possible_paths = [
-            r"C:\poppler-24.08.0\Library\bin",
-            r"C:\Program Files\poppler\bin",
-            "/usr/bin",
-            "/usr/local/bin"
-        ]
-        
-        for path in possible_paths:
-            if os.path.exists(path):
-                poppler_path = path
-                break
-        
-        images = convert_from_path(
-            pdf_path, 
-            dpi=300, 
-            fmt="png", 
-            poppler_path=poppler_path
-        )
-        
-        image_paths = []
-        pdf_name = Path(pdf_path).stem
-        upload_dir = Path(pdf_path).parent
-        
-        for idx, img in enumerate(images, 1):
-            img_path = upload_dir / f"{pdf_name}_page_{idx}.png"
-            img.save(img_path, "PNG")
-            image_paths.append(str(img_path))
-            
-        logger.info(f"Converted PDF to {len(images)} images")
-        return image_paths
-        
-    except Exception as e:
-        logger.error(f"Error converting PDF to images: {e}")
-        raise
+OCR_MAX_OUTPUT_TOKENS = 2048
+
+# Render/encode settings for handwritten answer sheets (see imaging/preparation.py)
+IMAGE_PROFILE = get_profile(ANSWER_SHEET)
 
-def img_to_b64(img_path: str) -> str:
-    """Convert image to base64 string"""
-    with open(img_path, "rb") as f:
-        return base64.b64encode(f.read()).decode()
+def iter_page_images(pdf_path: str) -> Iterator[Tuple[int, bytes, str]]:
+    """Render PDF pages one at a time, yielding (page_number, image_bytes, mime_type) in memory"""
+    for page_number, img in iter_pdf_pages(pdf_path, dpi=IMAGE_PROFILE["dpi"]):
+        img_bytes, mime_type = prepare_and_encode(img, IMAGE_PROFILE)
+        img.close()
+        yield page_number, img_bytes, mime_type
 
-@retry(stop=stop_after_attempt(MAX_RETRIES), wait=wait_fixed(1), reraise=True)
-def ocr_single_image(img_path: str) -> Tuple[str, Dict]:
-    """OCR a single image with retry logic"""
-    if not model:
-        raise Exception("Gemini model not initialized")
+def _parse_ocr_response(response) -> Tuple[str, Dict]:
+    """Return (text, usage) from a Gemini OCR response; ResponseRejected triggers a retry"""
+    usage_stats = {
+        "input_tokens": 0,
+        "output_tokens": 0
+    }
     
     try:
-        parts = [
-            {"text": OCR_PROMPT},
-            {
-                "inline_data": {
-                    "mime_type": "image/png",
-                    "data": img_to_b64(img_path),
-                }
-            },
-        ]
-        
-        response = rate_limited_call(model.generate_content, parts)
-        
-        # Extract usage statistics
-        usage_stats = {
-            "input_tokens": 0,
-            "output_tokens": 0
-        }
-        
-        try:
-            if hasattr(response, 'usage_metadata') and response.usage_metadata:
-                usage_stats["input_tokens"] = getattr(response.usage_metadata, 'prompt_token_count', 0)
-                usage_stats["output_tokens"] = getattr(response.usage_metadata, 'candidates_token_count', 0)
-        except Exception as e:
-            logger.warning(f"Could not extract usage stats: {e}")
-        
-        return response.text.strip(), usage_stats
-        
+        if hasattr(response, 'usage_metadata') and response.usage_metadata:
+            usage_stats["input_tokens"] = getattr(response.usage_metadata, 'prompt_token_count', 0)
+            usage_stats["output_tokens"] = getattr(response.usage_metadata, 'candidates_token_count', 0)
     except Exception as e:
-        logger.warning(f"OCR failed for {img_path}: {e}")
-        raise
+        logger.warning(f"Could not extract usage stats: {e}")
+    
+    try:
+        text = response.text
+    except (ValueError, AttributeError) as e:
+        raise ResponseRejected(f"No text in OCR response: {e}") from e  # Blocked or empty candidate
+    return text.strip(), usage_stats
 
-def process_image(image_path: str) -> str:
-    """Process a single image and extract text using Gemini OCR"""
+async def ocr_single_image_async(img_bytes: bytes, label: str, mime_type: str = "image/png") -> Tuple[str, Dict]:
+    """OCR a single image through the shared async LLM client (retries, timeout, rate limit)"""
+    parts = [
+        {"text": OCR_PROMPT},
+        {
+            "inline_data": {
+                "mime_type": mime_type,
+                "data": base64.b64encode(img_bytes).decode(),
+            }
+        },
+    ]
+    
+    return await get_llm_client().generate(
+        "ocr",
+        model,
+        parts,
+        estimated_tokens=estimate_tokens(OCR_PROMPT, images=1, max_output_tokens=OCR_MAX_OUTPUT_TOKENS),
+        parse=_parse_ocr_response,
+        max_retries=MAX_RETRIES,
+        label=f"OCR {label}"
+    )
+
+def ocr_single_image(img_bytes: bytes, label: str, mime_type: str = "image/png") -> Tuple[str, Dict]:
+    """Blocking wrapper around ocr_single_image_async"""
+    return get_llm_client().run(ocr_single_image_async(img_bytes, label, mime_type))
+
+def cache_model_name() -> str:
+    """Model name for cache keys, so fake-model output never shadows real results"""
+    return "fake" if Config.LLM_FAKE_MODEL else MODEL_NAME
+
+async def ocr_page_async(img_bytes: bytes, label: str, mime_type: str = "image/png") -> Tuple[str, Dict, bool]:
+    """
+    OCR one page image, consulting the OCR result cache before calling Gemini.
+    
+    Returns:
+        (text, usage, cached) - usage is zero for cache hits
+    """
+    started = time.monotonic()
+    cache = get_ocr_cache()
+    key = None
+    if cache:
+        key = cache.make_key(img_bytes, OCR_PROMPT, cache_model_name())
+        cached = await asyncio.to_thread(cache.get, key)
+        if cached:
+            text, _ = cached
+            usage = current_usage()
+            if usage is not None:
+                usage.record_cache_hit("ocr")
+            OCR_PAGE_DURATION.labels("cache").observe(time.monotonic() - started)
+            return text, {"input_tokens": 0, "output_tokens": 0}, True
+    
+    text, usage = await ocr_single_image_async(img_bytes, label, mime_type)
+    OCR_PAGE_DURATION.labels("gemini").observe(time.monotonic() - started)
+    if cache:
+        await asyncio.to_thread(cache.put, key, text, usage)
+    return text, usage, False
+
+async def ocr_image_file_async(image_path: str) -> Tuple[str, Dict, bool]:
+    """OCR a single image file; returns (text, usage, cached) like ocr_page_async"""
     try:
         logger.info(f"Processing image: {image_path}")
-        text, usage = ocr_single_image(image_path)
-        logger.info(f"OCR completed. Input tokens: {usage['input_tokens']}, Output tokens: {usage['output_tokens']}")
-        return text
+        img_bytes, mime_type = await asyncio.to_thread(prepare_image_file, image_path, IMAGE_PROFILE)
+        text, usage, cached = await ocr_page_async(img_bytes, image_path, mime_type)
+        logger.info(f"OCR completed{' (cached)' if cached else ''}. "
+                   f"Input tokens: {usage['input_tokens']}, Output tokens: {usage['output_tokens']}")
+        return text, usage, cached
     except Exception as e:
         logger.error(f"Error processing image {image_path}: {e}")
         raise
 
-def process_pdf(pdf_path: str) -> str:
-    """Process a PDF file by converting to images and OCR each page"""
+async def process_image_async(image_path: str) -> str:
+    """Process a single image and extract text using Gemini OCR"""
+    text, _, _ = await ocr_image_file_async(image_path)
+    return text
+
+def format_page_text(page_number: int, text: str) -> str:
+    """Page block used when joining multi-page OCR output"""
+    return f"## Page {page_number}\n\n{text}\n\n---\n\n"
+
+async def iter_pdf_ocr_pages(pdf_path: str) -> AsyncIterator[Tuple[int, str, Dict, bool]]:
+    """
+    OCR a PDF page by page, yielding (page_number, text, usage, cached) in page order.
+    
+    Rendering runs off the loop and rendered pages are OCR'd concurrently, so
+    later pages keep progressing while the caller consumes earlier ones. At most
+    OCR_PAGES_IN_FLIGHT pages are rendered and not yet OCR'd: the next page is
+    rendered only when a slot frees up, so memory stays flat however long the
+    document is. A page that fails OCR yields an error placeholder instead of
+    aborting the document.
+    """
+    pages = iter_page_images(pdf_path)
+    queue: asyncio.Queue = asyncio.Queue()
+    slots = asyncio.Semaphore(max(1, Config.OCR_PAGES_IN_FLIGHT))
+    
+    async def ocr_page(img_bytes: bytes, label: str, mime_type: str):
+        try:
+            return await ocr_page_async(img_bytes, label, mime_type)
+        finally:
+            slots.release()  # The encoded page is dropped with this coroutine
+    
+    async def render():
+        try:
+            while True:
+                await slots.acquire()
+                page = await asyncio.to_thread(next, pages, None)
+                if page is None:
+                    slots.release()
+                    break
+                page_number, img_bytes, mime_type = page
+                label = f"{Path(pdf_path).name} page {page_number}"
+                queue.put_nowait((page_number, asyncio.create_task(ocr_page(img_bytes, label, mime_type))))
+                del page, img_bytes
+        finally:
+            queue.put_nowait(None)
+    
+    producer = asyncio.create_task(render())
+    tasks = []
     try:
-        logger.info(f"Processing PDF: {pdf_path}")
-        
-        # Convert PDF to images
-        image_paths = pdf_to_images(pdf_path)
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            page_number, task = item
+            tasks.append(task)
+            try:
+                text, usage, cached = await task
+                logger.info(f"Completed page {page_number}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Failed to process page {page_number}: {e}")
+                text, usage, cached = f"[Error processing page {page_number}: {str(e)}]", {"input_tokens": 0, "output_tokens": 0}, False
+            yield page_number, text, usage, cached
         
-        if not image_paths:
-            raise Exception("No images extracted from PDF")
+        await producer  # Surface rendering errors
+    finally:
+        # Cancelled (client disconnect, timeout) or render failure: stop outstanding pages
+        producer.cancel()
+        for task in tasks:
+            task.cancel()
+        while not queue.empty():
+            item = queue.get_nowait()
+            if item:
+                item[1].cancel()
+
+async def process_pdf_async(pdf_path: str) -> str:
+    """Process a PDF file by rendering pages one at a time and OCR-ing each as it is ready"""
+    try:
+        logger.info(f"Processing PDF: {pdf_path}")
         
-        # Process images with threading for better performance
-        texts_ordered = [None] * len(image_paths)
+        combined_text = ""
+        page_count = 0
         total_input_tokens = 0
         total_output_tokens = 0
+        cached_pages = 0
         
-        with ThreadPoolExecutor(max_workers=4) as executor:
-            # Submit OCR tasks
-            future_to_index = {}
-            for i, img_path in enumerate(image_paths):
-                future = executor.submit(ocr_single_image, img_path)
-                future_to_index[future] = i
-            
-            # Collect results in order
-            for future in as_completed(future_to_index.keys()):
-                index = future_to_index[future]
-                try:
-                    text, usage = future.result()
-                    texts_ordered[index] = text
-                    total_input_tokens += usage["input_tokens"]
-                    total_output_tokens += usage["output_tokens"]
-                    logger.info(f"Completed page {index + 1}/{len(image_paths)}")
-                except Exception as e:
-                    logger.error(f"Failed to process page {index + 1}: {e}")
-                    texts_ordered[index] = f"[Error processing page {index + 1}: {str(e)}]"
-        
-        # Clean up image files
-        for img_path in image_paths:
-            try:
-                os.remove(img_path)
-            except Exception as e:
-                logger.warning(f"Could not remove file {img_path}: {e}")
-        
-        # Combine all pages
-        combined_text = ""
-        for i, text in enumerate(texts_ordered, 1):
+        async for page_number, text, usage, cached in iter_pdf_ocr_pages(pdf_path):
+            page_count += 1
+            total_input_tokens += usage["input_tokens"]
+            total_output_tokens += usage["output_tokens"]
+            cached_pages += int(cached)
             if text:
-                combined_text += f"## Page {i}\n\n{text}\n\n---\n\n"
+                combined_text += format_page_text(page_number, text)
+        
+        if not page_count:
+            raise Exception("No images extracted from PDF")
         
-        logger.info(f"PDF OCR completed. Total pages: {len(image_paths)}, "
+        logger.info(f"PDF OCR completed. Total pages: {page_count} ({cached_pages} from cache), "
                    f"Input tokens: {total_input_tokens}, Output tokens: {total_output_tokens}")
         
         return combined_text.strip()
@@ -209,7 +255,23 @@ def process_pdf(pdf_path: str) -> str:
         logger.error(f"Error processing PDF {pdf_path}: {e}")
         raise
 
-def process_document(file_path: str) -> str:
+def process_image(image_path: str) -> str:
+    """Blocking wrapper around process_image_async"""
+    return get_llm_client().run(process_image_async(image_path))
+
+def process_pdf(pdf_path: str) -> str:
+    """Blocking wrapper around process_pdf_async"""
+    return get_llm_client().run(process_pdf_async(pdf_path))
+
+def get_ocr_stats() -> Dict:
+    """Returns OCR cache statistics for monitoring"""
+    cache = get_ocr_cache()
+    return {
+        "cache_enabled": cache is not None,
+        "cache": cache.get_stats() if cache else {}
+    }
+
+async def process_document_async(file_path: str) -> str:
     """
     Main function to process any document (image or PDF)
     Returns extracted text
@@ -218,12 +280,16 @@ def process_document(file_path: str) -> str:
         file_ext = Path(file_path).suffix.lower()
         
         if file_ext == '.pdf':
-            return process_pdf(file_path)
+            return await process_pdf_async(file_path)
         elif file_ext in ['.png', '.jpg', '.jpeg', '.tiff', '.bmp']:
-            return process_image(file_path)
+            return await process_image_async(file_path)
         else:
             raise ValueError(f"Unsupported file format: {file_ext}")
             
     except Exception as e:
         logger.error(f"Error processing document {file_path}: {e}")
-        raise 
\ No newline at end of file
+        raise
+
+def process_document(file_path: str) -> str:
+    """Blocking wrapper around process_document_async (runs on the shared LLM client loop)"""
+    return get_llm_client().run(process_document_async(file_path))
@@ -0,0 +1 @@
+# Pipeline module for running OCR, Q&A mapping and evaluation end to end
@@ -0,0 +1,46 @@
+"""
+Pipeline Executor
+Bounded thread pool that keeps blocking pipeline work off the asyncio event loop
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = Lock()
+
+def get_executor() -> ThreadPoolExecutor:
+    """Return the shared pipeline executor, creating it on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=Config.PIPELINE_MAX_WORKERS,
+                thread_name_prefix="pipeline"
+            )
+            logger.info(f"Pipeline executor started with {Config.PIPELINE_MAX_WORKERS} workers")
+        return _executor
+
+async def run_blocking(fn, *args, **kwargs):
+    """Run a blocking callable on the pipeline executor and await its result"""
+    loop = asyncio.get_running_loop()
+    # Like asyncio.to_thread, carry the caller's context (usage tracker) into the worker
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(), functools.partial(context.run, fn, *args, **kwargs))
+
+def shutdown_executor(wait: bool = True):
+    """Stop the pipeline executor (called on application shutdown)"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
+            logger.info("Pipeline executor stopped")
@@ -0,0 +1,341 @@
+"""
+Pipeline Jobs
+Background answer sheet runs with progress events clients can follow
+
+POST /api/process-complete/jobs returns a job id straight away; the sheet then
+runs through the streaming pipeline (pipeline/streaming.py) on the LLM client
+loop while every step is recorded as a numbered event:
+
+    queued, started           the job is waiting for / holds a pipeline slot
+    ocr_page                  page k of N read (tokens used, cache hit)
+    ocr_done                  all pages read
+    segment_mapped            a span of answers was mapped to questions
+    question_evaluated        one question's result (a partial result)
+    mapping_done              every segment is mapped
+    completed / failed / cancelled
+
+Mapping and evaluation events carry the job's tokens so far; GET /jobs/{id}
+returns the full per-stage usage (llm/usage.py).
+
+Clients read events over SSE or a WebSocket, resuming after the last event id
+they saw, or poll GET /jobs/{id} for a snapshot with the results so far.
+Jobs live in this process only: finished jobs are kept for
+PIPELINE_JOB_TTL_SECONDS, and a restart loses running jobs (the stored
+evaluation of a completed job is not affected).
+
+Job ids are unguessable and act as the capability to read a job, since
+EventSource clients cannot send an Authorization header.
+"""
+
+import asyncio
+import logging
+import os
+import secrets
+import time
+from datetime import datetime
+from threading import Lock
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from config import Config
+from llm.client import get_llm_client
+from llm.usage import UsageTracker, track_usage
+from pipeline.runner import PipelineError, store_pipeline_evaluation_async
+from pipeline.streaming import run_pipeline_streaming
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+
+class JobLimitError(Exception):
+    """Too many unfinished jobs in this process (reported to the caller as 503)"""
+    pass
+
+class PipelineJob:
+    """Event log and partial results of one answer sheet run"""
+
+    def __init__(self, owner: str, question_count: int, original_filename: Optional[str]):
+        self.id = secrets.token_urlsafe(16)
+        self.owner = owner
+        self.original_filename = original_filename
+        self.status = QUEUED
+        self.stage = QUEUED
+        self.created_at = datetime.now()
+        self.finished_at: Optional[float] = None  # time.monotonic(), for expiry
+        self.question_count = question_count
+        self.pages_done = 0
+        self.page_count: Optional[int] = None
+        self.questions_mapped = 0
+        self.usage = UsageTracker()  # Every stage's Gemini usage for this job
+        self.results: Dict[Any, Dict[str, Any]] = {}
+        self.outcome: Optional[Dict[str, Any]] = None
+        self.evaluation_id: Optional[str] = None
+        self.error: Optional[Dict[str, Any]] = None
+        self.task: Optional[asyncio.Task] = None
+
+        self._events: List[Dict[str, Any]] = []
+        # Events are emitted on the LLM client loop and read on the app loop
+        self._lock = Lock()
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def emit(self, event: str, data: Dict[str, Any]):
+        """Record an event, update the snapshot and wake every subscriber; safe from any thread"""
+        with self._lock:
+            if self.finished:
+                return
+            self._apply(event, data)
+            self._events.append({
+                "id": len(self._events) + 1,
+                "event": event,
+                "data": data,
+                "timestamp": datetime.now().isoformat()
+            })
+            waiters, self._waiters = self._waiters, []
+
+        for loop, wakeup in waiters:
+            try:
+                loop.call_soon_threadsafe(wakeup.set)
+            except RuntimeError:  # Subscriber's loop already closed
+                pass
+
+    def _apply(self, event: str, data: Dict[str, Any]):
+        if event == "started":
+            self.usage = UsageTracker()  # Wall time starts when the job leaves the queue
+            self.status = RUNNING
+            self.stage = "ocr"
+        elif event == "ocr_page":
+            self.pages_done += 1
+            self.page_count = data.get("pages") or self.page_count
+        elif event == "ocr_done":
+            self.stage = "mapping"
+        elif event == "segment_mapped":
+            self.questions_mapped += len(data.get("questions") or [])
+        elif event == "question_evaluated":
+            self.results[data.get("questionNumber")] = data.get("result")
+        elif event == "mapping_done":
+            self.stage = "evaluation"
+            self.questions_mapped = data.get("questions_mapped", self.questions_mapped)
+        elif event in FINISHED_STATES:
+            self.status = self.stage = event
+            self.finished_at = time.monotonic()
+            self.usage.finish()
+            if event == FAILED:
+                self.error = {"message": data.get("message"), "status_code": data.get("status_code")}
+
+    def progress(self, event: str, data: Dict[str, Any]):
+        """Progress callback for run_pipeline_streaming; mapping and evaluation events carry the tokens so far"""
+        if event in ("segment_mapped", "question_evaluated", "mapping_done"):
+            usage = self.usage.summary()
+            data = {**data, "tokens": {"input_tokens": usage["input_tokens"], "output_tokens": usage["output_tokens"]}}
+        self.emit(event, data)
+
+    def complete(self, outcome: Dict[str, Any], evaluation_id: Optional[str]):
+        self.outcome = outcome
+        self.evaluation_id = evaluation_id
+        self.emit(COMPLETED, {"evaluationId": evaluation_id, "result": outcome["evaluation"]})
+
+    async def subscribe(self, last_event_id: int = 0, heartbeat: Optional[float] = None) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Yield events after last_event_id as they happen, ending after the final one.
+
+        With heartbeat set, yields None after that many idle seconds so the
+        caller can keep the connection alive through proxies.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            wakeup = asyncio.Event()
+            with self._lock:
+                events = self._events[max(0, last_event_id):]
+                finished = self.finished
+                if not events and not finished:
+                    self._waiters.append((loop, wakeup))
+
+            for event in events:
+                last_event_id = event["id"]
+                yield event
+            if finished:
+                return
+            if events:
+                continue
+
+            try:
+                await asyncio.wait_for(wakeup.wait(), heartbeat)
+            except asyncio.TimeoutError:
+                yield None
+            finally:
+                with self._lock:
+                    if (loop, wakeup) in self._waiters:
+                        self._waiters.remove((loop, wakeup))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Job state with the results so far, in question order once the run completes"""
+        usage = self.usage.summary()
+        with self._lock:
+            snapshot = {
+                "jobId": self.id,
+                "status": self.status,
+                "stage": self.stage,
+                "createdAt": self.created_at.isoformat(),
+                "originalFilename": self.original_filename,
+                "progress": {
+                    "pages_done": self.pages_done,
+                    "pages": self.page_count,
+                    "questions_mapped": self.questions_mapped,
+                    "questions_evaluated": len(self.results),
+                    "questions_total": self.question_count
+                },
+                "tokens": {"input_tokens": usage["input_tokens"], "output_tokens": usage["output_tokens"]},
+                "usage": usage,
+                "results": list(self.results.values()),
+                "lastEventId": len(self._events),
+                "evaluationId": self.evaluation_id,
+                "error": self.error
+            }
+            if self.outcome:
+                snapshot["result"] = self.outcome["evaluation"]
+                snapshot["questions"] = self.outcome["qa_pairs"]
+                snapshot["ocrText"] = self.outcome["text"]
+                snapshot["results"] = self.outcome["evaluation"].get("evaluations", snapshot["results"])
+            return snapshot
+
+class JobRegistry:
+    """Jobs of this process, with a bound on how many sheets run at once"""
+
+    def __init__(self, max_jobs: int, max_running: int, ttl: float):
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self._jobs: Dict[str, PipelineJob] = {}
+        self._lock = Lock()
+        self._max_running = max_running
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def _prune(self):
+        """Drop expired finished jobs, then the oldest finished ones while over max_jobs"""
+        now = time.monotonic()
+        for job_id, job in list(self._jobs.items()):
+            if job.finished and now - job.finished_at > self.ttl:
+                del self._jobs[job_id]
+        finished = sorted((job for job in self._jobs.values() if job.finished), key=lambda job: job.finished_at)
+        while len(self._jobs) >= self.max_jobs and finished:
+            del self._jobs[finished.pop(0).id]
+
+    def create(self, owner: str, question_count: int, original_filename: Optional[str]) -> PipelineJob:
+        with self._lock:
+            self._prune()
+            if len(self._jobs) >= self.max_jobs:
+                raise JobLimitError(f"Too many pipeline jobs in progress ({self.max_jobs})")
+            job = PipelineJob(owner, question_count, original_filename)
+            self._jobs[job.id] = job
+            return job
+
+    def get(self, job_id: str) -> Optional[PipelineJob]:
+        with self._lock:
+            self._prune()
+            return self._jobs.get(job_id)
+
+    def start(
+        self,
+        job: PipelineJob,
+        file_path: str,
+        questions: List[Dict[str, Any]],
+        evaluation_type: str,
+        student_name: str,
+        question_paper_id: Optional[str]
+    ) -> asyncio.Task:
+        """Run the job in the background on the calling (app) loop; file_path is deleted afterwards"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self._max_running)
+        job.emit(QUEUED, {"questions_total": len(questions)})
+        job.task = asyncio.create_task(self._run(
+            job, file_path, questions, evaluation_type, student_name, question_paper_id
+        ))
+        # Also runs for a task cancelled before it started
+        job.task.add_done_callback(lambda _: self._cleanup(job, file_path))
+        return job.task
+
+    @staticmethod
+    def _cleanup(job: PipelineJob, file_path: str):
+        job.emit(CANCELLED, {})  # No-op if the job already finished
+        try:
+            os.unlink(file_path)
+        except OSError as e:
+            logger.warning(f"Could not delete temporary file {file_path}: {e}")
+
+    async def _run(self, job, file_path, questions, evaluation_type, student_name, question_paper_id):
+        try:
+            async with self._slots:
+                job.emit("started", {})
+                with track_usage(job.usage):
+                    outcome = await get_llm_client().run_async(
+                        run_pipeline_streaming(file_path, questions, evaluation_type, job.progress)
+                    )
+                outcome["evaluation"]["processingStats"] = job.usage.summary()
+                evaluation_id = await store_pipeline_evaluation_async(
+                    user_id=job.owner,
+                    question_paper_id=question_paper_id,
+                    evaluation_result=outcome["evaluation"],
+                    evaluation_type=evaluation_type,
+                    student_name=student_name,
+                    ocr_text=outcome["text"],
+                    original_filename=job.original_filename
+                )
+                job.complete(outcome, evaluation_id)
+                logger.info(f"Pipeline job {job.id} completed: {len(outcome['qa_pairs'])} questions")
+
+        except PipelineError as e:
+            job.emit(FAILED, {"message": e.message, "status_code": e.status_code})
+        except Exception as e:
+            logger.error(f"Pipeline job {job.id} failed: {e}")
+            job.emit(FAILED, {"message": f"Complete pipeline processing failed: {str(e)}", "status_code": 500})
+
+    def cancel(self, job: PipelineJob) -> bool:
+        """Cancel a queued or running job; False if it already finished"""
+        if job.finished or job.task is None:
+            return False
+        job.task.cancel()
+        return True
+
+    def shutdown(self):
+        """Cancel unfinished jobs (called on application shutdown)"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            self.cancel(job)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            by_status: Dict[str, int] = {}
+            for job in self._jobs.values():
+                by_status[job.status] = by_status.get(job.status, 0) + 1
+            return {"jobs": len(self._jobs), "max_jobs": self.max_jobs,
+                    "max_running": self._max_running, "by_status": by_status}
+
+_registry: Optional[JobRegistry] = None
+_registry_lock = Lock()
+
+def get_job_registry() -> JobRegistry:
+    """Return the process-wide job registry, creating it on first use"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = JobRegistry(
+                Config.PIPELINE_JOB_MAX_JOBS,
+                Config.PIPELINE_MAX_WORKERS,
+                Config.PIPELINE_JOB_TTL_SECONDS
+            )
+        return _registry
+
+def shutdown_jobs():
+    """Cancel running jobs (called on application shutdown)"""
+    with _registry_lock:
+        registry = _registry
+    if registry is not None:
+        registry.shutdown()
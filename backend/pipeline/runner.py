@@ -0,0 +1,213 @@
+"""
+Pipeline Runner
+Blocking OCR -> Q&A Mapping -> Evaluation stages used by the complete pipeline
+"""
+
+import logging
+from typing import Optional, List, Dict, Any
+from fastapi import status
+from bson.objectid import ObjectId
+
+from mongoDB.db_config import question_papers_collection, get_db
+from mongoDB import async_db
+from mongoDB.evaluation_store import insert_evaluation_async, insert_evaluation_once
+from mongoDB.models import EvaluationModel
+from analytics.rollups import update_rollups, update_rollups_async
+from ocr.ocr_processor import process_document
+from qna_mapping.mapper import map_questions_to_answers
+from evaluation.evaluator import evaluate_and_generate_report
+from llm.client import get_llm_client
+from llm.usage import track_usage
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class PipelineError(Exception):
+    """Raised when a pipeline stage fails; carries the HTTP status to report"""
+
+    def __init__(self, message: str, status_code: int = status.HTTP_500_INTERNAL_SERVER_ERROR):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+def load_question_paper_questions(question_paper_id: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+    """Fetch the questions of a stored question paper, or None if unavailable"""
+    if not question_paper_id:
+        return None
+
+    try:
+        question_paper = question_papers_collection.find_one({
+            '_id': ObjectId(question_paper_id)
+        })
+        return _questions_of(question_paper, question_paper_id)
+
+    except Exception as e:
+        logger.warning(f"Error retrieving question paper: {e}")
+        return None
+
+async def load_question_paper_questions_async(question_paper_id: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+    """load_question_paper_questions for route handlers, on the async (Motor) client"""
+    if not question_paper_id:
+        return None
+
+    try:
+        question_paper = await async_db.question_papers_collection.find_one({
+            '_id': ObjectId(question_paper_id)
+        })
+        return _questions_of(question_paper, question_paper_id)
+
+    except Exception as e:
+        logger.warning(f"Error retrieving question paper: {e}")
+        return None
+
+def _questions_of(question_paper: Optional[Dict[str, Any]], question_paper_id: str) -> Optional[List[Dict[str, Any]]]:
+    if not question_paper:
+        logger.warning(f"Question paper {question_paper_id} not found, proceeding without structured mapping")
+        return None
+
+    return question_paper.get('questions', [])
+
+def run_pipeline(
+    file_path: str,
+    questions: List[Dict[str, Any]],
+    evaluation_type: str = "rubric",
+    streaming: Optional[bool] = None
+) -> Dict[str, Any]:
+    """
+    Run OCR, Q&A mapping and evaluation for one answer sheet.
+
+    Blocking: call it through pipeline.executor.run_blocking from async code.
+
+    Args:
+        streaming: Overlap the stages (pipeline/streaming.py); defaults to Config.PIPELINE_STREAMING
+
+    Returns:
+        Dictionary with the extracted text, mapped Q&A pairs and evaluation result;
+        the result's processingStats is this run's usage (llm/usage.py)
+    """
+    with track_usage() as usage:
+        if Config.PIPELINE_STREAMING if streaming is None else streaming:
+            from pipeline.streaming import run_pipeline_streaming
+            outcome = get_llm_client().run(run_pipeline_streaming(file_path, questions, evaluation_type))
+        else:
+            outcome = _run_stages(file_path, questions, evaluation_type)
+    outcome["evaluation"]["processingStats"] = usage.summary()
+    return outcome
+
+def _run_stages(file_path: str, questions: List[Dict[str, Any]], evaluation_type: str) -> Dict[str, Any]:
+    """OCR, mapping and evaluation one after the other (the non-streaming mode)"""
+    # Step 1: OCR Processing
+    try:
+        extracted_text = process_document(file_path)
+    except Exception as ocr_error:
+        raise PipelineError(f"OCR processing failed: {str(ocr_error)}")
+
+    if not extracted_text or not extracted_text.strip():
+        raise PipelineError(
+            "No text could be extracted from the document",
+            status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+
+    # Step 2: Q&A Mapping
+    try:
+        mapped_qa_pairs = map_questions_to_answers(extracted_text, questions)
+    except Exception as mapping_error:
+        raise PipelineError(f"Q&A mapping failed: {str(mapping_error)}")
+
+    if not mapped_qa_pairs:
+        raise PipelineError(
+            "No Q&A pairs could be identified from the text",
+            status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+
+    # Step 3: Evaluation
+    try:
+        evaluation_result = evaluate_and_generate_report(mapped_qa_pairs, evaluation_type)
+    except Exception as eval_error:
+        raise PipelineError(f"Evaluation failed: {str(eval_error)}")
+
+    if not evaluation_result:
+        raise PipelineError("Evaluation process failed to generate results")
+
+    return {
+        "text": extracted_text,
+        "qa_pairs": mapped_qa_pairs,
+        "evaluation": evaluation_result
+    }
+
+def build_pipeline_evaluation_document(
+    user_id: str,
+    question_paper_id: Optional[str],
+    evaluation_result: Dict[str, Any],
+    evaluation_type: str,
+    student_name: str,
+    ocr_text: str,
+    original_filename: Optional[str]
+) -> Dict[str, Any]:
+    """Evaluation document for a finished pipeline run"""
+    return EvaluationModel.create_evaluation_document(
+        student_id=user_id,
+        question_paper_id=question_paper_id or "pipeline",
+        evaluations=evaluation_result.get('evaluations', []),
+        summary=evaluation_result.get('summary', {}),
+        evaluation_type=evaluation_type,
+        processing_stats=evaluation_result.get('processingStats', {}),
+        student_name=student_name,
+        total_questions=evaluation_result.get('totalQuestions', 0),
+        ocr_text=ocr_text,
+        original_filename=original_filename
+    )
+
+def store_pipeline_evaluation(
+    user_id: str,
+    question_paper_id: Optional[str],
+    evaluation_result: Dict[str, Any],
+    evaluation_type: str,
+    student_name: str,
+    ocr_text: str,
+    original_filename: Optional[str],
+    upload_id: str
+) -> Optional[str]:
+    """
+    Persist the evaluation of a queued upload; returns its id or None if the
+    write failed. An upload already evaluated (a reclaimed job finishing
+    twice) keeps its first evaluation, and rollups count it once.
+    """
+    try:
+        evaluation_doc = build_pipeline_evaluation_document(
+            user_id, question_paper_id, evaluation_result, evaluation_type,
+            student_name, ocr_text, original_filename
+        )
+        evaluation_id, created = insert_evaluation_once(get_db(), evaluation_doc, upload_id)
+        if created:
+            update_rollups(get_db(), evaluation_doc)
+        else:
+            logger.warning(f"Upload {upload_id} was already evaluated as {evaluation_id}; keeping that evaluation")
+        return str(evaluation_id)
+
+    except Exception as db_error:
+        logger.warning(f"Could not store evaluation in database: {db_error}")
+        return None
+
+async def store_pipeline_evaluation_async(
+    user_id: str,
+    question_paper_id: Optional[str],
+    evaluation_result: Dict[str, Any],
+    evaluation_type: str,
+    student_name: str,
+    ocr_text: str,
+    original_filename: Optional[str]
+) -> Optional[str]:
+    """store_pipeline_evaluation for route handlers, on the async (Motor) client"""
+    try:
+        evaluation_doc = build_pipeline_evaluation_document(
+            user_id, question_paper_id, evaluation_result, evaluation_type,
+            student_name, ocr_text, original_filename
+        )
+        evaluation_id = await insert_evaluation_async(async_db.get_async_db(), evaluation_doc)
+        await update_rollups_async(async_db.get_async_db(), evaluation_doc)
+        return str(evaluation_id)
+
+    except Exception as db_error:
+        logger.warning(f"Could not store evaluation in database: {db_error}")
+        return None
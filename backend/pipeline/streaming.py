@@ -0,0 +1,218 @@
+"""
+Streaming Pipeline
+Overlaps OCR, Q&A mapping and evaluation for one answer sheet
+
+Pages are OCR'd concurrently and consumed in page order. Whenever a new page
+contains a question marker (Q3, Question 4, Ans 5 ...), every answer before that
+marker is complete: that span of text is mapped right away, against only the
+questions it answers (as chunked batch mapping does), and its Q&A pairs are
+evaluated while later pages are still being OCR'd. The last span is mapped once
+OCR finishes. Total time approaches the slowest stage instead of the sum of all
+three.
+
+The result has the same shape as pipeline.runner.run_pipeline: the full OCR
+text, Q&A pairs in question paper order and an evaluation report built by the
+same code as the batch mode.
+
+An optional progress(event, data) callback receives each step as it happens
+(ocr_page, ocr_done, segment_mapped, question_evaluated, mapping_done); the
+job API (pipeline/jobs.py) streams these to clients. It is called on the LLM
+client loop and must not block.
+"""
+
+import asyncio
+import logging
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import status
+
+from ocr.ocr_processor import iter_pdf_ocr_pages, format_page_text, ocr_image_file_async
+from imaging.pdf_pages import get_page_count
+from qna_mapping.mapper import map_questions_to_answers_async
+from qna_mapping.chunking import QUESTION_MARKER_RE, merge_pair, relevant_questions
+from evaluation.evaluator import evaluate_pairs_async, build_evaluation_report, create_error_evaluation
+from pipeline.runner import PipelineError
+
+logger = logging.getLogger(__name__)
+
+ProgressCallback = Callable[[str, Dict[str, Any]], None]
+
+def split_at_last_marker(text: str) -> Tuple[str, str]:
+    """
+    Split text into (complete, pending) at the last question marker.
+
+    Everything before the last marker belongs to answers the student has moved
+    on from; the text from the marker on may continue on the next page.
+    """
+    last = None
+    for match in QUESTION_MARKER_RE.finditer(text):
+        last = match
+    if last is None or not text[:last.start()].strip():
+        return "", text
+    return text[:last.start()], text[last.start():]
+
+class MappingFailed(Exception):
+    """Mapping of one segment failed; the whole sheet fails like the batch mode"""
+
+class StreamingPipeline:
+    """State for one answer sheet: mapped pairs and in-flight mapping/evaluation tasks"""
+
+    def __init__(self, questions: List[Dict[str, Any]], evaluation_type: str, progress: Optional[ProgressCallback] = None):
+        self.questions = questions
+        self.evaluation_type = evaluation_type
+        self.progress = progress
+        self.question_order = {q.get("id"): i for i, q in enumerate(questions)}
+        self.pairs: Dict[str, Dict[str, Any]] = {}
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.merged_ids: set = set()
+        self.tasks: List[asyncio.Task] = []
+        self.segments: List[str] = []
+        self.segments_mapped = 0
+
+    def report(self, event: str, **data):
+        """Pass a progress event to the callback; a failing callback never fails the sheet"""
+        if self.progress is None:
+            return
+        try:
+            self.progress(event, data)
+        except Exception as e:
+            logger.warning(f"Progress callback failed for {event}: {e}")
+
+    def _report_results(self, results: List[Dict[str, Any]], revised: bool = False):
+        for result in results:
+            self.results[result.get("questionNumber")] = result
+            self.report("question_evaluated", questionNumber=result.get("questionNumber"), result=result, revised=revised)
+
+    def submit_segment(self, segment_text: str):
+        """Start mapping + evaluation for a span of text whose answers are complete"""
+        if segment_text.strip():
+            self.segments.append(segment_text)
+            self.segments_mapped += 1
+            # The question still open from the previous segment depends on every segment so far
+            questions = relevant_questions(self.segments, self.questions)[-1]
+            self.tasks.append(asyncio.create_task(self._map_and_evaluate(self.segments_mapped, segment_text, questions)))
+
+    async def _map_and_evaluate(self, segment_number: int, segment_text: str, questions: List[Dict[str, Any]]):
+        try:
+            qa_pairs = await map_questions_to_answers_async(segment_text, questions)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            raise MappingFailed(str(e)) from e
+
+        fresh = []
+        for pair in qa_pairs:
+            question_id = pair.get("questionNumber")
+            if question_id in self.pairs:
+                # Answer continued in a later segment; re-evaluate the whole answer at the end
+                self.pairs[question_id] = merge_pair(self.pairs[question_id], pair)
+                self.merged_ids.add(question_id)
+            else:
+                self.pairs[question_id] = pair
+                fresh.append(pair)
+        self.report("segment_mapped", segment=segment_number,
+                    questions=[pair.get("questionNumber") for pair in qa_pairs])
+
+        if fresh:
+            self._report_results(await evaluate_pairs_async(fresh, self.evaluation_type))
+
+    async def finish(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Wait for every segment, then return (qa_pairs in question order, evaluation results)"""
+        await asyncio.gather(*self.tasks)
+        self.report("mapping_done", segments=self.segments_mapped, questions_mapped=len(self.pairs))
+
+        if self.merged_ids:
+            merged = [self.pairs[qid] for qid in self.merged_ids]
+            self._report_results(await evaluate_pairs_async(merged, self.evaluation_type), revised=True)
+
+        qa_pairs = sorted(
+            self.pairs.values(),
+            key=lambda p: self.question_order.get(p.get("questionNumber"), len(self.question_order))
+        )
+        results = [
+            self.results.get(p.get("questionNumber")) or create_error_evaluation(p, "Evaluation did not complete")
+            for p in qa_pairs
+        ]
+        return qa_pairs, results
+
+    def cancel(self):
+        for task in self.tasks:
+            task.cancel()
+
+async def run_pipeline_streaming(
+    file_path: str,
+    questions: List[Dict[str, Any]],
+    evaluation_type: str = "rubric",
+    progress: Optional[ProgressCallback] = None
+) -> Dict[str, Any]:
+    """
+    Streaming equivalent of pipeline.runner.run_pipeline; runs on the LLM client loop.
+
+    progress, if given, receives (event, data) for every page, segment and question.
+
+    Returns:
+        Dictionary with the extracted text, mapped Q&A pairs and evaluation result
+    """
+    pipeline = StreamingPipeline(questions, evaluation_type, progress)
+    try:
+        # Step 1: OCR, handing completed answers to mapping/evaluation as pages arrive
+        try:
+            if Path(file_path).suffix.lower() == ".pdf":
+                page_count = await asyncio.to_thread(get_page_count, file_path) if progress else None
+                extracted_text = ""
+                pending = ""
+                async for page_number, text, usage, cached in iter_pdf_ocr_pages(file_path):
+                    pipeline.report("ocr_page", page=page_number, pages=page_count, cached=cached, **usage)
+                    if not text:
+                        continue
+                    block = format_page_text(page_number, text)
+                    extracted_text += block
+                    complete, pending = split_at_last_marker(pending + block)
+                    pipeline.submit_segment(complete)
+                extracted_text = extracted_text.strip()
+                final_segment = pending
+            else:
+                extracted_text, usage, cached = await ocr_image_file_async(file_path)
+                pipeline.report("ocr_page", page=1, pages=1, cached=cached, **usage)
+                final_segment = extracted_text
+        except asyncio.CancelledError:
+            raise
+        except Exception as ocr_error:
+            raise PipelineError(f"OCR processing failed: {str(ocr_error)}")
+        pipeline.report("ocr_done", text_length=len(extracted_text or ""))
+
+        if not extracted_text or not extracted_text.strip():
+            raise PipelineError(
+                "No text could be extracted from the document",
+                status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+
+        # Steps 2-3: map the trailing answers, then wait for every segment's evaluation
+        pipeline.submit_segment(final_segment)
+        try:
+            mapped_qa_pairs, results = await pipeline.finish()
+        except MappingFailed as mapping_error:
+            raise PipelineError(f"Q&A mapping failed: {str(mapping_error)}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as eval_error:
+            raise PipelineError(f"Evaluation failed: {str(eval_error)}")
+
+        if not mapped_qa_pairs:
+            raise PipelineError(
+                "No Q&A pairs could be identified from the text",
+                status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+
+        logger.info(f"Streaming pipeline mapped {len(mapped_qa_pairs)} questions from "
+                    f"{pipeline.segments_mapped} segments")
+
+        return {
+            "text": extracted_text,
+            "qa_pairs": mapped_qa_pairs,
+            "evaluation": build_evaluation_report(results, evaluation_type)
+        }
+
+    finally:
+        pipeline.cancel()
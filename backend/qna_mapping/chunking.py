@@ -0,0 +1,113 @@
+"""
+Answer Sheet Chunking
+Splits long OCR text into chunks that are mapped independently and in parallel
+
+The text is cut at question markers (Q3, Question 4, Ans 5 ...) and page
+headers, and the pieces are packed into chunks of at most MAPPING_CHUNK_MAX_CHARS,
+preferring to end a chunk where a new answer starts. Each chunk is mapped
+against only the questions its markers name (plus the question continued from
+the previous chunk), so prompt and response sizes stay bounded however long
+the sheet is. Answers that span chunks are joined back together in chunk order.
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# Explicit question labels at the start of a line; bare "1." is too common inside answers
+QUESTION_MARKER_RE = re.compile(
+    r"^[ \t>*#_]*(?:Q|Que|Ques|Question|Ans|Answer)\s*\.?\s*(?:No\s*\.?\s*)?(?P<number>\d{1,2})(?!\d)",
+    re.IGNORECASE | re.MULTILINE
+)
+
+# Page headers written by ocr.ocr_processor.format_page_text
+PAGE_HEADER_RE = re.compile(r"^## Page \d+[ \t]*$", re.MULTILINE)
+
+def question_number(value: Any) -> Optional[int]:
+    """Leading question number of an id ("Q3b" -> 3), None if it has none"""
+    match = re.search(r"\d+", str(value or ""))
+    return int(match.group()) if match else None
+
+def _units(text: str) -> List[Tuple[str, bool]]:
+    """(piece, starts_at_question_marker) for the text cut at every marker and page header"""
+    markers = {match.start() for match in QUESTION_MARKER_RE.finditer(text)}
+    cuts = sorted({0, *markers, *(match.start() for match in PAGE_HEADER_RE.finditer(text))})
+    units = []
+    for start, end in zip(cuts, cuts[1:] + [len(text)]):
+        if text[start:end].strip():
+            units.append((text[start:end], start in markers))
+    return units
+
+def split_into_chunks(text: str, max_chars: int) -> List[str]:
+    """
+    Pack the text into chunks of at most max_chars, cut only at markers or page
+    headers. A chunk that fills up is ended before its last answer start when
+    it has one, so answers are split across chunks only when unavoidable. A
+    single answer longer than max_chars becomes a chunk of its own.
+    """
+    if max_chars <= 0 or len(text) <= max_chars:
+        return [text]
+
+    chunks: List[str] = []
+    current: List[Tuple[str, bool]] = []
+    size = 0
+    for unit, starts_question in _units(text):
+        if current and size + len(unit) > max_chars:
+            cut = len(current)
+            if not starts_question:
+                # Carry the unfinished answer over instead of splitting it
+                cut = max((i for i, (_, starts) in enumerate(current) if starts and i > 0), default=cut)
+            chunks.append("".join(piece for piece, _ in current[:cut]))
+            current = current[cut:]
+            size = sum(len(piece) for piece, _ in current)
+        current.append((unit, starts_question))
+        size += len(unit)
+    if current:
+        chunks.append("".join(piece for piece, _ in current))
+    return chunks
+
+def relevant_questions(chunks: List[str], questions: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """
+    The questions each chunk should be mapped against: those its markers name,
+    plus the question still open from the previous chunk when the chunk starts
+    mid-answer. Falls back to every question when a chunk has nothing to go on
+    or names a number the paper does not have (a mislabelled answer).
+    """
+    numbers_of = [
+        question_number(q.get("parent_id") or q.get("id") or q.get("questionNumber")) for q in questions
+    ]
+    known = {number for number in numbers_of if number is not None}
+
+    subsets = []
+    open_question: Optional[int] = None
+    for chunk in chunks:
+        markers = list(QUESTION_MARKER_RE.finditer(chunk))
+        numbers: Set[int] = {int(match.group("number")) for match in markers}
+        if open_question is not None and (not markers or chunk[:markers[0].start()].strip()):
+            numbers.add(open_question)
+        if markers:
+            open_question = int(markers[-1].group("number"))
+
+        if not numbers or not numbers <= known:
+            subsets.append(questions)
+        else:
+            subsets.append([q for q, number in zip(questions, numbers_of) if number is None or number in numbers])
+    return subsets
+
+def merge_pair(existing: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Combine two fragments of the same answer (split across chunks, or the student returned to it)"""
+    before, after = existing.get("answer") or "", new.get("answer") or ""
+    merged = dict(existing)
+    if after.strip() and after.strip() not in before:
+        merged["answer"] = after if before.strip() in after else "\n\n".join(a for a in (before, after) if a)
+    return merged
+
+def reconcile_pairs(chunk_pairs: List[List[Dict[str, Any]]], questions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Q&A pairs of every chunk, one per question, fragments joined in chunk order, in question paper order"""
+    pairs: Dict[Any, Dict[str, Any]] = {}
+    for qa_pairs in chunk_pairs:
+        for pair in qa_pairs:
+            question_id = pair.get("questionNumber")
+            pairs[question_id] = merge_pair(pairs[question_id], pair) if question_id in pairs else pair
+
+    order = {q.get("id") or q.get("questionNumber"): i for i, q in enumerate(questions)}
+    return sorted(pairs.values(), key=lambda pair: order.get(pair.get("questionNumber"), len(order)))
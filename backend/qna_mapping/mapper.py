@@ -4,14 +4,19 @@ Maps questions to answers in extracted text using Gemini API
 """
 
 import os
+import asyncio
 import logging
 import re
 import json
 import time
 import google.generativeai as genai
 from dotenv import load_dotenv
-from tenacity import retry, stop_after_attempt, wait_fixed, RetryError
+from config import Config
 from prompts import MAPPING_PROMPT
+from llm.client import ResponseRejected, get_llm_client
+from llm.rate_limiter import estimate_tokens
+from qna_mapping.chunking import reconcile_pairs, relevant_questions, split_into_chunks
+from qna_mapping.premapper import premap
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -36,10 +41,13 @@ except Exception as e:
     logger.error(f"Error configuring Gemini API for mapping: {e}")
     model = None
 
-# Global counters for tracking usage
+# Process-wide counters for get_mapping_stats(); per-run usage is tracked by llm/usage.py
 total_input_tokens = 0
 total_output_tokens = 0
 total_api_requests = 0
+total_premapped_answers = 0
+total_premapper_fallbacks = 0
+total_llm_calls_avoided = 0
 
 def get_gemini_model():
     """Initialize and return the Gemini model."""
@@ -133,19 +141,12 @@ def generate_mapping_prompt(question_paper_json, answer_sheet_text):
         answer_sheet_text=answer_sheet_text
     )
 
-@retry(stop=stop_after_attempt(3), wait=wait_fixed(1), reraise=True)
-def make_gemini_call_with_retry(prompt_text):
+def _parse_mapping_response(response):
     """
-    Makes a Gemini API call with retry logic and tracks token usage.
+    Extract the mapping JSON from a Gemini response and track token usage.
+    Raises ResponseRejected (retried by the LLM client) when the response is unusable.
     """
-    global total_api_requests, total_input_tokens, total_output_tokens
-
-    if not model:
-        raise Exception("Gemini model not initialized")
-
-    total_api_requests += 1
-
-    response = model.generate_content(prompt_text)
+    global total_input_tokens, total_output_tokens
 
     # Track token usage
     if hasattr(response, 'usage_metadata') and response.usage_metadata:
@@ -156,30 +157,51 @@ def make_gemini_call_with_retry(prompt_text):
 
     # Validate response
     if not response.candidates:
-        raise ValueError("Gemini API returned no candidates in response.")
+        raise ResponseRejected("Gemini API returned no candidates in response.")
     if not response.candidates[0].content.parts:
-        raise ValueError("Gemini API returned no content parts in first candidate.")
+        raise ResponseRejected("Gemini API returned no content parts in first candidate.")
 
     full_response_text = ""
     for part in response.candidates[0].content.parts:
         if hasattr(part, 'text'):
             full_response_text += part.text
         else:
-            raise ValueError(f"Gemini API returned non-text content part: {type(part)}")
+            raise ResponseRejected(f"Gemini API returned non-text content part: {type(part)}")
 
     # Extract JSON from response
     json_start_index = full_response_text.find('{')
     json_end_index = full_response_text.rfind('}')
 
     if json_start_index == -1 or json_end_index == -1:
-        raise ValueError("No complete JSON object found in Gemini response text.")
+        raise ResponseRejected("No complete JSON object found in Gemini response text.")
 
     json_string = full_response_text[json_start_index : json_end_index + 1]
-    mapped_data = json.loads(json_string)
+    try:
+        mapped_data = json.loads(json_string)
+    except json.JSONDecodeError as e:
+        raise ResponseRejected(f"Invalid JSON in Gemini response text: {e}") from e
 
     return mapped_data, full_response_text
 
-def map_questions_to_answers(text, questions=None):
+async def make_gemini_call_with_retry(prompt_text, label="Q&A mapping"):
+    """
+    Makes a Gemini API call through the shared async LLM client
+    (rate limiting, timeout and jittered retries) and tracks token usage.
+    """
+    global total_api_requests
+
+    total_api_requests += 1
+
+    return await get_llm_client().generate(
+        "mapping",
+        model,
+        prompt_text,
+        estimated_tokens=estimate_tokens(prompt_text, max_output_tokens=4096),
+        parse=_parse_mapping_response,
+        label=label
+    )
+
+async def map_questions_to_answers_async(text, questions=None):
     """
     Enhanced Q&A mapping that can work with or without a question paper.
     
@@ -198,46 +220,79 @@ def map_questions_to_answers(text, questions=None):
             
         # Use advanced mapping with question paper
         logger.info(f"Using question paper with {len(questions)} questions for mapping")
-        return map_with_question_paper(text, questions)
+        if Config.PREMAPPER_ENABLED:
+            return await map_with_premapper(text, questions)
+        return await map_with_question_paper(text, questions)
             
     except Exception as e:
         logger.error(f"Error in Q&A mapping: {e}")
         raise
 
-def map_with_question_paper(answer_sheet_text, questions):
+async def map_with_premapper(answer_sheet_text, questions):
+    """
+    Map clearly labelled answers locally (qna_mapping/premapper.py) and send
+    only the rest to Gemini: the untrusted answers and unlabelled text, against
+    the questions still unmapped. Sheets the pre-mapper is unsure of go to
+    Gemini whole.
+    """
+    global total_premapped_answers, total_premapper_fallbacks, total_llm_calls_avoided
+
+    min_confidence = Config.PREMAPPER_MIN_CONFIDENCE
+    premapping = premap(answer_sheet_text, questions)
+    if premapping.confidence < min_confidence:
+        total_premapper_fallbacks += 1
+        logger.info(f"Pre-mapper confidence {premapping.confidence} below {min_confidence}; mapping with Gemini")
+        return await map_with_question_paper(answer_sheet_text, questions)
+
+    trusted = premapping.trusted(min_confidence)
+    mapped_ids = {answer.question_id for answer in trusted}
+    by_id = {str(q.get('id') or q.get('questionNumber')): q for q in questions}
+    qa_pairs = [
+        {
+            "questionNumber": answer.question_id,
+            "questionText": by_id[answer.question_id].get('text') or by_id[answer.question_id].get('questionText', ''),
+            "answer": answer.answer,
+            "maxMarks": get_max_marks_for_question(answer.question_id, questions)
+        }
+        for answer in trusted
+    ]
+    total_premapped_answers += len(qa_pairs)
+
+    residual = premapping.residual_text(answer_sheet_text, min_confidence)
+    remaining = [q for q in questions if str(q.get('id') or q.get('questionNumber')) not in mapped_ids]
+    logger.info(f"Pre-mapper mapped {len(qa_pairs)} answers (confidence {premapping.confidence}); "
+                f"{len(residual)} characters left for Gemini")
+    if not residual.strip() or not remaining:
+        total_llm_calls_avoided += 1
+        return reconcile_pairs([qa_pairs], questions)
+
+    return reconcile_pairs([qa_pairs, await map_with_question_paper(residual, remaining)], questions)
+
+async def map_with_question_paper(answer_sheet_text, questions):
     """
     Advanced mapping using the question paper structure.
+
+    Sheets longer than MAPPING_CHUNK_MAX_CHARS are split at page and question
+    boundaries and the chunks are mapped in parallel, each against the
+    questions it answers (see qna_mapping/chunking.py).
     """
     try:
-        # Create question paper JSON structure
-        question_paper_json = {
-            "questions": questions,
-            "total_questions": len(questions)
-        }
-        
-        # Generate mapping prompt
-        prompt = generate_mapping_prompt(question_paper_json, answer_sheet_text)
-        
-        # Make API call with retry logic
-        mapped_data, full_response = make_gemini_call_with_retry(prompt)
+        chunks = split_into_chunks(answer_sheet_text, Config.MAPPING_CHUNK_MAX_CHARS)
+        if len(chunks) == 1:
+            return await map_chunk(answer_sheet_text, questions)
         
-        logger.info(f"Mapping completed successfully. Found {len(mapped_data.get('mapped_answers', []))} Q&A pairs")
-        
-        # Convert to the expected format
-        qa_pairs = []
-        for item in mapped_data.get('mapped_answers', []):
-            qa_pairs.append({
-                "questionNumber": item.get('question_id', 'Unknown'),
-                "questionText": item.get('question_text', ''),
-                "answer": item.get('student_answer_extracted', ''),
-                "maxMarks": get_max_marks_for_question(item.get('question_id', ''), questions)
-            })
+        subsets = relevant_questions(chunks, questions)
+        logger.info(f"Mapping {len(answer_sheet_text)} characters in {len(chunks)} chunks "
+                    f"({', '.join(str(len(subset)) for subset in subsets)} questions)")
+        chunk_pairs = await asyncio.gather(*(
+            map_chunk(chunk, subset, label=f"Q&A mapping chunk {i}/{len(chunks)}", all_questions=questions)
+            for i, (chunk, subset) in enumerate(zip(chunks, subsets), 1)
+        ))
         
+        qa_pairs = reconcile_pairs(chunk_pairs, questions)
+        logger.info(f"Chunked mapping completed. Found {len(qa_pairs)} Q&A pairs")
         return qa_pairs
         
-    except RetryError as e:
-        logger.error(f"Failed to get valid mapping response after retries: {e}")
-        raise
     except json.JSONDecodeError as e:
         logger.error(f"Could not parse JSON response: {e}")
         raise
@@ -245,7 +300,37 @@ def map_with_question_paper(answer_sheet_text, questions):
         logger.error(f"Error in advanced mapping: {e}")
         raise
 
+async def map_chunk(answer_sheet_text, questions, label="Q&A mapping", all_questions=None):
+    """Map one span of answer sheet text against the given questions with a single Gemini call"""
+    # Create question paper JSON structure
+    question_paper_json = {
+        "questions": questions,
+        "total_questions": len(questions)
+    }
+    
+    # Generate mapping prompt
+    prompt = generate_mapping_prompt(question_paper_json, answer_sheet_text)
+    
+    # Make API call with retry logic
+    mapped_data, full_response = await make_gemini_call_with_retry(prompt, label)
+    
+    logger.info(f"{label} completed successfully. Found {len(mapped_data.get('mapped_answers', []))} Q&A pairs")
+    
+    # Convert to the expected format
+    qa_pairs = []
+    for item in mapped_data.get('mapped_answers', []):
+        qa_pairs.append({
+            "questionNumber": item.get('question_id', 'Unknown'),
+            "questionText": item.get('question_text', ''),
+            "answer": item.get('student_answer_extracted', ''),
+            "maxMarks": get_max_marks_for_question(item.get('question_id', ''), all_questions or questions)
+        })
+    
+    return qa_pairs
 
+def map_questions_to_answers(text, questions=None):
+    """Blocking wrapper around map_questions_to_answers_async (runs on the shared LLM client loop)"""
+    return get_llm_client().run(map_questions_to_answers_async(text, questions))
 
 def get_max_marks_for_question(question_id, questions):
     """
@@ -266,5 +351,8 @@ def get_mapping_stats():
     return {
         "total_input_tokens": total_input_tokens,
         "total_output_tokens": total_output_tokens,
-        "total_api_requests": total_api_requests
+        "total_api_requests": total_api_requests,
+        "premapped_answers": total_premapped_answers,
+        "premapper_fallbacks": total_premapper_fallbacks,
+        "llm_calls_avoided": total_llm_calls_avoided
     } 
\ No newline at end of file
@@ -0,0 +1,226 @@
+"""
+Rule-Based Pre-Mapper
+Segments clearly labelled answer sheets locally, without a Gemini call
+
+Most sheets label their answers ("Q1 a)", "1(a)", "Ans 3", "(b)"). The
+pre-mapper finds those labels, resolves them against the question ids of the
+stored paper and cuts the text between them into answers, scoring how much it
+trusts each one:
+
+- a prefixed label (Q1., Ans 3), Question 4 b)) is trusted most; like every
+  label it needs punctuation or a part after the number, since "Q2 of the
+  lecture" in running text looks the same otherwise, and an answer containing
+  such an unclear label is trusted little
+- a bare number ("3.", "2(a)") counts only when it names a question of the
+  paper and comes after the last one, and not at all on a sheet that uses
+  prefixed labels, since numbered lists inside answers look the same; bare
+  numbers that go back down anywhere on the sheet are trusted little
+- a part on its own ("(b)", "c)") counts only for a part of the current
+  question not seen yet
+- an answer the student returned to later is not trusted (a repeated label is
+  as likely a reference to the question inside another answer), and a label
+  that cannot be resolved to a single question is not mapped at all
+
+The sheet's confidence is the share of its text covered by answers, weighted
+by their confidence. The mapper (qna_mapping/mapper.py) keeps the trusted
+answers and sends only the rest of the text, against the questions still
+unmapped, to Gemini, or the whole sheet when the sheet's confidence is below
+PREMAPPER_MIN_CONFIDENCE.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from qna_mapping.chunking import PAGE_HEADER_RE, question_number
+
+# A question label at the start of a line: optional prefix, number, optional part
+LABEL_RE = re.compile(
+    r"^[ \t>*#_]*"
+    r"(?P<prefix>(?:Q|Que|Ques|Question|Ans|Answer)\s*\.?\s*(?:No\s*\.?\s*)?)?"
+    r"(?P<number>\d{1,2})(?!\d)"
+    r"(?:(?P<glued>[a-h])(?![a-z]))?"
+    r"[ \t]*(?P<punct>[.):\-](?!\d))?[ \t]*"
+    r"(?:\((?P<paren>[a-h]|[ivx]{1,4})\)|(?P<bare>[a-h]|[ivx]{1,4})[).:](?![a-z0-9]))?",
+    re.IGNORECASE | re.MULTILINE
+)
+
+# A part label on its own: "(b)", "b)", "b."
+PART_LABEL_RE = re.compile(r"^[ \t>*#_]*\(?(?P<part>[a-h]|[ivx]{1,4})[).](?![a-z0-9])", re.IGNORECASE | re.MULTILINE)
+
+# Page separators written by ocr.ocr_processor.format_page_text
+PAGE_SEPARATOR_RE = re.compile(r"^---[ \t]*$", re.MULTILINE)
+
+# Text before the first label (name, roll number) that does not count as unmapped
+PREAMBLE_MAX_CHARS = 200
+
+PREFIXED, NUMBERED, PART_ONLY = 0.95, 0.8, 0.85
+AMBIGUOUS = 0.5  # Bare numbers that go back down somewhere on the sheet (numbered lists in answers)
+REVISITED = 0.5  # Cap for an answer whose label appears twice; below any sensible PREMAPPER_MIN_CONFIDENCE
+
+def _part_id(value: Any) -> str:
+    return re.sub(r"[^0-9a-z]", "", str(value or "").lower())
+
+@dataclass
+class PreMappedAnswer:
+    question_id: Optional[str]
+    answer: str
+    confidence: float
+    spans: List[Tuple[int, int]]  # Label and answer text in the sheet
+
+@dataclass
+class PreMapping:
+    answers: List[PreMappedAnswer] = field(default_factory=list)
+    confidence: float = 0.0
+    unassigned_chars: int = 0
+    unassigned: List[Tuple[int, int]] = field(default_factory=list)
+
+    def trusted(self, min_confidence: float) -> List[PreMappedAnswer]:
+        return [a for a in self.answers if a.question_id and a.confidence >= min_confidence]
+
+    def residual_text(self, text: str, min_confidence: float) -> str:
+        """Unassigned text and untrusted answers (with their labels), in sheet order"""
+        spans = list(self.unassigned)
+        for answer in self.answers:
+            if not answer.question_id or answer.confidence < min_confidence:
+                spans.extend(answer.spans)
+        return "\n\n".join(text[start:end].strip() for start, end in sorted(spans) if text[start:end].strip())
+
+class QuestionIndex:
+    """Question ids of a paper by question number and part"""
+
+    def __init__(self, questions: List[Dict[str, Any]]):
+        self.parts: Dict[int, Dict[str, str]] = {}
+        for question in questions:
+            question_id = question.get("id") or question.get("questionNumber")
+            number = question_number(question.get("parent_id") or question_id)
+            if number is None or not question_id:
+                continue
+            part = _part_id(question.get("part"))
+            if not part:
+                # "Q2b" / "2(b)" without a separate part field
+                match = re.match(r"^\D*\d+\s*\(?([a-h]|[ivx]{1,4})\)?$", str(question_id), re.IGNORECASE)
+                part = match.group(1).lower() if match else ""
+            self.parts.setdefault(number, {})[part] = str(question_id)
+
+    def resolve(self, number: int, part: str) -> Optional[str]:
+        """The single question id a label names, or None"""
+        parts = self.parts.get(number, {})
+        if part and part in parts:
+            return parts[part]
+        if list(parts) == [""] or (not part and len(parts) == 1):
+            # A single question, whether or not the student split it into parts
+            return next(iter(parts.values()))
+        return None
+
+def _strip_layout(text: str) -> str:
+    return PAGE_SEPARATOR_RE.sub("", PAGE_HEADER_RE.sub("", text)).strip()
+
+def _increasing(labels: List[Tuple[int, str]]) -> bool:
+    """True if the numbers never go back (a repeat is allowed for a new part: 1(a), 1(b))"""
+    previous, parts = 0, set()
+    for number, part in labels:
+        if number < previous or (number == previous and (not part or part in parts)):
+            return False
+        if number != previous:
+            parts = set()
+        previous = number
+        parts.add(part)
+    return True
+
+def find_labels(text: str, index: QuestionIndex) -> List[Tuple[int, int, int, str, float]]:
+    """(label start, answer start, number, part, confidence) of every accepted label, in order"""
+    candidates = []
+    for match in LABEL_RE.finditer(text):
+        part = _part_id(match.group("glued") or match.group("paren") or match.group("bare"))
+        if not part and not match.group("punct"):
+            continue  # "Q2 of the lecture", "3 marks": a number without "." or ")" is not a label
+        candidates.append((match.start(), match.end(), int(match.group("number")), part, bool(match.group("prefix"))))
+    # On a sheet labelled "Q1", "Ans 2" ..., a bare "2." is a list item inside an answer
+    if any(prefixed for *_, prefixed in candidates):
+        candidates = [c for c in candidates if c[4]]
+    numbered = NUMBERED if _increasing([(number, part) for _, _, number, part, _ in candidates]) else AMBIGUOUS
+    for match in PART_LABEL_RE.finditer(text):
+        candidates.append((match.start(), match.end(), None, _part_id(match.group("part")), False))
+    candidates.sort()
+
+    labels = []
+    current: Optional[int] = None
+    seen_parts: set = set()
+    last_end = -1
+    for start, end, number, part, prefixed in candidates:
+        if start < last_end:
+            continue  # Same line already matched as a question label
+        if number is None:
+            # A part of the current question the student has not answered yet
+            if current is None or part not in index.parts.get(current, {}) or part in seen_parts:
+                continue
+            labels.append((start, end, current, part, PART_ONLY))
+        elif prefixed:
+            labels.append((start, end, number, part, PREFIXED))
+        elif number in index.parts and (current is None or number > current or
+                                        (number == current and part and part not in seen_parts)):
+            labels.append((start, end, number, part, numbered))
+        else:
+            continue
+        if number is not None and number != current:
+            seen_parts = set()
+        current = labels[-1][2]
+        seen_parts.add(part)
+        last_end = end
+    return labels
+
+def unclear_labels(text: str) -> List[int]:
+    """Starts of prefixed numbers with no punctuation or part ("Q2 of the lecture"): labels or running text"""
+    return [
+        match.start() for match in LABEL_RE.finditer(text)
+        if match.group("prefix") and not match.group("punct")
+        and not (match.group("glued") or match.group("paren") or match.group("bare"))
+    ]
+
+def premap(text: str, questions: List[Dict[str, Any]]) -> PreMapping:
+    """Segment the sheet at its labels and score every answer and the sheet"""
+    index = QuestionIndex(questions)
+    labels = find_labels(text, index)
+    result = PreMapping()
+    if not labels:
+        result.unassigned = [(0, len(text))]
+        result.unassigned_chars = len(_strip_layout(text))
+        return result
+
+    # Text before the first label: a short header is ignored, anything longer is unmapped
+    preamble = _strip_layout(text[:labels[0][0]])
+    if len(preamble) > PREAMBLE_MAX_CHARS:
+        result.unassigned.append((0, labels[0][0]))
+        result.unassigned_chars = len(preamble)
+
+    by_question: Dict[Any, PreMappedAnswer] = {}
+    for i, (start, answer_start, number, part, confidence) in enumerate(labels):
+        end = labels[i + 1][0] if i + 1 < len(labels) else len(text)
+        answer = _strip_layout(text[answer_start:end])
+        if not answer:
+            continue  # Label with nothing after it
+        question_id = index.resolve(number, part)
+        if question_id is None:
+            result.answers.append(PreMappedAnswer(None, answer, 0.0, [(start, end)]))
+        elif question_id in by_question:
+            # The student came back to this question, or the label is a reference
+            # inside another answer; keep both parts but leave them to Gemini
+            previous = by_question[question_id]
+            previous.answer = f"{previous.answer}\n\n{answer}"
+            previous.confidence = min(previous.confidence, confidence, REVISITED)
+            previous.spans.append((start, end))
+        else:
+            by_question[question_id] = PreMappedAnswer(question_id, answer, confidence, [(start, end)])
+            result.answers.append(by_question[question_id])
+
+    # An answer that may run over an unlabelled answer is left to Gemini
+    unclear = unclear_labels(text)
+    for answer in result.answers:
+        if any(start < position < end for start, end in answer.spans for position in unclear):
+            answer.confidence = min(answer.confidence, AMBIGUOUS)
+
+    total = sum(len(answer.answer) for answer in result.answers) + result.unassigned_chars
+    covered = sum(len(answer.answer) * answer.confidence for answer in result.answers)
+    result.confidence = round(covered / total, 3) if total else 0.0
+    return result
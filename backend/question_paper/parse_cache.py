@@ -0,0 +1,84 @@
+"""
+Question Paper Parse Cache
+Parsed question papers stored in MongoDB under a hash of the uploaded file
+
+POST /question-papers/parse hashes the file bytes together with the parsing
+prompt, the model name and the page render settings. An identical re-upload
+returns the stored structure without rasterizing a page or calling Gemini,
+while a prompt or model change naturally misses. The hash is returned as
+parse_id; POST /question-papers/ with that parse_id creates the paper from the
+stored parse with a single insert.
+
+Entries expire QUESTION_PAPER_PARSE_CACHE_TTL_DAYS after their last use (TTL
+index, see mongoDB/indexes.py).
+"""
+
+import hashlib
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from config import Config
+from mongoDB.async_db import get_async_collection
+from prompts import QUESTION_PARSING_PROMPT
+from question_paper.parser import IMAGE_PROFILE, MODEL_NAME
+
+logger = logging.getLogger(__name__)
+
+PARSES_COLLECTION = 'question_paper_parses'
+
+# Bump to invalidate every entry after a change to how results are stored
+CACHE_FORMAT_VERSION = "2"
+
+# Parse result fields kept in an entry (message and filename are per upload)
+STORED_FIELDS = ('questions', 'raw_structure', 'total_questions', 'total_marks', 'pages_processed')
+
+def parse_model_name() -> str:
+    """Model name for parse keys, so fake-model output never shadows real results"""
+    return "fake" if Config.LLM_FAKE_MODEL else MODEL_NAME
+
+def make_parse_id(content: bytes) -> str:
+    """Content hash identifying the parse of one uploaded file"""
+    digest = hashlib.sha256()
+    settings = json.dumps(IMAGE_PROFILE, sort_keys=True, default=str)
+    for part in (CACHE_FORMAT_VERSION, parse_model_name(), QUESTION_PARSING_PROMPT, settings):
+        part = part.encode()
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    digest.update(content)
+    return digest.hexdigest()
+
+async def get_cached_parse(parse_id: str) -> Optional[Dict[str, Any]]:
+    """Stored entry for parse_id (marked as used), or None on a miss"""
+    if not Config.QUESTION_PAPER_PARSE_CACHE_ENABLED:
+        return None
+    return await get_async_collection(PARSES_COLLECTION).find_one_and_update(
+        {'_id': parse_id},
+        {'$set': {'last_used_at': datetime.now()}, '$inc': {'hits': 1}}
+    )
+
+async def load_parse(parse_id: str) -> Optional[Dict[str, Any]]:
+    """Stored entry for parse_id without touching it (read-only, for creating a paper)"""
+    return await get_async_collection(PARSES_COLLECTION).find_one({'_id': parse_id})
+
+async def store_parse(parse_id: str, result: Dict[str, Any], validation: Dict[str, Any]) -> bool:
+    """Store a successful parse; False if caching is off or the write failed (the next upload re-parses)"""
+    if not Config.QUESTION_PAPER_PARSE_CACHE_ENABLED:
+        return False
+    now = datetime.now()
+    entry = {field: result.get(field) for field in STORED_FIELDS}
+    entry.update({
+        'validation': validation,
+        'model': parse_model_name(),
+        'created_at': now,
+        'last_used_at': now,
+        'hits': 0
+    })
+    try:
+        # Upsert: two concurrent uploads of the same file both parse, and the last one wins
+        await get_async_collection(PARSES_COLLECTION).replace_one({'_id': parse_id}, entry, upsert=True)
+        return True
+    except Exception as e:
+        logger.warning(f"Could not store question paper parse {parse_id[:12]}: {e}")
+        return False
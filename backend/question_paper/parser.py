@@ -1,33 +1,34 @@
 import os
+import asyncio
 import json
 import logging
 import re
-import time
-import itertools
+import copy
 from pathlib import Path
-from typing import List, Dict, Any, Optional
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from threading import Lock
+from typing import Iterator, List, Dict, Any, Optional, Tuple
 import google.generativeai as genai
-from tenacity import retry, stop_after_attempt, wait_fixed, RetryError
-from pdf2image import convert_from_path
 from PIL import Image
 import io
 from dotenv import load_dotenv
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config
 from prompts import QUESTION_PARSING_PROMPT
+from llm.client import ResponseRejected, get_llm_client
+from llm.rate_limiter import estimate_tokens
+from imaging.pdf_pages import iter_pdf_pages
+from imaging.preparation import QUESTION_PAPER, get_profile, prepare_and_encode, prepare_image_file
 
 logger = logging.getLogger(__name__)
 
 # Configure Gemini API for question parsing
+MODEL_NAME = 'gemini-2.5-flash-preview-04-17'
 try:
     api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
     if not api_key:
         raise ValueError("No Gemini API key found. Set GOOGLE_API_KEY or GEMINI_API_KEY environment variable.")
     genai.configure(api_key=api_key)
-    MODEL_NAME = 'gemini-2.5-flash-preview-04-17'
     model = genai.GenerativeModel(model_name=MODEL_NAME)
     logger.info(f"Successfully initialized Gemini model for question parsing: {MODEL_NAME}")
 except Exception as e:
@@ -37,122 +38,77 @@ except Exception as e:
 # Configuration
 MAX_RETRIES = 5
 TEMPERATURE = 0.1
-DPI = 300
+MAX_OUTPUT_TOKENS = 6024
 
-# Rate limiting
-_last_call = 0.0
-_rl_lock = Lock()
+# Render/encode settings for printed question papers (see imaging/preparation.py)
+IMAGE_PROFILE = get_profile(QUESTION_PAPER)
 
-def rate_limited_call(fn, *args, **kwargs):
-    """Rate-limited function calls to respect API limits"""
-    global _last_call
-    with _rl_lock:
-        gap = 1.0 / 4  # 4 QPS limit
-        wait = (_last_call + gap) - time.time()
-        if wait > 0:
-            time.sleep(wait)
-        _last_call = time.time()
-    return fn(*args, **kwargs)
+def iter_page_images(pdf_path: str) -> Iterator[Tuple[int, bytes, str]]:
+    """Render question paper pages one at a time, yielding (page_number, image_bytes, mime_type)"""
+    for page_number, img in iter_pdf_pages(pdf_path, dpi=IMAGE_PROFILE["dpi"]):
+        img_bytes, mime_type = prepare_and_encode(img, IMAGE_PROFILE)
+        img.close()
+        yield page_number, img_bytes, mime_type
 
-def pdf_to_images(pdf_path: str) -> List[str]:
-    """Convert PDF to images and return image paths"""
+def _parse_page_response(response, page_num: int) -> List[Dict[str, Any]]:
+    """Validate a parsing response and return its question blocks; ResponseRejected triggers a retry"""
+    if not response or not response.candidates:
+        feedback = response.prompt_feedback if response and response.prompt_feedback else "No feedback available"
+        raise ResponseRejected(f"API returned no candidates for page {page_num}. Feedback: {feedback}")
+    
+    # Extract text
     try:
-        # Try to find poppler in common locations
-        poppler_path = None
-        possible_paths = [
-            r"C:\poppler-24.08.0\Library\bin",
-            r"C:\Program Files\poppler\bin",
-            "/usr/bin",
-            "/usr/local/bin"
-        ]
-        
-        for path in possible_paths:
-            if os.path.exists(path):
-                poppler_path = path
-                break
-        
-        images = convert_from_path(
-            pdf_path, 
-            dpi=DPI, 
-            fmt="png", 
-            poppler_path=poppler_path
-        )
-        
-        image_paths = []
-        pdf_name = Path(pdf_path).stem
-        upload_dir = Path(pdf_path).parent
-        
-        for idx, img in enumerate(images, 1):
-            img_path = upload_dir / f"{pdf_name}_qp_page_{idx}.png"
-            img.save(img_path, "PNG")
-            image_paths.append(str(img_path))
-            
-        logger.info(f"Converted question paper PDF to {len(images)} images")
-        return image_paths
-        
+        json_str = response.text
     except Exception as e:
-        logger.error(f"Error converting question paper PDF to images: {e}")
-        raise
+        raise ResponseRejected(f"Failed to extract text from API response for page {page_num}") from e
+    
+    if not json_str or not json_str.strip():
+        raise ResponseRejected(f"Received empty text response for page {page_num}")
+    
+    # Clean up potential markdown fences
+    json_str = re.sub(r"^```json\s*|\s*```$", "", json_str, flags=re.MULTILINE)
+    json_str = json_str.strip()
+    
+    # Parse JSON
+    try:
+        extracted_data = json.loads(json_str)
+    except json.JSONDecodeError as e:
+        logger.warning(f"JSON parsing failed for page {page_num}: {e}\nRaw text:\n{json_str}")
+        raise ResponseRejected(f"Failed to parse JSON from page {page_num}") from e
+    
+    # Validate schema
+    if not isinstance(extracted_data, list):
+        logger.warning(f"Extracted data is not a list for page {page_num}")
+        raise ResponseRejected(f"Extracted data for page {page_num} did not match expected list schema")
+    
+    return extracted_data
 
-@retry(stop=stop_after_attempt(MAX_RETRIES), wait=wait_fixed(1), reraise=True)
-def parse_page_questions(img_path: str, page_num: int) -> List[Dict[str, Any]]:
+async def parse_page_questions_async(img_bytes: bytes, page_num: int, mime_type: str = "image/png") -> List[Dict[str, Any]]:
     """Parse questions from a single page image"""
-    if not model:
-        raise Exception("Gemini model not initialized")
-    
     try:
         logger.info(f"Processing question paper page {page_num}...")
         
-        # Read and encode image
-        with open(img_path, "rb") as f:
-            img_bytes = f.read()
-        
         # Prepare message parts for Gemini
         msg_parts = [
             {"text": QUESTION_PARSING_PROMPT.strip()},
-            {"mime_type": "image/png", "data": img_bytes}
+            {"mime_type": mime_type, "data": img_bytes}
         ]
         
-        # Make API call with rate limiting
-        response = rate_limited_call(
-            model.generate_content,
+        # Call through the shared async client (rate limit, timeout, retries)
+        extracted_data = await get_llm_client().generate(
+            "parser",
+            model,
             contents=[{"role": "user", "parts": msg_parts}],
             generation_config=genai.GenerationConfig(
                 temperature=TEMPERATURE,
-                max_output_tokens=6024
-            )
+                max_output_tokens=MAX_OUTPUT_TOKENS
+            ),
+            estimated_tokens=estimate_tokens(QUESTION_PARSING_PROMPT, images=1, max_output_tokens=MAX_OUTPUT_TOKENS),
+            parse=lambda response: _parse_page_response(response, page_num),
+            max_retries=MAX_RETRIES,
+            label=f"question paper page {page_num}"
         )
         
-        # Validate response
-        if not response or not response.candidates:
-            feedback = response.prompt_feedback if response and response.prompt_feedback else "No feedback available"
-            raise RuntimeError(f"API returned no candidates for page {page_num}. Feedback: {feedback}")
-        
-        # Extract text
-        try:
-            json_str = response.text
-        except Exception as e:
-            raise RuntimeError(f"Failed to extract text from API response for page {page_num}") from e
-        
-        if not json_str or not json_str.strip():
-            raise RuntimeError(f"Received empty text response for page {page_num}")
-        
-        # Clean up potential markdown fences
-        json_str = re.sub(r"^```json\s*|\s*```$", "", json_str, flags=re.MULTILINE)
-        json_str = json_str.strip()
-        
-        # Parse JSON
-        try:
-            extracted_data = json.loads(json_str)
-        except json.JSONDecodeError as e:
-            logger.warning(f"JSON parsing failed for page {page_num}: {e}\nRaw text:\n{json_str}")
-            raise RuntimeError(f"Failed to parse JSON from page {page_num}") from e
-        
-        # Validate schema
-        if not isinstance(extracted_data, list):
-            logger.warning(f"Extracted data is not a list for page {page_num}")
-            raise RuntimeError(f"Extracted data for page {page_num} did not match expected list schema")
-        
         logger.info(f"Successfully processed question paper page {page_num}")
         return extracted_data
         
@@ -160,18 +116,85 @@ def parse_page_questions(img_path: str, page_num: int) -> List[Dict[str, Any]]:
         logger.error(f"Error parsing questions from page {page_num}: {e}")
         raise
 
-def merge_page_questions(pages: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
-    """Merge and deduplicate question blocks from multiple pages"""
+def _normalize_id(value: Any) -> str:
+    """Question/part id for matching across pages ("Q 3", "q3." and "Q3" are the same)"""
+    return re.sub(r"[^0-9a-z]", "", str(value or "").lower())
+
+def _option_ids(block: Dict[str, Any]) -> List[str]:
+    return [_normalize_id(option.get("id")) for option in block.get("options") or [] if _normalize_id(option.get("id"))]
+
+def _merge_text(target: Dict[str, Any], source: Dict[str, Any]):
+    """Join question text split over a page break; repeated text (a reprinted header) is kept once"""
+    before, after = (target.get("question_text") or "").strip(), (source.get("question_text") or "").strip()
+    if after and after not in before:
+        target["question_text"] = after if before in after else f"{before} {after}".strip()
+    if not target.get("marks") and source.get("marks"):
+        target["marks"] = source["marks"]
+
+def _merge_parts(target: Dict[str, Any], source: Dict[str, Any]):
+    """Merge one option's parts into the same option seen earlier; new parts keep their order"""
+    parts = target.setdefault("parts", [])
+    if not source.get("parts"):
+        _merge_text(parts[-1] if parts else target, source)
+        return
+    if not parts and target.get("question_text"):
+        # Stem printed before the page break, parts after it
+        parts.append({"part_id": "", "question_text": target.pop("question_text"), "marks": target.pop("marks", 0)})
+    by_id = {_normalize_id(part.get("part_id")): part for part in parts}
+    for part in source["parts"]:
+        part_id = _normalize_id(part.get("part_id"))
+        if part_id in by_id or (not part_id and parts):
+            _merge_text(by_id.get(part_id) or parts[-1], part)
+        else:
+            parts.append(copy.deepcopy(part))
+            by_id[part_id] = parts[-1]
+
+def _merge_block(target: Dict[str, Any], source: Dict[str, Any]):
+    """Fold a block into the block holding the same question(s)"""
+    options = target.setdefault("options", [])
+    for option in source.get("options") or []:
+        option_id = _normalize_id(option.get("id"))
+        match = next((o for o in options if _normalize_id(o.get("id")) == option_id), None)
+        if option_id and match is None:
+            options.append(copy.deepcopy(option))
+        else:
+            # No id: the rest of the last question, continued from the previous page
+            _merge_parts(match or options[-1], option)
+
+def merge_page_questions(pages: List[Optional[List[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+    """
+    Merge question blocks from every page, in page order (None for a page that
+    failed to parse).
+
+    A block is folded only into the block right before it: when it names the
+    same question (parts or text continued over a page break), or when it has
+    no id and opens a page whose predecessor parsed. A question number seen
+    further back stays separate, so papers that restart numbering per section
+    keep every question. Exact repeats (headers printed on every page) disappear.
+    """
     merged: List[Dict[str, Any]] = []
-    seen_keys: set[str] = set()
+    seen_keys: set = set()
+    previous_page_parsed = False
     
-    for page_blocks in itertools.chain.from_iterable(pages):
-        # Create a stable representation for comparison
-        block_key = json.dumps(page_blocks, sort_keys=True)
-        
-        if block_key not in seen_keys:
-            merged.append(page_blocks)
+    for page_blocks in pages:
+        if page_blocks is None:
+            previous_page_parsed = False  # Never stitch across a missing page
+            continue
+        for position, block in enumerate(page_blocks):
+            if not isinstance(block, dict) or not block.get("options"):
+                continue
+            block_key = json.dumps(block, sort_keys=True)
+            if block_key in seen_keys:
+                continue
             seen_keys.add(block_key)
+            
+            previous = merged[-1] if merged and (position > 0 or previous_page_parsed) else None
+            ids = _option_ids(block)
+            if previous is not None and (set(ids) & set(_option_ids(previous)) or (not ids and position == 0)):
+                _merge_block(previous, block)
+            else:
+                merged.append(copy.deepcopy(block))
+        previous_page_parsed = True
     
     return merged
 
@@ -218,7 +241,7 @@ def convert_to_simple_format(parsed_questions: List[Dict[str, Any]]) -> List[Dic
     
     return simple_questions
 
-def parse_question_paper(file_path: str) -> Dict[str, Any]:
+async def parse_question_paper_async(file_path: str) -> Dict[str, Any]:
     """
     Main function to parse a question paper from PDF or image
     Returns parsed questions and metadata
@@ -229,47 +252,64 @@ def parse_question_paper(file_path: str) -> Dict[str, Any]:
         
         # Handle different file types
         if file_ext == '.pdf':
-            # Convert PDF to images
-            image_paths = pdf_to_images(file_path)
+            # Render pages lazily so parsing starts as soon as page 1 is ready
+            page_images = iter_page_images(file_path)
         elif file_ext in ['.png', '.jpg', '.jpeg', '.tiff', '.bmp']:
-            # Single image
-            image_paths = [file_path]
+            # Single image, prepared like a rendered page
+            img_bytes, mime_type = await asyncio.to_thread(prepare_image_file, file_path, IMAGE_PROFILE)
+            page_images = iter([(1, img_bytes, mime_type)])
         else:
             raise ValueError(f"Unsupported file format for question paper: {file_ext}")
         
-        if not image_paths:
-            raise Exception("No images to process")
+        # Parse pages concurrently (the shared client's limiter paces the calls);
+        # results are kept by page number, never by completion order. A slot is
+        # taken before a page is rendered and freed when its parse finishes, so
+        # at most QUESTION_PAPER_PARSE_CONCURRENCY encoded pages are held at once
+        slots = asyncio.Semaphore(max(1, Config.QUESTION_PAPER_PARSE_CONCURRENCY))
+        
+        async def parse_page(img_bytes: bytes, page_num: int, mime_type: str) -> List[Dict[str, Any]]:
+            try:
+                return await parse_page_questions_async(img_bytes, page_num, mime_type)
+            finally:
+                slots.release()
         
-        # Parse questions from each page
-        all_page_questions = []
+        page_results: Dict[int, Optional[List[Dict[str, Any]]]] = {}
+        failed_pages = []
         
-        with ThreadPoolExecutor(max_workers=2) as executor:
-            future_to_page = {}
+        tasks = {}
+        try:
+            while True:
+                await slots.acquire()
+                page = await asyncio.to_thread(next, page_images, None)
+                if page is None:
+                    slots.release()
+                    break
+                page_num, img_bytes, mime_type = page
+                tasks[page_num] = asyncio.create_task(parse_page(img_bytes, page_num, mime_type))
+                del page, img_bytes
             
-            for i, img_path in enumerate(image_paths):
-                future = executor.submit(parse_page_questions, img_path, i + 1)
-                future_to_page[future] = i + 1
+            if not tasks:
+                raise Exception("No images to process")
             
-            for future in as_completed(future_to_page.keys()):
-                page_num = future_to_page[future]
+            for page_num, task in tasks.items():
                 try:
-                    page_questions = future.result()
-                    all_page_questions.append(page_questions)
+                    page_results[page_num] = await task
                     logger.info(f"Successfully parsed page {page_num}")
+                except asyncio.CancelledError:
+                    raise
                 except Exception as e:
                     logger.error(f"Failed to parse page {page_num}: {e}")
                     # Continue with other pages
+                    page_results[page_num] = None
+                    failed_pages.append(page_num)
+        finally:
+            for task in tasks.values():
+                task.cancel()
         
-        # Clean up image files (only for PDF conversion)
-        if file_ext == '.pdf':
-            for img_path in image_paths:
-                try:
-                    os.remove(img_path)
-                except Exception as e:
-                    logger.warning(f"Could not remove file {img_path}: {e}")
+        pages_processed = len(tasks)
         
-        # Merge questions from all pages
-        merged_questions = merge_page_questions(all_page_questions)
+        # Merge questions from all pages, in page order
+        merged_questions = merge_page_questions([page_results[page_num] for page_num in sorted(page_results)])
         
         # Convert to simple format for compatibility
         simple_questions = convert_to_simple_format(merged_questions)
@@ -281,18 +321,19 @@ def parse_question_paper(file_path: str) -> Dict[str, Any]:
         
         return {
             "success": True,
-            "message": f"Successfully parsed {len(simple_questions)} questions from {len(image_paths)} pages",
+            "message": f"Successfully parsed {len(simple_questions)} questions from {pages_processed} pages",
             "questions": simple_questions,
             "raw_structure": merged_questions,
             "metadata": {
                 "total_questions": len(simple_questions),
                 "total_marks": total_marks,
-                "pages_processed": len(image_paths),
+                "pages_processed": pages_processed,
+                "failed_pages": failed_pages,
                 "filename": Path(file_path).name
             },
             "total_questions": len(simple_questions),
             "total_marks": total_marks,
-            "pages_processed": len(image_paths)
+            "pages_processed": pages_processed
         }
         
     except Exception as e:
@@ -307,6 +348,10 @@ def parse_question_paper(file_path: str) -> Dict[str, Any]:
             "pages_processed": 0
         }
 
+def parse_question_paper(file_path: str) -> Dict[str, Any]:
+    """Blocking wrapper around parse_question_paper_async (runs on the shared LLM client loop)"""
+    return get_llm_client().run(parse_question_paper_async(file_path))
+
 def validate_parsed_questions(questions: List[Dict[str, Any]]) -> Dict[str, Any]:
     """Validate the parsed questions and return validation results"""
     issues = []
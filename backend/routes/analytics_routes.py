@@ -3,6 +3,7 @@ FastAPI router for analytics data
 Provides real-time analytics from database collections
 """
 
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException, status
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
@@ -11,19 +12,58 @@ from collections import defaultdict
 from bson.objectid import ObjectId
 
 from mongoDB.auth import get_current_user_optional
-from mongoDB.db_config import (
-    evaluations_collection, 
-    question_papers_collection, 
+from mongoDB.db_config import parse_json
+from mongoDB.async_db import (
+    evaluations_collection,
+    question_papers_collection,
     users_collection,
     upload_queue_collection,
-    parse_json
+    get_async_collection
 )
+from analytics.cache import (
+    cached_response,
+    get_response_cache,
+    EVALUATIONS,
+    UPLOAD_QUEUE,
+    QUESTION_PAPERS
+)
+from analytics.rollups import (
+    TOTALS_COLLECTION,
+    DAILY_COLLECTION,
+    STUDENTS_COLLECTION,
+    QUESTION_PAPERS_COLLECTION,
+    TOTALS_ID,
+    HISTOGRAM_BUCKETS
+)
+from llm.usage import STAGES
+from config import Config
 
 logger = logging.getLogger(__name__)
 
 analytics_router = APIRouter(tags=["analytics"])
 
+# Dashboards read the materialized rollups (analytics/rollups.py), not the evaluations collection
+totals_rollup = get_async_collection(TOTALS_COLLECTION)
+daily_rollup = get_async_collection(DAILY_COLLECTION)
+students_rollup = get_async_collection(STUDENTS_COLLECTION)
+question_papers_rollup = get_async_collection(QUESTION_PAPERS_COLLECTION)
+
+async def get_totals() -> dict:
+    """The single all-time totals rollup (empty until the first evaluation or a rebuild)"""
+    return await totals_rollup.find_one({"_id": TOTALS_ID}) or {}
+
+def average_score(rollup: dict) -> Optional[float]:
+    """Mean question percentage of a rollup, None if nothing was scored"""
+    return rollup["score_sum"] / rollup["scored"] if rollup.get("scored") else None
+
+async def get_daily_rollups(start_date: datetime) -> List[dict]:
+    """Per-day rollups from start_date's day onwards (keys are YYYY-MM-DD, so they sort by date)"""
+    return await daily_rollup.find(
+        {"_id": {"$gte": start_date.strftime("%Y-%m-%d")}}
+    ).sort("_id", 1).to_list(length=None)
+
 @analytics_router.get("/overview", response_model=dict)
+@cached_response("overview", depends_on=(EVALUATIONS, QUESTION_PAPERS, UPLOAD_QUEUE))
 async def get_analytics_overview(
     current_user: Optional[dict] = Depends(get_current_user_optional)
 ):
@@ -34,33 +74,25 @@ async def get_analytics_overview(
         last_month = now - timedelta(days=30)
         last_week = now - timedelta(days=7)
         
-        # Total evaluations
-        total_evaluations = evaluations_collection.count_documents({})
-        recent_evaluations = evaluations_collection.count_documents({
-            "created_at": {"$gte": last_month}
-        })
-        
-        # Average score calculation
-        pipeline = [
-            {"$unwind": "$evaluations"},
-            {"$group": {
-                "_id": None,
-                "avg_score": {"$avg": "$evaluations.percentage_score"},
-                "total_scores": {"$sum": 1}
-            }}
-        ]
-        avg_result = list(evaluations_collection.aggregate(pipeline))
-        avg_score = round(avg_result[0]["avg_score"]) if avg_result and avg_result[0]["avg_score"] is not None else 0
-        
+        # The reads are independent; run them concurrently
+        (
+            totals,
+            recent_days,
+            total_question_papers,
+            total_uploads,
+            pending_uploads
+        ) = await asyncio.gather(
+            get_totals(),
+            get_daily_rollups(last_month),
+            question_papers_collection.estimated_document_count(),
+            upload_queue_collection.estimated_document_count(),
+            upload_queue_collection.count_documents({"status": "pending"})
+        )
+        total_evaluations = totals.get("documents", 0)
+        recent_evaluations = sum(day.get("documents", 0) for day in recent_days)
+        avg_score = round(average_score(totals) or 0)
         # Active users (users who have evaluations)
-        active_users = len(evaluations_collection.distinct("student_id"))
-        
-        # Question papers count
-        total_question_papers = question_papers_collection.count_documents({})
-        
-        # Upload queue stats
-        total_uploads = upload_queue_collection.count_documents({})
-        pending_uploads = upload_queue_collection.count_documents({"status": "pending"})
+        active_users = totals.get("students", 0)
         
         return {
             "success": True,
@@ -85,42 +117,20 @@ async def get_analytics_overview(
         )
 
 @analytics_router.get("/score-distribution", response_model=dict)
+@cached_response("score-distribution", depends_on=(EVALUATIONS,))
 async def get_score_distribution(
     current_user: Optional[dict] = Depends(get_current_user_optional)
 ):
     """Get score distribution data for analytics charts"""
     try:
-        # Score distribution pipeline
-        pipeline = [
-            {"$unwind": "$evaluations"},
-            {"$group": {
-                "_id": {
-                    "$switch": {
-                        "branches": [
-                            {"case": {"$lt": ["$evaluations.percentage_score", 21]}, "then": "0-20"},
-                            {"case": {"$lt": ["$evaluations.percentage_score", 41]}, "then": "21-40"},
-                            {"case": {"$lt": ["$evaluations.percentage_score", 61]}, "then": "41-60"},
-                            {"case": {"$lt": ["$evaluations.percentage_score", 81]}, "then": "61-80"},
-                            {"case": {"$gte": ["$evaluations.percentage_score", 81]}, "then": "81-100"}
-                        ],
-                        "default": "Unknown"
-                    }
-                },
-                "count": {"$sum": 1}
-            }},
-            {"$sort": {"_id": 1}}
-        ]
-        
-        results = list(evaluations_collection.aggregate(pipeline))
+        # Score histogram of every evaluated question
+        histogram = (await get_totals()).get("histogram", {})
         
-        # Initialize all ranges
-        ranges = ["0-20", "21-40", "41-60", "61-80", "81-100"]
         distribution = []
-        total_count = sum(r["count"] for r in results)
+        total_count = sum(histogram.get(range_val, 0) for range_val in HISTOGRAM_BUCKETS)
         
-        for range_val in ranges:
-            result = next((r for r in results if r["_id"] == range_val), None)
-            count = result["count"] if result else 0
+        for range_val in HISTOGRAM_BUCKETS:
+            count = histogram.get(range_val, 0)
             percentage = round((count / max(total_count, 1)) * 100)
             
             distribution.append({
@@ -146,6 +156,7 @@ async def get_score_distribution(
         )
 
 @analytics_router.get("/performance-trends", response_model=dict)
+@cached_response("performance-trends", depends_on=(EVALUATIONS,))
 async def get_performance_trends(
     months: int = 6,
     current_user: Optional[dict] = Depends(get_current_user_optional)
@@ -156,21 +167,17 @@ async def get_performance_trends(
         now = datetime.now()
         start_date = now - timedelta(days=months * 30)
         
-        pipeline = [
-            {"$match": {"created_at": {"$gte": start_date}}},
-            {"$unwind": "$evaluations"},
-            {"$group": {
-                "_id": {
-                    "year": {"$year": "$created_at"},
-                    "month": {"$month": "$created_at"}
-                },
-                "avg_score": {"$avg": "$evaluations.percentage_score"},
-                "count": {"$sum": 1}
-            }},
-            {"$sort": {"_id.year": 1, "_id.month": 1}}
-        ]
+        # Fold the daily rollups into months
+        monthly = defaultdict(lambda: {"score_sum": 0, "scored": 0, "questions": 0})
+        for day in await get_daily_rollups(start_date):
+            year, month = int(day["_id"][:4]), int(day["_id"][5:7])
+            for field in ("score_sum", "scored", "questions"):
+                monthly[(year, month)][field] += day.get(field, 0)
         
-        results = list(evaluations_collection.aggregate(pipeline))
+        results = [
+            {"_id": {"year": year, "month": month}, "avg_score": average_score(counters), "count": counters["questions"]}
+            for (year, month), counters in sorted(monthly.items())
+        ]
         
         # Format results
         trends = []
@@ -225,29 +232,29 @@ async def get_performance_trends(
         )
 
 @analytics_router.get("/top-performers", response_model=dict)
+@cached_response("top-performers", depends_on=(EVALUATIONS,))
 async def get_top_performers(
     limit: int = 10,
     current_user: Optional[dict] = Depends(get_current_user_optional)
 ):
     """Get top performing students based on average scores"""
     try:
-        # Pipeline to get student performance
-        pipeline = [
-            {"$unwind": "$evaluations"},
-            {"$group": {
-                "_id": "$student_id",
-                "avg_score": {"$avg": "$evaluations.percentage_score"},
-                "total_evaluations": {"$sum": 1},
-                "total_marks": {"$sum": "$evaluations.marks_obtained"},
-                "max_marks": {"$sum": "$evaluations.max_marks"}
-            }},
-            {"$match": {"total_evaluations": {"$gte": 1}}},  # Only students with at least 1 evaluation
-            {"$sort": {"avg_score": -1}},
-            {"$limit": limit}
+        # Student rollups, best average first (indexed)
+        student_rollups = await students_rollup.find(
+            {"questions": {"$gte": 1}}  # Only students with at least 1 evaluated question
+        ).sort("avg_score", -1).limit(limit).to_list(length=limit)
+        
+        results = [
+            {
+                "_id": rollup["_id"],
+                "avg_score": rollup.get("avg_score"),
+                "total_evaluations": rollup["questions"],
+                "total_marks": rollup.get("marks_obtained", 0),
+                "max_marks": rollup.get("max_marks", 0)
+            }
+            for rollup in student_rollups
         ]
         
-        results = list(evaluations_collection.aggregate(pipeline))
-        
         # Get user details for top performers
         student_ids = [result["_id"] for result in results]
         
@@ -263,10 +270,10 @@ async def get_top_performers(
         # Only query with valid ObjectIds
         students = []
         if valid_object_ids:
-            students = list(users_collection.find(
+            students = await users_collection.find(
                 {"_id": {"$in": valid_object_ids}},
                 {"first_name": 1, "last_name": 1, "username": 1, "email": 1}
-            ))
+            ).to_list(length=None)
         
         # Create lookup map for student details
         student_map = {str(student["_id"]): student for student in students}
@@ -301,7 +308,7 @@ async def get_top_performers(
             "success": True,
             "data": {
                 "top_performers": top_performers,
-                "total_students": len(evaluations_collection.distinct("student_id")),
+                "total_students": (await get_totals()).get("students", 0),
                 "last_updated": datetime.now().isoformat()
             }
         }
@@ -313,7 +320,55 @@ async def get_top_performers(
             detail=f"Failed to get top performers: {str(e)}"
         )
 
+@analytics_router.get("/question-papers", response_model=dict)
+@cached_response("question-papers", depends_on=(EVALUATIONS, QUESTION_PAPERS))
+async def get_question_paper_performance(
+    limit: int = 10,
+    current_user: Optional[dict] = Depends(get_current_user_optional)
+):
+    """Get per question paper evaluation counts and average scores (most evaluated first)"""
+    try:
+        paper_rollups = await question_papers_rollup.find(
+            {"documents": {"$gte": 1}}
+        ).sort("documents", -1).limit(limit).to_list(length=limit)
+        
+        # Titles of stored papers; manual/pipeline evaluations have no paper document
+        paper_ids = [ObjectId(r["_id"]) for r in paper_rollups if ObjectId.is_valid(r["_id"])]
+        papers = await question_papers_collection.find(
+            {"_id": {"$in": paper_ids}}, {"title": 1}
+        ).to_list(length=None) if paper_ids else []
+        titles = {str(paper["_id"]): paper.get("title") for paper in papers}
+        
+        question_papers = []
+        for rollup in paper_rollups:
+            avg = average_score(rollup)
+            question_papers.append({
+                "question_paper_id": rollup["_id"],
+                "title": titles.get(rollup["_id"], rollup["_id"]),
+                "evaluations": rollup["documents"],
+                "questions_evaluated": rollup.get("questions", 0),
+                "average_score": round(avg) if avg is not None else 0,
+                "total_marks": rollup.get("marks_obtained", 0),
+                "max_marks": rollup.get("max_marks", 0)
+            })
+        
+        return {
+            "success": True,
+            "data": {
+                "question_papers": question_papers,
+                "last_updated": datetime.now().isoformat()
+            }
+        }
+        
+    except Exception as e:
+        logger.error(f"Error getting question paper performance: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get question paper performance: {str(e)}"
+        )
+
 @analytics_router.get("/recent-activity", response_model=dict)
+@cached_response("recent-activity", depends_on=(EVALUATIONS, QUESTION_PAPERS, UPLOAD_QUEUE))
 async def get_recent_activity(
     days: int = 7,
     current_user: Optional[dict] = Depends(get_current_user_optional)
@@ -324,23 +379,21 @@ async def get_recent_activity(
         now = datetime.now()
         start_date = now - timedelta(days=days)
         
-        # Recent evaluations
-        recent_evaluations = list(evaluations_collection.find(
-            {"created_at": {"$gte": start_date}},
-            {"created_at": 1, "student_id": 1, "summary.total_marks": 1, "summary.percentage": 1}
-        ).sort("created_at", -1).limit(20))
-        
-        # Recent uploads
-        recent_uploads = list(upload_queue_collection.find(
-            {"created_at": {"$gte": start_date}},
-            {"created_at": 1, "filename": 1, "status": 1, "user_id": 1}
-        ).sort("created_at", -1).limit(20))
-        
-        # Recent question papers
-        recent_papers = list(question_papers_collection.find(
-            {"created_at": {"$gte": start_date}},
-            {"created_at": 1, "title": 1, "creator_id": 1, "total_marks": 1}
-        ).sort("created_at", -1).limit(20))
+        # Recent evaluations, uploads and question papers (fetched concurrently)
+        recent_evaluations, recent_uploads, recent_papers = await asyncio.gather(
+            evaluations_collection.find(
+                {"created_at": {"$gte": start_date}},
+                {"created_at": 1, "student_id": 1, "summary.total_marks": 1, "summary.percentage": 1}
+            ).sort("created_at", -1).limit(20).to_list(length=20),
+            upload_queue_collection.find(
+                {"created_at": {"$gte": start_date}},
+                {"created_at": 1, "filename": 1, "status": 1, "user_id": 1}
+            ).sort("created_at", -1).limit(20).to_list(length=20),
+            question_papers_collection.find(
+                {"created_at": {"$gte": start_date}},
+                {"created_at": 1, "title": 1, "creator_id": 1, "total_marks": 1}
+            ).sort("created_at", -1).limit(20).to_list(length=20)
+        )
         
         # Activity by day
         daily_activity = defaultdict(lambda: {"evaluations": 0, "uploads": 0, "papers": 0})
@@ -393,12 +446,107 @@ async def get_recent_activity(
             detail=f"Failed to get recent activity: {str(e)}"
         )
 
+# Group keys for /usage (day buckets by the evaluation's created_at)
+USAGE_GROUPS = {
+    "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+    "student": "$student_id",
+    "question_paper": "$question_paper_id"
+}
+USAGE_COUNTERS = ("requests", "retries", "rate_limited", "cache_hits", "input_tokens", "output_tokens")
+
+def estimated_cost(input_tokens: int, output_tokens: int) -> float:
+    """Gemini cost in USD at the configured per-million-token prices"""
+    return round(
+        input_tokens / 1e6 * Config.LLM_INPUT_COST_PER_MILLION
+        + output_tokens / 1e6 * Config.LLM_OUTPUT_COST_PER_MILLION, 6
+    )
+
+@analytics_router.get("/usage", response_model=dict)
+@cached_response("usage", depends_on=(EVALUATIONS,))
+async def get_usage_report(
+    days: int = 30,
+    group_by: str = "day",
+    current_user: Optional[dict] = Depends(get_current_user_optional)
+):
+    """Gemini tokens, requests and estimated cost of stored evaluations, per stage"""
+    if group_by not in USAGE_GROUPS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"group_by must be one of: {', '.join(USAGE_GROUPS)}"
+        )
+    try:
+        now = datetime.now()
+        start_date = now - timedelta(days=days)
+        
+        group = {"_id": USAGE_GROUPS[group_by], "evaluations": {"$sum": 1}}
+        for counter in USAGE_COUNTERS:
+            group[counter] = {"$sum": {"$ifNull": [f"$processing_stats.{counter}", 0]}}
+        group["wall_seconds"] = {"$sum": {"$ifNull": ["$processing_stats.wall_seconds", 0]}}
+        for stage in STAGES:
+            for counter in ("requests", "input_tokens", "output_tokens"):
+                group[f"{stage}__{counter}"] = {"$sum": {"$ifNull": [f"$processing_stats.stages.{stage}.{counter}", 0]}}
+        
+        # Evaluations stored before per-run tracking carry process-wide counters; leave them out
+        rows = await evaluations_collection.aggregate([
+            {"$match": {"created_at": {"$gte": start_date}, "processing_stats.stages": {"$exists": True}}},
+            {"$group": group},
+            {"$sort": {"_id": 1}}
+        ]).to_list(length=None)
+        
+        report = []
+        totals = {counter: 0 for counter in ("evaluations",) + USAGE_COUNTERS}
+        for row in rows:
+            entry = {
+                group_by: str(row["_id"]),
+                "evaluations": row["evaluations"],
+                **{counter: row[counter] for counter in USAGE_COUNTERS},
+                "wall_seconds": round(row["wall_seconds"], 3),
+                "estimated_cost": estimated_cost(row["input_tokens"], row["output_tokens"]),
+                "stages": {
+                    stage: {counter: row[f"{stage}__{counter}"] for counter in ("requests", "input_tokens", "output_tokens")}
+                    for stage in STAGES if row[f"{stage}__requests"]
+                }
+            }
+            report.append(entry)
+            for counter in totals:
+                totals[counter] += row[counter]
+        totals["estimated_cost"] = estimated_cost(totals["input_tokens"], totals["output_tokens"])
+        
+        return {
+            "success": True,
+            "data": {
+                "usage": report,
+                "totals": totals,
+                "pricing": {
+                    "input_per_million": Config.LLM_INPUT_COST_PER_MILLION,
+                    "output_per_million": Config.LLM_OUTPUT_COST_PER_MILLION
+                },
+                "last_updated": now.isoformat()
+            }
+        }
+        
+    except Exception as e:
+        logger.error(f"Error getting usage report: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get usage report: {str(e)}"
+        )
+
+@analytics_router.get("/cache-stats", response_model=dict)
+async def get_analytics_cache_stats():
+    """Response cache hit ratios per endpoint"""
+    cache = get_response_cache()
+    return {
+        "success": True,
+        "data": cache.get_stats() if cache else {"enabled": False}
+    }
+
 @analytics_router.get("/health", response_model=dict)
 async def analytics_health_check():
     """Health check for analytics service"""
     try:
         # Test database connectivity
-        evaluations_count = evaluations_collection.count_documents({})
+        evaluations_count = await evaluations_collection.estimated_document_count()
         
         return {
             "success": True,
@@ -11,7 +11,7 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 # Import authentication manager and models
 from mongoDB.auth import AuthManager, get_current_user, get_current_admin_user
-from mongoDB.db_config import users_collection
+from mongoDB.async_db import users_collection
 from models.schemas import (
     UserRegister, UserLogin, UserResponse, UserProfileUpdate, 
     PasswordChange, APIResponse, LoginResponse
@@ -44,7 +44,7 @@ async def register(user_data: UserRegister):
         # Generate username from email (take part before @)
         username = user_data.email.split('@')[0]
         
-        result = auth_manager.register_user(
+        result = await auth_manager.register_user(
             username=username,
             email=user_data.email,
             password=user_data.password,
@@ -73,7 +73,7 @@ async def register(user_data: UserRegister):
 async def login(login_data: UserLogin):
     """Authenticate user and return JWT token"""
     try:
-        result = auth_manager.login_user(login_data.email, login_data.password)
+        result = await auth_manager.login_user(login_data.email, login_data.password)
         
         if result['success']:
             return LoginResponse(
@@ -101,7 +101,7 @@ async def get_profile(current_user: dict = Depends(get_current_user)):
     """Get current user profile"""
     try:
         user_id = current_user['user_id']
-        user = auth_manager.get_user_by_id(user_id)
+        user = await auth_manager.get_user_by_id(user_id)
         
         if user:
             # Remove sensitive information
@@ -131,7 +131,7 @@ async def update_profile(
         user_id = current_user['user_id']
         data = profile_data.dict(exclude_unset=True)
         
-        result = auth_manager.update_user_profile(user_id, data)
+        result = await auth_manager.update_user_profile(user_id, data)
         
         if result['success']:
             return APIResponse(success=True, message=result['message'])
@@ -158,7 +158,7 @@ async def change_password(
     try:
         user_id = current_user['user_id']
         
-        result = auth_manager.change_password(
+        result = await auth_manager.change_password(
             user_id, 
             password_data.currentPassword, 
             password_data.newPassword
@@ -219,11 +219,11 @@ async def upload_avatar(
         
         # Update user profile with avatar URL
         user_id = current_user['user_id']
-        user = auth_manager.get_user_by_id(user_id)
+        user = await auth_manager.get_user_by_id(user_id)
         current_profile = user.get('profile', {}) if user else {}
         current_profile['avatar'] = avatar_url
         
-        result = auth_manager.update_user_profile(user_id, {
+        result = await auth_manager.update_user_profile(user_id, {
             'profile': current_profile
         })
         
@@ -254,7 +254,7 @@ async def upload_avatar(
 async def get_all_users(current_user: dict = Depends(get_current_admin_user)):
     """Get all users (admin only)"""
     try:
-        users = auth_manager.get_all_users()
+        users = await auth_manager.get_all_users()
         return [UserResponse(**parse_json(user)) for user in users]
     except Exception as e:
         raise HTTPException(
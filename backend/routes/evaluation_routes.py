@@ -4,17 +4,30 @@ FastAPI router for evaluating Q&A pairs using Gemini AI
 """
 
 import json
+import asyncio
 from typing import Optional, List, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from pydantic import BaseModel
 from datetime import datetime
 
 from mongoDB.auth import get_current_user, get_current_user_optional
-from mongoDB.db_config import evaluations_collection
-from evaluation.evaluator import evaluate_and_generate_report, get_evaluation_stats
+from mongoDB.async_db import evaluations_collection, get_async_db
+from mongoDB.pagination import PaginationError, build_projection, fetch_page
+from mongoDB.evaluation_store import (
+    DETAIL_FIELDS,
+    attach_details_async,
+    delete_evaluation_async,
+    insert_evaluation_async,
+    insert_evaluations_async,
+    load_evaluation_async
+)
+from analytics.rollups import update_rollups_async, update_rollups_many_async
+from evaluation.evaluator import evaluate_and_generate_report_async, get_evaluation_stats
+from llm.client import get_llm_client
 from mongoDB.models import EvaluationModel
 from models.schemas import APIResponse, EvaluationResult, EvaluationSummary
 from bson.objectid import ObjectId
+from config import Config
 
 # Request/Response Models
 class EvaluationRequest(BaseModel):
@@ -30,9 +43,43 @@ class EvaluationResponse(BaseModel):
     result: Dict[str, Any]
     stats: Optional[Dict[str, Any]] = None
 
+class BulkEvaluationItem(BaseModel):
+    questions: List[Dict[str, Any]]
+    studentName: Optional[str] = "Anonymous"
+    questionPaperId: Optional[str] = None  # Defaults to the request's questionPaperId
+    reference: Optional[str] = None        # Echoed back to match results to sheets
+
+class BulkEvaluationRequest(BaseModel):
+    items: List[BulkEvaluationItem]
+    evaluationType: str = "rubric"
+    questionPaperId: Optional[str] = None
+
+class BulkEvaluationItemResult(BaseModel):
+    index: int
+    reference: Optional[str] = None
+    success: bool
+    evaluationId: Optional[str] = None
+    summary: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+class BulkEvaluationResponse(BaseModel):
+    success: bool
+    message: str
+    total: int
+    succeeded: int
+    failed: int
+    results: List[BulkEvaluationItemResult]
+    stats: Optional[Dict[str, Any]] = None
+
 # Create FastAPI Router
 evaluation_router = APIRouter()
 
+# Returned by list_evaluations; evaluations, ocr_text and processing_stats are opt-in
+EVALUATION_SUMMARY_FIELDS = (
+    'student_id', 'student_name', 'question_paper_id', 'summary', 'evaluation_type',
+    'status', 'original_filename', 'total_questions', 'updated_at', 'has_details'
+)
+
 def parse_json(obj):
     """Convert ObjectId to string for JSON serialization"""
     if isinstance(obj, list):
@@ -76,10 +123,10 @@ async def evaluate_qa_pairs(
         
         # Perform evaluation using the evaluation module
         try:
-            evaluation_result = evaluate_and_generate_report(
+            evaluation_result = await get_llm_client().run_async(evaluate_and_generate_report_async(
                 request.questions, 
                 request.evaluationType
-            )
+            ))
             
             if not evaluation_result:
                 raise HTTPException(
@@ -101,8 +148,8 @@ async def evaluate_qa_pairs(
             
             # Store in database
             try:
-                result = evaluations_collection.insert_one(evaluation_doc)
-                evaluation_id = str(result.inserted_id)
+                evaluation_id = str(await insert_evaluation_async(get_async_db(), evaluation_doc))
+                await update_rollups_async(get_async_db(), evaluation_doc)
                 
                 # Update the evaluation result with database ID
                 evaluation_result['evaluationId'] = evaluation_id
@@ -133,48 +180,131 @@ async def evaluate_qa_pairs(
             detail=f"Evaluation failed: {str(e)}"
         )
 
-@evaluation_router.get("/{evaluation_id}", response_model=dict)
-async def get_evaluation(
-    evaluation_id: str,
+def is_valid_paper_id(question_paper_id: str) -> bool:
+    """Whether create_evaluation_document accepts this question paper id"""
+    return question_paper_id in ("manual", "pipeline") or ObjectId.is_valid(question_paper_id)
+
+@evaluation_router.post("/bulk", response_model=BulkEvaluationResponse)
+async def evaluate_bulk(
+    request: BulkEvaluationRequest,
     current_user: Optional[dict] = Depends(get_current_user_optional)
 ):
-    """Get evaluation results by ID"""
-    try:
-        evaluation = evaluations_collection.find_one({
-            '_id': ObjectId(evaluation_id)
-        })
-        
-        if not evaluation:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Evaluation not found"
-            )
-        
-        return {
-            'success': True,
-            'evaluation': parse_json(evaluation)
-        }
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        if "ObjectId" in str(e):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid evaluation ID format"
-            )
+    """
+    Grade a cohort of mapped answer sheets in one request.
+    
+    Sheets are graded concurrently (EVALUATION_BULK_CONCURRENCY at a time, their
+    Gemini calls sharing the client's limiter) and stored as they finish in
+    unordered insert_many batches, so one failing sheet or write never stops
+    the others. Results are reported per item, in request order.
+    """
+    if not request.items:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Items list cannot be empty")
+    if len(request.items) > Config.EVALUATION_BULK_MAX_ITEMS:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to get evaluation: {str(e)}"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many items: {len(request.items)} (maximum {Config.EVALUATION_BULK_MAX_ITEMS})"
         )
+    if request.questionPaperId and not is_valid_paper_id(request.questionPaperId):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid questionPaperId: {request.questionPaperId}"
+        )
+    
+    evaluation_type = request.evaluationType if request.evaluationType in ["rubric", "holistic"] else "rubric"
+    user_id = current_user.get('user_id', 'anonymous') if current_user else 'anonymous'
+    db = get_async_db()
+    results = [BulkEvaluationItemResult(index=i, reference=item.reference, success=False)
+               for i, item in enumerate(request.items)]
+    semaphore = asyncio.Semaphore(max(1, Config.EVALUATION_BULK_CONCURRENCY))
+    
+    async def grade(index: int, item: BulkEvaluationItem):
+        """(index, evaluation document or None); failures are recorded on the item's result"""
+        if not item.questions:
+            results[index].error = "Questions list is required and cannot be empty"
+            return index, None
+        # Checked before grading so a bad id never costs Gemini calls
+        if item.questionPaperId and not is_valid_paper_id(item.questionPaperId):
+            results[index].error = f"Invalid questionPaperId: {item.questionPaperId}"
+            return index, None
+        try:
+            async with semaphore:
+                evaluation_result = await get_llm_client().run_async(
+                    evaluate_and_generate_report_async(item.questions, evaluation_type)
+                )
+            if not evaluation_result:
+                raise ValueError("Evaluation process failed to generate results")
+            
+            results[index].summary = evaluation_result.get('summary', {})
+            return index, EvaluationModel.create_evaluation_document(
+                student_id=user_id,
+                question_paper_id=item.questionPaperId or request.questionPaperId or "manual",
+                evaluations=evaluation_result.get('evaluations', []),
+                summary=evaluation_result.get('summary', {}),
+                evaluation_type=evaluation_type,
+                processing_stats=evaluation_result.get('processingStats', {}),
+                student_name=item.studentName,
+                total_questions=evaluation_result.get('totalQuestions', 0)
+            )
+        except Exception as e:
+            results[index].error = f"Evaluation failed: {str(e)}"
+            return index, None
+    
+    async def store(batch):
+        """Persist graded sheets with one unordered bulk write per collection"""
+        docs = [doc for _, doc in batch]
+        try:
+            errors = await insert_evaluations_async(db, docs)
+        except Exception as e:
+            errors = [f"Could not store evaluation: {str(e)}"] * len(batch)
+        
+        stored = []
+        for (index, doc), error in zip(batch, errors):
+            if error:
+                results[index].error = error
+            else:
+                results[index].success = True
+                results[index].evaluationId = str(doc['_id'])
+                stored.append(doc)
+        await update_rollups_many_async(db, stored)
+    
+    tasks = [asyncio.ensure_future(grade(i, item)) for i, item in enumerate(request.items)]
+    try:
+        batch = []
+        for next_graded in asyncio.as_completed(tasks):
+            index, doc = await next_graded
+            if doc is not None:
+                batch.append((index, doc))
+            if len(batch) >= Config.EVALUATION_BULK_WRITE_BATCH:
+                await store(batch)
+                batch = []
+        if batch:
+            await store(batch)
+    finally:
+        # A disconnected client must not leave sheets grading in the background
+        for task in tasks:
+            task.cancel()
+    
+    succeeded = sum(1 for result in results if result.success)
+    return BulkEvaluationResponse(
+        success=succeeded > 0,
+        message=f"Evaluated and stored {succeeded} of {len(results)} answer sheets",
+        total=len(results),
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        results=results,
+        stats=get_evaluation_stats()
+    )
 
 @evaluation_router.get("/", response_model=dict)
 async def list_evaluations(
     current_user: Optional[dict] = Depends(get_current_user_optional),
-    limit: int = 20,
-    skip: int = 0
+    limit: int = Query(20, ge=1, le=100),
+    question_paper_id: Optional[str] = Query(None, description="Only evaluations against this question paper"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    fields: Optional[str] = Query(None, description="Extra fields (e.g. evaluations,ocr_text) or 'all'"),
+    include_total: bool = Query(False, description="Also count matching evaluations (slower)")
 ):
-    """List evaluations for the current user"""
+    """List evaluations for the current user, newest first (summary fields unless fields= asks for more)"""
     try:
         user_id = current_user.get('user_id') if current_user else None
         
@@ -184,25 +314,38 @@ async def list_evaluations(
         if user_id and user_id != 'anonymous':
             # Filter by user only if authenticated and not anonymous
             query['student_id'] = user_id
+        if question_paper_id:
+            # Stored as an ObjectId, or the "manual"/"pipeline" markers
+            query['question_paper_id'] = ObjectId(question_paper_id) if ObjectId.is_valid(question_paper_id) else question_paper_id
         
-        # Get evaluations with pagination
-        cursor = evaluations_collection.find(query).sort('created_at', -1).skip(skip).limit(limit)
-        evaluations = list(cursor)
+        projection = build_projection(EVALUATION_SUMMARY_FIELDS, fields)
+        page = fetch_page(evaluations_collection, query, limit, cursor, projection)
+        if include_total:
+            (evaluations, next_cursor), total_count = await asyncio.gather(
+                page, evaluations_collection.count_documents(query)
+            )
+        else:
+            evaluations, next_cursor = await page
+            total_count = None
         
-        # Get total count
-        total_count = evaluations_collection.count_documents(query)
+        # OCR text and full per-question entries live in the details store
+        requested = DETAIL_FIELDS if projection is None else [field for field in DETAIL_FIELDS if field in projection]
+        if requested:
+            await attach_details_async(get_async_db(), evaluations, requested)
         
         return {
             'success': True,
             'evaluations': parse_json(evaluations),
             'pagination': {
-                'total': total_count,
-                'skip': skip,
                 'limit': limit,
-                'has_more': total_count > skip + limit
+                'next_cursor': next_cursor,
+                'has_more': next_cursor is not None,
+                'total': total_count
             }
         }
         
+    except PaginationError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -232,18 +375,20 @@ async def evaluation_health_check():
         # Test if Gemini model is properly configured
         from evaluation.evaluator import model
         
-        if model is None:
+        if model is None and not Config.LLM_FAKE_MODEL:
             return {
                 "status": "unhealthy",
                 "message": "Gemini model not initialized for evaluation",
-                "service": "Evaluation"
+                "service": "Evaluation",
+                "fake_model": False
             }
         
         return {
             "status": "healthy",
             "message": "Evaluation service is operational",
             "service": "Evaluation",
-            "model": "gemini-2.5-flash-preview-04-17"
+            "model": "fake" if Config.LLM_FAKE_MODEL else "gemini-2.5-flash-preview-04-17",
+            "fake_model": Config.LLM_FAKE_MODEL
         }
         
     except Exception as e:
@@ -253,6 +398,40 @@ async def evaluation_health_check():
             "service": "Evaluation"
         }
 
+# After /stats and /health, which it would otherwise shadow
+@evaluation_router.get("/{evaluation_id}", response_model=dict)
+async def get_evaluation(
+    evaluation_id: str,
+    current_user: Optional[dict] = Depends(get_current_user_optional)
+):
+    """Get evaluation results by ID"""
+    try:
+        evaluation = await load_evaluation_async(get_async_db(), ObjectId(evaluation_id))
+        
+        if not evaluation:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Evaluation not found"
+            )
+        
+        return {
+            'success': True,
+            'evaluation': parse_json(evaluation)
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        if "ObjectId" in str(e):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid evaluation ID format"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get evaluation: {str(e)}"
+        )
+
 @evaluation_router.delete("/{evaluation_id}", response_model=dict)
 async def delete_evaluation(
     evaluation_id: str,
@@ -261,7 +440,7 @@ async def delete_evaluation(
     """Delete evaluation by ID"""
     try:
         # Check if evaluation exists
-        evaluation = evaluations_collection.find_one({
+        evaluation = await evaluations_collection.find_one({
             '_id': ObjectId(evaluation_id)
         })
         
@@ -271,17 +450,17 @@ async def delete_evaluation(
                 detail="Evaluation not found"
             )
         
-        # Delete the evaluation
-        result = evaluations_collection.delete_one({
-            '_id': ObjectId(evaluation_id)
-        })
+        # Delete the evaluation and its details
+        deleted_count = await delete_evaluation_async(get_async_db(), evaluation['_id'])
         
-        if result.deleted_count == 0:
+        if deleted_count == 0:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to delete evaluation"
             )
         
+        await update_rollups_async(get_async_db(), evaluation, sign=-1)
+        
         return {
             'success': True,
             'message': 'Evaluation deleted successfully'
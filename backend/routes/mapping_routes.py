@@ -9,8 +9,9 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
 
 from mongoDB.auth import get_current_user, get_current_user_optional
-from mongoDB.db_config import question_papers_collection
-from qna_mapping.mapper import map_questions_to_answers, get_mapping_stats
+from mongoDB.async_db import question_papers_collection
+from qna_mapping.mapper import map_questions_to_answers_async, get_mapping_stats
+from llm.client import get_llm_client
 from models.schemas import APIResponse
 from bson.objectid import ObjectId
 
@@ -63,7 +64,7 @@ async def map_qa_pairs(
         # Get questions from question paper ID or direct questions list
         if request.questionPaperId:
             try:
-                question_paper = question_papers_collection.find_one({
+                question_paper = await question_papers_collection.find_one({
                     '_id': ObjectId(request.questionPaperId)
                 })
                 
@@ -99,7 +100,9 @@ async def map_qa_pairs(
         
         # Perform Q&A mapping
         try:
-            mapped_qa_pairs = map_questions_to_answers(request.text, questions)
+            mapped_qa_pairs = await get_llm_client().run_async(
+                map_questions_to_answers_async(request.text, questions)
+            )
             
             if not mapped_qa_pairs:
                 return MappingResponse(
@@ -11,7 +11,8 @@ from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
 from fastapi.responses import JSONResponse
 
 from mongoDB.auth import get_current_user, get_current_user_optional
-from ocr.ocr_processor import process_document
+from ocr.ocr_processor import process_document_async, get_ocr_stats
+from llm.client import get_llm_client
 from models.schemas import APIResponse
 from config import Config
 
@@ -53,7 +54,7 @@ async def process_ocr(
         
         try:
             # Process document using OCR
-            extracted_text = process_document(temp_file_path)
+            extracted_text = await get_llm_client().run_async(process_document_async(temp_file_path))
             
             if not extracted_text or not extracted_text.strip():
                 raise HTTPException(
@@ -85,6 +86,21 @@ async def process_ocr(
             detail=f"OCR processing failed: {str(e)}"
         )
 
+@ocr_router.get("/stats", response_model=dict)
+async def get_ocr_statistics():
+    """Get OCR cache statistics"""
+    try:
+        return {
+            "success": True,
+            "stats": get_ocr_stats(),
+            "service": "OCR"
+        }
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get OCR stats: {str(e)}"
+        )
+
 @ocr_router.get("/health", response_model=dict)
 async def ocr_health_check():
     """Check OCR service health"""
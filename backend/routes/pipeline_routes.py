@@ -4,18 +4,28 @@ FastAPI router for complete processing pipeline (OCR + Mapping + Evaluation)
 """
 
 import os
+import json
 import time
 import tempfile
-from typing import Optional, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, status
+from typing import Optional, Dict, Any, Tuple
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Header, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials
 from pydantic import BaseModel
 
 from mongoDB.auth import get_current_user, get_current_user_optional
-from mongoDB.db_config import question_papers_collection, evaluations_collection
-from ocr.ocr_processor import process_document
-from qna_mapping.mapper import map_questions_to_answers, get_mapping_stats
-from evaluation.evaluator import evaluate_and_generate_report, get_evaluation_stats
-from mongoDB.models import EvaluationModel
+from ocr.ocr_processor import get_ocr_stats
+from qna_mapping.mapper import get_mapping_stats
+from evaluation.evaluator import get_evaluation_stats
+from pipeline.executor import run_blocking
+from llm.client import get_llm_client
+from pipeline.runner import (
+    PipelineError,
+    load_question_paper_questions_async,
+    run_pipeline,
+    store_pipeline_evaluation_async
+)
+from pipeline.jobs import JobLimitError, PipelineJob, get_job_registry
 from models.schemas import APIResponse
 from bson.objectid import ObjectId
 from config import Config
@@ -30,6 +40,15 @@ class CompleteProcessResponse(BaseModel):
     questions: list
     stats: Dict[str, Any]
 
+class PipelineJobResponse(BaseModel):
+    success: bool
+    message: str
+    jobId: str
+    status: str
+    statusUrl: str
+    eventsUrl: str
+    websocketUrl: str
+
 # Create FastAPI Router
 pipeline_router = APIRouter()
 
@@ -45,146 +64,95 @@ def parse_json(obj):
                 obj[key] = [parse_json(item) if isinstance(item, dict) else item for item in value]
     return obj
 
+ALLOWED_EXTENSIONS = {'.pdf', '.png', '.jpg', '.jpeg', '.tiff', '.bmp'}
+
+async def read_answer_sheet(file: UploadFile) -> Tuple[bytes, str]:
+    """(content, extension) of an uploaded answer sheet; 400 for unsupported or oversized files"""
+    file_ext = os.path.splitext(file.filename or '')[1].lower()
+    if file_ext not in ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported file type: {file_ext}. Allowed: {', '.join(ALLOWED_EXTENSIONS)}"
+        )
+
+    content = await file.read()
+    if len(content) > Config.MAX_CONTENT_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File too large. Maximum size is 16MB"
+        )
+    return content, file_ext
+
+async def load_required_questions(question_paper_id: Optional[str]) -> list:
+    """Questions of the paper; loaded before paying for OCR since mapping cannot run without it"""
+    questions = await load_question_paper_questions_async(question_paper_id)
+    if not questions:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Question paper is required for complete pipeline processing"
+        )
+    return questions
+
+def write_temp_file(content: bytes, suffix: str) -> str:
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
+        temp_file.write(content)
+        return temp_file.name
+
 @pipeline_router.post("/", response_model=CompleteProcessResponse)
 async def process_complete_pipeline(
     file: UploadFile = File(...),
     studentName: str = Form("Anonymous"),
     evaluationType: str = Form("rubric"),
     questionPaperId: Optional[str] = Form(None),
+    streaming: Optional[bool] = Form(None),
     current_user: Optional[dict] = Depends(get_current_user_optional)
 ):
     """
     Complete processing pipeline: OCR -> Q&A Mapping -> Evaluation
     Processes a student answer sheet from upload to final evaluation results
+
+    streaming=true overlaps the stages (mapping and evaluation start while later
+    pages are still being OCR'd); it defaults to the PIPELINE_STREAMING setting.
     """
     try:
-        # Validate file type
-        allowed_extensions = {'.pdf', '.png', '.jpg', '.jpeg', '.tiff', '.bmp'}
-        file_ext = os.path.splitext(file.filename or '')[1].lower()
-        
-        if file_ext not in allowed_extensions:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Unsupported file type: {file_ext}. Allowed: {', '.join(allowed_extensions)}"
-            )
-        
-        # Check file size
-        content = await file.read()
-        if len(content) > Config.MAX_CONTENT_LENGTH:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="File too large. Maximum size is 16MB"
-            )
+        content, file_ext = await read_answer_sheet(file)
+        questions = await load_required_questions(questionPaperId)
         
         # Create temporary file for processing
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as temp_file:
-            temp_file.write(content)
-            temp_file_path = temp_file.name
+        temp_file_path = write_temp_file(content, file_ext)
         
         try:
-            # Step 1: OCR Processing
+            # Steps 1-3: OCR -> Q&A Mapping -> Evaluation on the pipeline executor
             try:
-                extracted_text = process_document(temp_file_path)
-                
-                if not extracted_text or not extracted_text.strip():
-                    raise HTTPException(
-                        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-                        detail="No text could be extracted from the document"
-                    )
-            except Exception as ocr_error:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"OCR processing failed: {str(ocr_error)}"
-                )
-            
-            # Step 2: Get questions for mapping
-            questions = None
-            if questionPaperId:
-                try:
-                    question_paper = question_papers_collection.find_one({
-                        '_id': ObjectId(questionPaperId)
-                    })
-                    
-                    if question_paper:
-                        questions = question_paper.get('questions', [])
-                    else:
-                        # Continue without question paper but warn
-                        print(f"Warning: Question paper {questionPaperId} not found, proceeding without structured mapping")
-                        
-                except Exception as e:
-                    print(f"Warning: Error retrieving question paper: {e}")
-            
-            # Step 3: Q&A Mapping
-            mapped_qa_pairs = []
-            if questions and len(questions) > 0:
-                try:
-                    mapped_qa_pairs = map_questions_to_answers(extracted_text, questions)
-                    
-                    if not mapped_qa_pairs or len(mapped_qa_pairs) == 0:
-                        raise HTTPException(
-                            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-                            detail="No Q&A pairs could be identified from the text"
-                        )
-                        
-                except Exception as mapping_error:
-                    raise HTTPException(
-                        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                        detail=f"Q&A mapping failed: {str(mapping_error)}"
-                    )
-            else:
-                # No question paper provided - cannot proceed with evaluation
+                outcome = await run_blocking(run_pipeline, temp_file_path, questions, evaluationType, streaming)
+            except PipelineError as pipeline_error:
                 raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Question paper is required for complete pipeline processing"
+                    status_code=pipeline_error.status_code,
+                    detail=pipeline_error.message
                 )
             
-            # Step 4: Evaluation
-            try:
-                evaluation_result = evaluate_and_generate_report(
-                    mapped_qa_pairs,
-                    evaluationType
-                )
-                
-                if not evaluation_result:
-                    raise HTTPException(
-                        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                        detail="Evaluation process failed to generate results"
-                    )
-                    
-            except Exception as eval_error:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"Evaluation failed: {str(eval_error)}"
-                )
+            extracted_text = outcome["text"]
+            mapped_qa_pairs = outcome["qa_pairs"]
+            evaluation_result = outcome["evaluation"]
             
-            # Step 5: Store results in database
+            # Step 4: Store results in database
             user_id = current_user.get('user_id', 'anonymous') if current_user else 'anonymous'
-            
-            try:
-                evaluation_doc = EvaluationModel.create_evaluation_document(
-                    student_id=user_id,
-                    question_paper_id=questionPaperId or "pipeline",
-                    evaluations=evaluation_result.get('evaluations', []),
-                    summary=evaluation_result.get('summary', {}),
-                    evaluation_type=evaluationType,
-                    processing_stats=evaluation_result.get('processingStats', {}),
-                    student_name=studentName,
-                    total_questions=evaluation_result.get('totalQuestions', 0),
-                    ocr_text=extracted_text,
-                    original_filename=file.filename
-                )
-                
-                result = evaluations_collection.insert_one(evaluation_doc)
-                evaluation_id = str(result.inserted_id)
-                
-            except Exception as db_error:
-                print(f"Warning: Could not store evaluation in database: {db_error}")
-                evaluation_id = None
+            evaluation_id = await store_pipeline_evaluation_async(
+                user_id=user_id,
+                question_paper_id=questionPaperId,
+                evaluation_result=evaluation_result,
+                evaluation_type=evaluationType,
+                student_name=studentName,
+                ocr_text=extracted_text,
+                original_filename=file.filename
+            )
             
             # Compile statistics
             combined_stats = {
+                "ocr": get_ocr_stats(),
                 "mapping": get_mapping_stats(),
                 "evaluation": get_evaluation_stats(),
+                "llm_client": get_llm_client().get_stats(),
                 "pipeline": {
                     "text_length": len(extracted_text),
                     "questions_mapped": len(mapped_qa_pairs),
@@ -218,6 +186,158 @@ async def process_complete_pipeline(
             detail=f"Complete pipeline processing failed: {str(e)}"
         )
 
+@pipeline_router.post("/jobs", response_model=PipelineJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_pipeline_job(
+    file: UploadFile = File(...),
+    studentName: str = Form("Anonymous"),
+    evaluationType: str = Form("rubric"),
+    questionPaperId: Optional[str] = Form(None),
+    current_user: Optional[dict] = Depends(get_current_user_optional)
+):
+    """
+    Start the complete pipeline in the background and return a job id immediately.
+
+    Follow the job with GET /jobs/{jobId}/events (server-sent events) or the
+    /jobs/{jobId}/ws WebSocket: OCR page k/N, segments mapped, each question's
+    evaluation as it finishes and the tokens used. The evaluation is stored
+    when the job completes, as with POST /.
+    """
+    try:
+        content, file_ext = await read_answer_sheet(file)
+        questions = await load_required_questions(questionPaperId)
+
+        registry = get_job_registry()
+        try:
+            job = registry.create(job_owner(current_user), len(questions), file.filename)
+        except JobLimitError as e:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+        temp_file_path = write_temp_file(content, file_ext)
+        registry.start(job, temp_file_path, questions, evaluationType, studentName, questionPaperId)
+
+        base = f"/api/process-complete/jobs/{job.id}"
+        return PipelineJobResponse(
+            success=True,
+            message="Pipeline job started",
+            jobId=job.id,
+            status=job.status,
+            statusUrl=base,
+            eventsUrl=f"{base}/events",
+            websocketUrl=f"{base}/ws"
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Could not start pipeline job: {str(e)}"
+        )
+
+def job_owner(current_user: Optional[dict]) -> str:
+    """The owner recorded on jobs started by this user (as in start_pipeline_job)"""
+    return (current_user or {}).get('user_id', 'anonymous')
+
+def get_job_or_404(job_id: str, current_user: Optional[dict]) -> PipelineJob:
+    """The job, if it exists and was started by this user; someone else's job is reported as missing"""
+    job = get_job_registry().get(job_id)
+    if job is None or job.owner != job_owner(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Pipeline job not found or expired"
+        )
+    return job
+
+@pipeline_router.get("/jobs/stats", response_model=dict)
+async def get_pipeline_job_stats(current_user: dict = Depends(get_current_user)):
+    """Job counts by status for monitoring (authenticated users only)"""
+    return get_job_registry().get_stats()
+
+@pipeline_router.get("/jobs/{job_id}", response_model=dict)
+async def get_pipeline_job(
+    job_id: str,
+    current_user: Optional[dict] = Depends(get_current_user_optional)
+):
+    """Job status, progress, tokens used and the results so far (the full result once completed)"""
+    return get_job_or_404(job_id, current_user).snapshot()
+
+def format_sse(event: Optional[Dict[str, Any]]) -> str:
+    """One server-sent event; None becomes a keep-alive comment"""
+    if event is None:
+        return ": keep-alive\n\n"
+    data = json.dumps(event["data"], default=str)
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {data}\n\n"
+
+@pipeline_router.get("/jobs/{job_id}/events")
+async def stream_pipeline_job_events(
+    job_id: str,
+    after: int = Query(0, ge=0, description="Replay events after this id"),
+    last_event_id: Optional[str] = Header(None),
+    current_user: Optional[dict] = Depends(get_current_user_optional)
+):
+    """
+    Server-sent event stream of a job's progress, ending after its final event.
+
+    Earlier events are replayed first, so a client that connects late (or
+    reconnects with Last-Event-ID) still sees every page and question.
+    """
+    job = get_job_or_404(job_id, current_user)
+    if last_event_id and last_event_id.isdigit():
+        after = max(after, int(last_event_id))
+
+    async def events():
+        async for event in job.subscribe(after, heartbeat=Config.PIPELINE_JOB_HEARTBEAT_SECONDS):
+            yield format_sse(event)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@pipeline_router.websocket("/jobs/{job_id}/ws")
+async def pipeline_job_websocket(websocket: WebSocket, job_id: str, after: int = 0, token: Optional[str] = None):
+    """
+    WebSocket alternative to /events: one JSON message per event, closed after the final one.
+
+    Browsers cannot set headers on a WebSocket, so the bearer token may also be
+    passed as ?token=.
+    """
+    authorization = websocket.headers.get("authorization", "")
+    if not token and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    current_user = None
+    if token:
+        current_user = await get_current_user_optional(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token))
+
+    job = get_job_registry().get(job_id)
+    if job is None or job.owner != job_owner(current_user):
+        await websocket.close(code=4404, reason="Pipeline job not found or expired")
+        return
+
+    await websocket.accept()
+    try:
+        async for event in job.subscribe(after, heartbeat=Config.PIPELINE_JOB_HEARTBEAT_SECONDS):
+            message = event if event is not None else {"event": "keep-alive"}
+            await websocket.send_text(json.dumps(message, default=str))
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
+@pipeline_router.delete("/jobs/{job_id}", response_model=APIResponse)
+async def cancel_pipeline_job(
+    job_id: str,
+    current_user: Optional[dict] = Depends(get_current_user_optional)
+):
+    """Cancel a queued or running job (nothing is stored)"""
+    job = get_job_or_404(job_id, current_user)
+    if not get_job_registry().cancel(job):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Pipeline job already {job.status}"
+        )
+    return APIResponse(success=True, message="Pipeline job cancelled")
+
 @pipeline_router.get("/health", response_model=dict)
 async def pipeline_health_check():
     """Check complete pipeline health"""
@@ -257,7 +377,8 @@ async def pipeline_health_check():
             "status": health_status["pipeline"],
             "message": "Complete pipeline health check",
             "service": "Complete Pipeline",
-            "components": health_status["components"]
+            "components": health_status["components"],
+            "fake_model": Config.LLM_FAKE_MODEL
         }
         
     except Exception as e:
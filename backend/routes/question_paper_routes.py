@@ -5,6 +5,7 @@ FastAPI router for question paper management and parsing
 
 import os
 import time
+import asyncio
 import tempfile
 from typing import Optional, List, Dict, Any
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, status
@@ -12,9 +13,13 @@ from pydantic import BaseModel
 from datetime import datetime
 
 from mongoDB.auth import get_current_user, get_current_user_optional
-from mongoDB.db_config import question_papers_collection
+from mongoDB.async_db import question_papers_collection
+from mongoDB.pagination import PaginationError, build_projection, fetch_page
+from analytics.cache import invalidate, QUESTION_PAPERS
 from mongoDB.models import QuestionPaperModel
-from question_paper.parser import parse_question_paper, validate_parsed_questions
+from question_paper.parser import parse_question_paper_async, validate_parsed_questions
+from question_paper.parse_cache import get_cached_parse, load_parse, make_parse_id, store_parse
+from llm.client import get_llm_client
 from models.schemas import APIResponse
 from bson.objectid import ObjectId
 from config import Config
@@ -23,7 +28,8 @@ from config import Config
 class QuestionPaperCreate(BaseModel):
     title: str
     description: Optional[str] = ""
-    questions: List[Dict[str, Any]]
+    questions: List[Dict[str, Any]] = []
+    parse_id: Optional[str] = None  # From /parse; questions default to the stored parse
     subject: Optional[str] = ""
     topic: Optional[str] = ""
     difficulty: str = "medium"
@@ -51,10 +57,20 @@ class ParseResponse(BaseModel):
     total_questions: int
     total_marks: int
     pages_processed: int
+    parse_id: Optional[str] = None
+    cached: bool = False
+    question_paper_id: Optional[str] = None  # Paper already created from this parse, if any
 
 # Create FastAPI Router
 question_paper_router = APIRouter()
 
+# Returned by list_question_papers; questions, metadata and validation are opt-in
+QUESTION_PAPER_SUMMARY_FIELDS = (
+    'title', 'description', 'creator_id', 'type', 'difficulty', 'subject', 'topic',
+    'duration', 'total_marks', 'status', 'source', 'updated_at'
+)
+QUESTION_PAPER_COMPUTED_FIELDS = {'question_count': {'$size': {'$ifNull': ['$questions', []]}}}
+
 def parse_json(obj):
     """Convert ObjectId to string for JSON serialization"""
     if isinstance(obj, list):
@@ -86,7 +102,7 @@ async def question_paper_health_check():
     """Health check for question paper service"""
     try:
         # Test database connectivity and question paper operations
-        total_papers = question_papers_collection.count_documents({})
+        total_papers = await question_papers_collection.estimated_document_count()
         
         return {
             "success": True,
@@ -112,7 +128,12 @@ async def parse_question_paper_file(
     file: UploadFile = File(...),
     current_user: Optional[dict] = Depends(get_current_user_optional)
 ):
-    """Parse a question paper from uploaded file using AI"""
+    """
+    Parse a question paper from uploaded file using AI.
+
+    Parses are stored under a hash of the file (parse_id); re-uploading the
+    same file returns the stored result without calling Gemini.
+    """
     try:
         # Validate file
         if not file.filename:
@@ -129,15 +150,40 @@ async def parse_question_paper_file(
                 detail="Only PDF and image files are supported"
             )
         
+        content = await file.read()
+        parse_id = await asyncio.to_thread(make_parse_id, content)
+        
+        cached = await get_cached_parse(parse_id)
+        if cached:
+            existing = await question_papers_collection.find_one({'parse_id': parse_id}, {'_id': 1})
+            return ParseResponse(
+                success=True,
+                message=f"Loaded {cached['total_questions']} previously parsed questions",
+                questions=cached['questions'],
+                metadata={
+                    "total_questions": cached['total_questions'],
+                    "total_marks": cached['total_marks'],
+                    "pages_processed": cached['pages_processed'],
+                    "filename": file.filename
+                },
+                raw_structure=cached.get('raw_structure') or [],
+                validation=cached.get('validation'),
+                total_questions=len(cached['questions']),
+                total_marks=sum(q.get('maxMarks', 0) for q in cached['questions']),
+                pages_processed=cached['pages_processed'],
+                parse_id=parse_id,
+                cached=True,
+                question_paper_id=str(existing['_id']) if existing else None
+            )
+        
         # Save uploaded file temporarily
         with tempfile.NamedTemporaryFile(delete=False, suffix=f'.{file_ext}') as temp_file:
-            content = await file.read()
             temp_file.write(content)
             temp_file_path = temp_file.name
         
         try:
             # Parse question paper
-            result = parse_question_paper(temp_file_path)
+            result = await get_llm_client().run_async(parse_question_paper_async(temp_file_path))
             
             if not result.get('success', False):
                 raise HTTPException(
@@ -147,6 +193,7 @@ async def parse_question_paper_file(
             
             # Validate parsed questions
             validation = validate_parsed_questions(result['questions'])
+            stored = bool(result['questions']) and await store_parse(parse_id, result, validation)
             
             return ParseResponse(
                 success=True,
@@ -157,7 +204,8 @@ async def parse_question_paper_file(
                 validation=validation,
                 total_questions=len(result['questions']),
                 total_marks=sum(q.get('maxMarks', 0) for q in result['questions']),
-                pages_processed=result.get('pages_processed', 1)
+                pages_processed=result.get('pages_processed', 1),
+                parse_id=parse_id if stored else None
             )
             
         finally:
@@ -178,37 +226,65 @@ async def create_question_paper(
     request: QuestionPaperCreate,
     current_user: Optional[dict] = Depends(get_current_user_optional)
 ):
-    """Create a new question paper"""
+    """
+    Create a new question paper.
+
+    With a parse_id from /parse and no questions, the stored parse supplies
+    the questions and their validation, so creation is one read and one insert.
+    """
     try:
         user_id = current_user.get('user_id', 'anonymous') if current_user else 'anonymous'
+        questions = request.questions
+        metadata = request.metadata
+        validation = None
+        
+        if request.parse_id and not questions:
+            parsed = await load_parse(request.parse_id)
+            if not parsed:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Parsed question paper not found or expired; parse the file again"
+                )
+            questions = parsed['questions']
+            validation = parsed.get('validation')
+            metadata = {
+                "total_questions": parsed['total_questions'],
+                "total_marks": parsed['total_marks'],
+                "pages_processed": parsed['pages_processed'],
+                **(metadata or {})
+            }
         
         # Validate questions
-        if not request.questions or len(request.questions) == 0:
+        if not questions or len(questions) == 0:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Questions list cannot be empty"
             )
         
-        # Validate parsed questions
-        validation = validate_parsed_questions(request.questions)
+        # Validate parsed questions (edited questions are checked again)
+        if validation is None:
+            validation = validate_parsed_questions(questions)
         
         # Create question paper document
         question_paper_doc = QuestionPaperModel.create_question_paper_document(
             title=request.title,
-            questions=request.questions,
+            questions=questions,
             creator_id=user_id,
             description=request.description,
             subject=request.subject,
             topic=request.topic,
             difficulty=request.difficulty,
             duration=request.duration,
-            metadata=request.metadata,
+            metadata=metadata,
             validation=validation,
             source=request.source
         )
+        if request.parse_id:
+            question_paper_doc['parse_id'] = request.parse_id
         
         # Insert into database
-        result = question_papers_collection.insert_one(question_paper_doc)
+        result = await question_papers_collection.insert_one(question_paper_doc)
+        invalidate(QUESTION_PAPERS)
         question_paper_id = str(result.inserted_id)
         
         return {
@@ -229,11 +305,13 @@ async def create_question_paper(
 # List question papers
 @question_paper_router.get("/", response_model=dict)
 async def list_question_papers(
-    page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
-    search: Optional[str] = Query(None)
+    search: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    fields: Optional[str] = Query(None, description="Extra fields (e.g. questions) or 'all'"),
+    include_total: bool = Query(False, description="Also count matching papers (slower)")
 ):
-    """List question papers with pagination and search"""
+    """List question papers newest first, with cursor pagination and search"""
     try:
         # Build query
         query = {}
@@ -244,13 +322,15 @@ async def list_question_papers(
                 {"topic": {"$regex": search, "$options": "i"}}
             ]
         
-        # Get total count
-        total_count = question_papers_collection.count_documents(query)
-        
-        # Get paginated results
-        skip = (page - 1) * limit
-        cursor = question_papers_collection.find(query).sort('created_at', -1).skip(skip).limit(limit)
-        question_papers = list(cursor)
+        projection = build_projection(QUESTION_PAPER_SUMMARY_FIELDS, fields, QUESTION_PAPER_COMPUTED_FIELDS)
+        page = fetch_page(question_papers_collection, query, limit, cursor, projection)
+        if include_total:
+            (question_papers, next_cursor), total_count = await asyncio.gather(
+                page, question_papers_collection.count_documents(query)
+            )
+        else:
+            question_papers, next_cursor = await page
+            total_count = None
         
         # Parse JSON safely
         parsed_papers = []
@@ -273,13 +353,15 @@ async def list_question_papers(
             'success': True,
             'question_papers': parsed_papers,
             'pagination': {
-                'page': page,
                 'limit': limit,
-                'total': total_count,
-                'pages': (total_count + limit - 1) // limit
+                'next_cursor': next_cursor,
+                'has_more': next_cursor is not None,
+                'total': total_count
             }
         }
         
+    except PaginationError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         import logging
         logger = logging.getLogger(__name__)
@@ -296,7 +378,7 @@ async def get_question_paper(
 ):
     """Get a specific question paper by ID"""
     try:
-        question_paper = question_papers_collection.find_one({
+        question_paper = await question_papers_collection.find_one({
             '_id': ObjectId(question_paper_id)
         })
         
@@ -333,7 +415,7 @@ async def update_question_paper(
     """Update a question paper"""
     try:
         # Check if question paper exists
-        existing_paper = question_papers_collection.find_one({
+        existing_paper = await question_papers_collection.find_one({
             '_id': ObjectId(question_paper_id)
         })
         
@@ -354,10 +436,11 @@ async def update_question_paper(
             update_data['validation'] = validate_parsed_questions(update_data['questions'])
         
         # Update in database
-        question_papers_collection.update_one(
+        await question_papers_collection.update_one(
             {'_id': ObjectId(question_paper_id)},
             {'$set': update_data}
         )
+        invalidate(QUESTION_PAPERS)
         
         return {
             "success": True,
@@ -386,7 +469,7 @@ async def delete_question_paper(
     """Delete a question paper"""
     try:
         # Check if question paper exists
-        existing_paper = question_papers_collection.find_one({
+        existing_paper = await question_papers_collection.find_one({
             '_id': ObjectId(question_paper_id)
         })
         
@@ -397,7 +480,8 @@ async def delete_question_paper(
             )
         
         # Delete from database
-        question_papers_collection.delete_one({'_id': ObjectId(question_paper_id)})
+        await question_papers_collection.delete_one({'_id': ObjectId(question_paper_id)})
+        invalidate(QUESTION_PAPERS)
         
         return APIResponse(
             success=True,
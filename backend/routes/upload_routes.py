@@ -5,14 +5,18 @@ FastAPI router for file uploads, queue management, and evaluation processing
 
 import os
 import time
+import asyncio
 from datetime import datetime
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, status
 from bson.objectid import ObjectId
 
 from mongoDB.auth import get_current_user
-from mongoDB.db_config import upload_queue_collection, evaluations_collection, question_papers_collection
-from models.schemas import BatchUploadResponse, FileMetadata, UploadStats, APIResponse
+from mongoDB.async_db import upload_queue_collection, evaluations_collection, question_papers_collection
+from models.schemas import BatchUploadResponse, FileMetadata, UploadStats, APIResponse, EvaluateUploadRequest
+from mongoDB.pagination import PaginationError, build_projection, fetch_page
+from worker.job_queue import enqueue_upload_async
+from analytics.cache import invalidate, UPLOAD_QUEUE
 from config import Config
 
 # Helper function for parsing JSON objects with ObjectId
@@ -38,6 +42,13 @@ upload_queue = upload_queue_collection
 evaluations = evaluations_collection
 question_papers = question_papers_collection
 
+# Returned by get_uploads; storage paths and worker lease fields are opt-in
+UPLOAD_SUMMARY_FIELDS = (
+    'original_filename', 'file_url', 'file_size', 'file_type', 'status', 'upload_date',
+    'question_paper_id', 'student_name', 'evaluation_type', 'evaluation_id', 'error',
+    'attempts', 'evaluation_requested_at', 'completed_at', 'updated_at'
+)
+
 @upload_router.post("/batch", response_model=BatchUploadResponse)
 async def upload_batch_pdfs(
     files: List[UploadFile] = File(...),
@@ -108,7 +119,8 @@ async def upload_batch_pdfs(
                     'updated_at': datetime.now()
                 }
                 
-                result = upload_queue.insert_one(upload_record)
+                result = await upload_queue.insert_one(upload_record)
+                invalidate(UPLOAD_QUEUE)
                 upload_record['_id'] = str(result.inserted_id)
                 upload_record = parse_json(upload_record)
                 
@@ -140,10 +152,12 @@ async def upload_batch_pdfs(
 async def get_uploads(
     current_user: dict = Depends(get_current_user),
     status_filter: Optional[str] = Query(None, alias="status"),
-    page: int = Query(1, ge=1),
-    limit: int = Query(20, ge=1, le=100)
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    fields: Optional[str] = Query(None, description="Extra fields or 'all'"),
+    include_total: bool = Query(False, description="Also count matching uploads (slower)")
 ):
-    """Get all uploaded files for the current user"""
+    """Get the current user's uploaded files, newest first"""
     try:
         user_id = current_user['user_id']
         
@@ -152,28 +166,30 @@ async def get_uploads(
         if status_filter:
             query['status'] = status_filter
         
-        # Get total count
-        total_count = upload_queue.count_documents(query)
-        
-        # Get paginated results
-        skip = (page - 1) * limit
-        cursor = upload_queue.find(query).sort('created_at', -1).skip(skip).limit(limit)
-        uploads = list(cursor)
+        projection = build_projection(UPLOAD_SUMMARY_FIELDS, fields)
+        page = fetch_page(upload_queue, query, limit, cursor, projection)
+        if include_total:
+            (uploads, next_cursor), total_count = await asyncio.gather(page, upload_queue.count_documents(query))
+        else:
+            uploads, next_cursor = await page
+            total_count = None
         
         # Convert to JSON serializable format
-        uploads_data = parse_json(uploads)
+        uploads_data = [parse_json(upload) for upload in uploads]
         
         return {
             'success': True,
             'uploads': uploads_data,
             'pagination': {
-                'page': page,
                 'limit': limit,
-                'total': total_count,
-                'pages': (total_count + limit - 1) // limit
+                'next_cursor': next_cursor,
+                'has_more': next_cursor is not None,
+                'total': total_count
             }
         }
         
+    except PaginationError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -189,7 +205,7 @@ async def get_upload(
     try:
         user_id = current_user['user_id']
         
-        upload = upload_queue.find_one({
+        upload = await upload_queue.find_one({
             '_id': ObjectId(upload_id),
             'user_id': user_id
         })
@@ -223,7 +239,7 @@ async def delete_upload(
         user_id = current_user['user_id']
         
         # Find the upload
-        upload = upload_queue.find_one({
+        upload = await upload_queue.find_one({
             '_id': ObjectId(upload_id),
             'user_id': user_id
         })
@@ -240,7 +256,8 @@ async def delete_upload(
             os.remove(file_path)
         
         # Delete from database
-        upload_queue.delete_one({'_id': ObjectId(upload_id)})
+        await upload_queue.delete_one({'_id': ObjectId(upload_id)})
+        invalidate(UPLOAD_QUEUE)
         
         return APIResponse(
             success=True,
@@ -258,6 +275,7 @@ async def delete_upload(
 @upload_router.post("/{upload_id}/evaluate", response_model=APIResponse)
 async def evaluate_upload(
     upload_id: str,
+    request: Optional[EvaluateUploadRequest] = None,
     current_user: dict = Depends(get_current_user)
 ):
     """Start evaluation process for an uploaded file"""
@@ -265,7 +283,7 @@ async def evaluate_upload(
         user_id = current_user['user_id']
         
         # Find the upload
-        upload = upload_queue.find_one({
+        upload = await upload_queue.find_one({
             '_id': ObjectId(upload_id),
             'user_id': user_id
         })
@@ -276,30 +294,43 @@ async def evaluate_upload(
                 detail="Upload not found"
             )
         
-        if upload.get('status') != 'queued':
+        if upload.get('status') not in ('queued', 'failed'):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="File is not in queued status"
             )
         
-        # Update status to processing
-        upload_queue.update_one(
-            {'_id': ObjectId(upload_id)},
-            {
-                '$set': {
-                    'status': 'processing',
-                    'updated_at': datetime.now()
-                }
-            }
+        if upload.get('status') == 'queued' and upload.get('evaluation_requested_at'):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Evaluation already requested for this file"
+            )
+        
+        if not request or not request.questionPaperId:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Question paper is required for evaluation"
+            )
+        
+        # Hand the upload to the worker pool (see worker/worker.py)
+        queued = await enqueue_upload_async(
+            upload_id,
+            user_id,
+            question_paper_id=request.questionPaperId,
+            evaluation_type=request.evaluationType,
+            student_name=request.studentName
         )
         
-        # Here you would trigger the actual evaluation process
-        # For now, we'll just update the status
-        # TODO: Implement actual evaluation logic with Celery tasks
+        if not queued:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="File status changed, please retry"
+            )
+        invalidate(UPLOAD_QUEUE)
         
         return APIResponse(
             success=True,
-            message="Evaluation started successfully"
+            message="Evaluation queued successfully"
         )
         
     except HTTPException:
@@ -328,7 +359,7 @@ async def get_upload_stats(
             }}
         ]
         
-        stats_result = list(upload_queue.aggregate(pipeline))
+        stats_result = await upload_queue.aggregate(pipeline).to_list(length=None)
         
         # Initialize stats
         stats = {
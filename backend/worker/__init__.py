@@ -0,0 +1 @@
+# Worker module for draining the upload evaluation queue
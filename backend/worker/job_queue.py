@@ -0,0 +1,175 @@
+"""
+Upload Job Queue
+Lease-based job claiming on the upload_queue collection
+
+An upload is queued for grading when `evaluation_requested_at` is set while
+its status is 'queued'. Workers claim jobs atomically with find_one_and_update,
+holding a lease they extend with heartbeats. A job whose lease expires (worker
+crash, lost connection) becomes claimable again until WORKER_MAX_ATTEMPTS.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, Tuple
+from bson.objectid import ObjectId
+from pymongo import ReturnDocument
+
+from mongoDB.db_config import upload_queue_collection
+from mongoDB.async_db import upload_queue_collection as async_upload_queue_collection
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+def _enqueue_request(
+    upload_id: str,
+    user_id: str,
+    question_paper_id: str,
+    evaluation_type: str,
+    student_name: Optional[str]
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Filter and update that mark an upload as requested for grading"""
+    now = datetime.now()
+    return (
+        {
+            '_id': ObjectId(upload_id),
+            'user_id': user_id,
+            '$or': [
+                {'status': 'queued', 'evaluation_requested_at': None},
+                {'status': 'failed'}
+            ]
+        },
+        {
+            '$set': {
+                'status': 'queued',
+                'evaluation_requested_at': now,
+                'question_paper_id': question_paper_id,
+                'evaluation_type': evaluation_type,
+                'student_name': student_name,
+                'attempts': 0,
+                'error': None,
+                'updated_at': now
+            }
+        }
+    )
+
+def enqueue_upload(
+    upload_id: str,
+    user_id: str,
+    question_paper_id: str,
+    evaluation_type: str = "rubric",
+    student_name: Optional[str] = None
+) -> bool:
+    """Request grading of a stored upload; returns False if it is not claimable"""
+    result = upload_queue_collection.update_one(
+        *_enqueue_request(upload_id, user_id, question_paper_id, evaluation_type, student_name)
+    )
+    return result.modified_count == 1
+
+async def enqueue_upload_async(
+    upload_id: str,
+    user_id: str,
+    question_paper_id: str,
+    evaluation_type: str = "rubric",
+    student_name: Optional[str] = None
+) -> bool:
+    """enqueue_upload for route handlers, on the async (Motor) client"""
+    result = await async_upload_queue_collection.update_one(
+        *_enqueue_request(upload_id, user_id, question_paper_id, evaluation_type, student_name)
+    )
+    return result.modified_count == 1
+
+def claim_next_job(worker_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Atomically claim the oldest requested job, or a job whose lease expired.
+
+    Returns the claimed upload document, or None if the queue is empty.
+    """
+    now = datetime.now()
+    return upload_queue_collection.find_one_and_update(
+        {
+            '$or': [
+                {'status': 'queued', 'evaluation_requested_at': {'$ne': None}},
+                {'status': 'processing', 'lease_expires_at': {'$lt': now}}
+            ]
+        },
+        {
+            '$set': {
+                'status': 'processing',
+                'worker_id': worker_id,
+                'lease_expires_at': now + timedelta(seconds=Config.WORKER_LEASE_SECONDS),
+                'heartbeat_at': now,
+                'started_at': now,
+                'updated_at': now
+            },
+            '$inc': {'attempts': 1}
+        },
+        sort=[('evaluation_requested_at', 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+def heartbeat(job_id: ObjectId, worker_id: str) -> bool:
+    """Extend the lease on a job; returns False if this worker no longer owns it"""
+    now = datetime.now()
+    result = upload_queue_collection.update_one(
+        {'_id': job_id, 'worker_id': worker_id, 'status': 'processing'},
+        {
+            '$set': {
+                'lease_expires_at': now + timedelta(seconds=Config.WORKER_LEASE_SECONDS),
+                'heartbeat_at': now
+            }
+        }
+    )
+    return result.matched_count == 1
+
+def complete_job(job_id: ObjectId, worker_id: str, evaluation_id: Optional[str]) -> bool:
+    """Mark a job completed and record the evaluation it produced"""
+    now = datetime.now()
+    result = upload_queue_collection.update_one(
+        {'_id': job_id, 'worker_id': worker_id, 'status': 'processing'},
+        {
+            '$set': {
+                'status': 'completed',
+                'evaluation_id': evaluation_id,
+                'error': None,
+                'completed_at': now,
+                'updated_at': now
+            },
+            '$unset': {'lease_expires_at': ''}
+        }
+    )
+    return result.matched_count == 1
+
+def fail_job(job_id: ObjectId, worker_id: str, error: str, retryable: bool = True) -> bool:
+    """
+    Record a job failure. Retryable failures go back to the queue until the
+    attempt budget is spent; everything else is marked failed.
+
+    The attempt budget is checked in the update filter, alongside the lease
+    holder, so a job reclaimed by another worker is never requeued or failed
+    from a stale attempts count. Returns False if this worker lost the lease.
+    """
+    now = datetime.now()
+    holder = {'_id': job_id, 'worker_id': worker_id, 'status': 'processing'}
+
+    def mark(query: Dict[str, Any], status: str) -> Optional[Dict[str, Any]]:
+        return upload_queue_collection.find_one_and_update(
+            query,
+            {
+                '$set': {
+                    'status': status,
+                    'error': error,
+                    'updated_at': now
+                },
+                '$unset': {'lease_expires_at': ''}
+            },
+            projection={'attempts': 1},
+            return_document=ReturnDocument.AFTER
+        )
+
+    if retryable and mark({**holder, 'attempts': {'$lt': Config.WORKER_MAX_ATTEMPTS}}, 'queued'):
+        return True
+    job = mark(holder, 'failed')
+    if job is None:
+        return False
+    logger.warning(f"Job {job_id} failed after {job.get('attempts', 0)} attempt(s): {error}")
+    return True
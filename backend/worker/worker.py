@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Upload Queue Worker
+Drains evaluation jobs from upload_queue and runs OCR -> Mapping -> Evaluation
+
+Run one or more worker processes next to the API server:
+
+    python -m worker.worker --concurrency 4 --processes 2
+
+Every process claims jobs independently through MongoDB leases, so any number
+of processes can drain the same queue. Jobs point at the uploaded file by its
+local path, so workers on other hosts than the API server need the same
+uploads/ directory mounted at the same path (shared storage). With
+--metrics-port N each process serves Prometheus metrics on N, N+1, ...
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from threading import Event, Lock, Thread
+from typing import Dict
+from bson.objectid import ObjectId
+
+from config import Config, get_config
+from pipeline.runner import (
+    PipelineError,
+    load_question_paper_questions,
+    run_pipeline,
+    store_pipeline_evaluation
+)
+from mongoDB.db_config import get_db
+from mongoDB.evaluation_store import find_upload_evaluation
+from worker.job_queue import claim_next_job, heartbeat, complete_job, fail_job
+from monitoring.metrics import start_metrics_server
+from llm.fake_model import check_fake_model
+
+logger = logging.getLogger(__name__)
+
+class Worker:
+    """Runs a fixed number of job loops plus one heartbeat loop in this process"""
+
+    def __init__(self, concurrency: int = None):
+        self.concurrency = concurrency or Config.WORKER_CONCURRENCY
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.stop_event = Event()
+        self._active_jobs: Dict[ObjectId, str] = {}
+        self._active_lock = Lock()
+
+    def start(self):
+        """Start job and heartbeat threads and block until stopped"""
+        logger.info(f"Worker {self.worker_id} starting with concurrency {self.concurrency}")
+
+        threads = [Thread(target=self._heartbeat_loop, name="heartbeat", daemon=True)]
+        for slot in range(self.concurrency):
+            threads.append(Thread(target=self._job_loop, args=(slot,), name=f"job-{slot}"))
+
+        for thread in threads:
+            thread.start()
+        for thread in threads[1:]:
+            thread.join()
+
+        logger.info(f"Worker {self.worker_id} stopped")
+
+    def stop(self, *_):
+        """Finish in-flight jobs and stop claiming new ones"""
+        logger.info(f"Worker {self.worker_id} shutting down")
+        self.stop_event.set()
+
+    def _job_loop(self, slot: int):
+        slot_id = f"{self.worker_id}:{slot}"
+        while not self.stop_event.is_set():
+            try:
+                job = claim_next_job(slot_id)
+            except Exception as e:
+                logger.error(f"Failed to claim job: {e}")
+                job = None
+
+            if not job:
+                self.stop_event.wait(Config.WORKER_POLL_SECONDS)
+                continue
+
+            with self._active_lock:
+                self._active_jobs[job['_id']] = slot_id
+            try:
+                self._process_job(job, slot_id)
+            finally:
+                with self._active_lock:
+                    self._active_jobs.pop(job['_id'], None)
+
+    def _heartbeat_loop(self):
+        while not self.stop_event.wait(Config.WORKER_HEARTBEAT_SECONDS):
+            with self._active_lock:
+                active = list(self._active_jobs.items())
+            for job_id, slot_id in active:
+                try:
+                    if not heartbeat(job_id, slot_id):
+                        logger.warning(f"Lost lease on job {job_id}")
+                except Exception as e:
+                    logger.error(f"Heartbeat failed for job {job_id}: {e}")
+
+    def _process_job(self, job: dict, slot_id: str):
+        job_id = job['_id']
+        attempts = job.get('attempts', 1)
+        if attempts > Config.WORKER_MAX_ATTEMPTS:
+            fail_job(job_id, slot_id, "Exceeded maximum attempts (lease expired repeatedly)", retryable=False)
+            return
+
+        logger.info(f"Processing job {job_id} ({job.get('original_filename')}), attempt {attempts}")
+        start_time = time.time()
+
+        try:
+            # A previous owner stored the evaluation but lost the lease before completing the job
+            evaluation_id = find_upload_evaluation(get_db(), str(job_id))
+            if evaluation_id is not None:
+                complete_job(job_id, slot_id, str(evaluation_id))
+                logger.info(f"Job {job_id} was already evaluated as {evaluation_id}")
+                return
+
+            questions = load_question_paper_questions(job.get('question_paper_id'))
+            if not questions:
+                raise PipelineError("Question paper is required for evaluation", 400)
+
+            outcome = run_pipeline(
+                job['file_path'],
+                questions,
+                job.get('evaluation_type') or 'rubric'
+            )
+
+            # A job whose lease expired mid-run belongs to another worker now
+            if not heartbeat(job_id, slot_id):
+                logger.warning(f"Lost lease on job {job_id} before storing its evaluation; leaving it to the new owner")
+                return
+
+            evaluation_id = store_pipeline_evaluation(
+                user_id=job['user_id'],
+                question_paper_id=job.get('question_paper_id'),
+                evaluation_result=outcome["evaluation"],
+                evaluation_type=job.get('evaluation_type') or 'rubric',
+                student_name=job.get('student_name') or 'Anonymous',
+                ocr_text=outcome["text"],
+                original_filename=job.get('original_filename'),
+                upload_id=str(job_id)
+            )
+            if evaluation_id is None:
+                raise PipelineError("Could not store evaluation in database")
+
+            if not complete_job(job_id, slot_id, evaluation_id):
+                logger.warning(f"Lost lease on job {job_id} after storing evaluation {evaluation_id}; "
+                               f"the new owner will find it stored")
+                return
+            logger.info(f"Completed job {job_id} in {time.time() - start_time:.1f}s")
+
+        except PipelineError as e:
+            # Client-side problems (bad paper, unreadable sheet) will not fix themselves
+            fail_job(job_id, slot_id, e.message, retryable=e.status_code >= 500)
+        except Exception as e:
+            logger.error(f"Job {job_id} crashed: {e}", exc_info=True)
+            fail_job(job_id, slot_id, str(e))
+
+def run_worker(concurrency: int, metrics_port: int = 0):
+    """Entry point for a single worker process"""
+    config = get_config()
+    logging.basicConfig(level=getattr(logging, config.LOG_LEVEL.upper()), format=config.LOG_FORMAT)
+    check_fake_model()
+    start_metrics_server(metrics_port)
+
+    worker = Worker(concurrency)
+    signal.signal(signal.SIGINT, worker.stop)
+    signal.signal(signal.SIGTERM, worker.stop)
+    worker.start()
+
+def main():
+    parser = argparse.ArgumentParser(description="Upload queue evaluation worker")
+    parser.add_argument("--concurrency", type=int, default=Config.WORKER_CONCURRENCY, help="Jobs per process")
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes to start")
+    parser.add_argument("--metrics-port", type=int, default=Config.WORKER_METRICS_PORT,
+                        help="Serve Prometheus metrics from port N (process i uses N+i); 0 disables")
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        run_worker(args.concurrency, args.metrics_port)
+        return
+
+    processes = [
+        multiprocessing.Process(
+            target=run_worker,
+            args=(args.concurrency, args.metrics_port + i if args.metrics_port else 0),
+            name=f"worker-{i}"
+        )
+        for i in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+if __name__ == "__main__":
+    main()
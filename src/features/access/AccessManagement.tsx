@@ -45,7 +45,7 @@ const AccessManagement = () => {
     try {
       setLoading(true);
       const response = await axios.get(`${API_BASE_URL}/evaluate`, {
-        params: { limit: 100, skip: 0 }
+        params: { limit: 100, fields: 'evaluations' }  // Details and reports need per-question results
       });
       
       if (response.data.success) {
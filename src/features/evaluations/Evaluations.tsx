@@ -348,13 +348,13 @@ const Evaluations = () => {
               <option value="">No question paper (auto-detect questions)</option>
               {(Array.isArray(questionPapers) ? questionPapers : []).map((paper) => (
                 <option key={paper._id} value={paper._id}>
-                  {paper.title} ({paper.questions?.length || 0} questions)
+                  {paper.title} ({paper.question_count ?? paper.questions?.length ?? 0} questions)
                 </option>
               ))}
             </select>
             {selectedQuestionPaper && (
               <p className="text-sm text-gray-600 mt-1">
-                Selected: {selectedQuestionPaper.title} - {selectedQuestionPaper.questions?.length || 0} questions
+                Selected: {selectedQuestionPaper.title} - {selectedQuestionPaper.question_count ?? selectedQuestionPaper.questions?.length ?? 0} questions
               </p>
             )}
           </div>
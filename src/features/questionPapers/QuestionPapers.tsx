@@ -55,7 +55,11 @@ const QuestionPapers = () => {
     try {
       setIsLoading(true);
       setError(null);
-      const response = await axios.get(`${API_URL}/question-papers`, getAxiosConfig());
+      // The list only returns summaries; editing and viewing need the questions
+      const response = await axios.get(`${API_URL}/question-papers`, {
+        ...getAxiosConfig(),
+        params: { fields: 'questions', limit: 100 }
+      });
       
       // Extract question_papers array from the response
       if (response.data && response.data.success && Array.isArray(response.data.question_papers)) {